@@ -0,0 +1,202 @@
+"""Арена: много змеек на одном поле.
+
+Все змейки арены {ArenaState.snakes} отмечаются в общей сетке
+занятости {GameState.grid}, поэтому столкновение с любой змейкой, в том
+числе с чужим телом или головой, - это одно обращение к сетке, а не
+перебор пар змеек. Лобовые столкновения, когда несколько голов идут в
+одну клетку, находятся словарём клеток, в которые направляются головы.
+Тик арены стоит как {count_snakes} ходов одной змейки и не растёт
+квадратично с числом змеек.
+
+Тик {arena_step} проходит в два этапа. Сначала для каждой змейки по
+сетке на начало тика решается, что с ней будет, поэтому результат не
+зависит от порядка змеек. Затем ходы применяются: погибшие змейки
+убираются с поля и появляются заново в случайной свободной клетке, а
+съеденные яблоки и задетые камни переносятся. Змейка игрока - первая в
+списке, она же {state.snake}; её гибель засчитывается в
+{state.resets}, а съеденные ею яблоки - в {state.eaten_apples}. Когда
+змейка игрока уходит с арены, её место занимает следующая, а на пустой
+арене {state.snake} - {None}.
+
+Как и в одиночной партии, поле не может переполниться. Каждая погибшая
+змейка освобождает хотя бы свою клетку, поэтому погибшие появляются
+заново раньше, чем переносятся яблоки. Змейка, которой некуда перенести
+съеденное яблоко, погибает вместо того, чтобы его съесть.
+"""
+from collections import Counter
+from typing import Optional, Sequence
+
+from snake_autopilot import Autopilot
+from snake_engine import (APPLE, DEFAULT_COUNT_APPLES, DEFAULT_COUNT_STONES,
+                          GRID_HEIGHT, GRID_WIDTH, OPPOSITE, SNAKE, STONE,
+                          GameState, Snake)
+
+"""Количество змеек на арене по умолчанию."""
+DEFAULT_COUNT_SNAKES = 50
+
+
+class ArenaState(GameState):
+    """Партия с {count_snakes} змейками. {deaths} - сколько раз гибли
+    змейки арены, включая змейку игрока.
+    """
+
+    def __init__(self,
+                 width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT,
+                 count_apples: int = DEFAULT_COUNT_APPLES,
+                 count_stones: int = DEFAULT_COUNT_STONES,
+                 seed: Optional[int] = None,
+                 count_snakes: int = DEFAULT_COUNT_SNAKES) -> None:
+        """Инициализирует экземпляр класса и расставляет объекты."""
+        self.count_snakes = count_snakes
+        self.snakes: list[Snake] = []
+        self.deaths = 0
+        super().__init__(width, height, count_apples, count_stones, seed)
+
+    def lay_out(self) -> None:
+        """Расставляет змейку игрока и препятствия, а затем остальных
+        змеек в случайных свободных клетках. На арене без змеек
+        ({count_snakes} = 0) змейка игрока убирается с поля,
+        {snake} становится {None}, и змейки появляются только через
+        {add_snake}.
+        """
+        super().lay_out()
+        self.snakes = [self.snake]
+        if not self.count_snakes:
+            self.snakes.clear()
+            self.vacate(self.snake.position)
+            self.snake = None
+        for _ in range(self.count_snakes - 1):
+            self.add_snake()
+
+    def add_snake(self) -> Snake:
+        """Выпускает на арену новую змейку в случайной свободной клетке и
+        возвращает её.
+        """
+        snake = self.snake_type()
+        self.spawn(snake)
+        self.snakes.append(snake)
+        if self.snake is None:
+            self.snake = snake
+        return snake
+
+    def remove_snake(self, snake: Snake) -> None:
+        """Убирает змейку {snake} с арены. Если это змейка {snake}
+        игрока, её место занимает первая из оставшихся змеек.
+        """
+        self.snakes.remove(snake)
+        for cell in snake.positions:
+            self.vacate(cell)
+        if snake is self.snake:
+            self.snake = self.snakes[0] if self.snakes else None
+
+    def spawn(self, snake: Snake) -> None:
+        """Ставит змейку {snake} из одной клетки в случайную свободную
+        клетку со случайным направлением.
+        """
+        snake.position = self.free_cells.choice(self.rng)
+        snake.reset(self.rng)
+        self.occupy(snake.position, SNAKE)
+
+
+def plan_moves(state: ArenaState) -> tuple[list, list, list, list]:
+    """Решает по сетке на начало тика, что будет с каждой змейкой.
+    Возвращает списки погибших змеек, змеек, которые просто сдвинутся,
+    съедят яблоко и заденут камень; в трёх последних - пары (змейка,
+    новая голова).
+    """
+    width, height, grid = state.width, state.height, state.grid
+    heads = [snake.new_head(width, height) for snake in state.snakes]
+    targets = Counter(heads)
+    dead, moves, meals, hits = [], [], [], []
+    for snake, head in zip(state.snakes, heads):
+        code = grid[head[1] * width + head[0]]
+        if code == SNAKE or targets[head] > 1:
+            dead.append(snake)
+        elif code == APPLE:
+            meals.append((snake, head))
+        elif code >= STONE and snake.length <= code - STONE:
+            dead.append(snake)
+        elif code >= STONE:
+            hits.append((snake, head))
+        else:
+            moves.append((snake, head))
+
+    return dead, moves, meals, hits
+
+
+def feed(state: ArenaState, meals: list) -> None:
+    """Змейки из пар (змейка, голова) {meals} съедают яблоки в клетках
+    голов, а яблоки переносятся. Если свободных клеток не осталось,
+    змейка погибает, а яблоко остаётся на месте.
+    """
+    for snake, head in meals:
+        if not state.free_cells:
+            for cell in snake.positions:
+                state.vacate(cell)
+            respawn(state, snake)
+            continue
+        if snake is state.snake:
+            state.update_eaten_apples()
+        state.obstacles.at(head).randomize_position(state)
+        snake.grow_up(head)
+        state.occupy(head, SNAKE)
+
+
+def cut(state: ArenaState, hits: list) -> None:
+    """Змейки из пар (змейка, голова) {hits} теряют хвост весом камня в
+    клетке головы, а камни переносятся.
+    """
+    for snake, head in hits:
+        stone = state.obstacles.at(head)
+        for cell in snake.truncate(stone.weight):
+            state.vacate(cell)
+        stone.randomize_position(state)
+        state.vacate(head)
+
+
+def respawn(state: ArenaState, snake: Snake) -> None:
+    """Засчитывает гибель змейки {snake}, уже убранной с поля, и
+    выпускает её заново.
+    """
+    state.deaths += 1
+    if snake is state.snake:
+        state.resets += 1
+    state.spawn(snake)
+
+
+def arena_step(state: ArenaState,
+               actions: Sequence[Optional[tuple[int, int]]] = ()) -> None:
+    """Продвигает арену на один тик. {actions} - новые направления
+    змеек в порядке {state.snakes}; {None} и развороты на 180 градусов
+    не меняют направление.
+    """
+    for snake, action in zip(state.snakes, actions):
+        if action is not None and action != OPPOSITE[snake.direction]:
+            snake.update_direction(action)
+
+    dead, moves, meals, hits = plan_moves(state)
+    for snake in dead:
+        for cell in snake.positions:
+            state.vacate(cell)
+    for snake, head in moves:
+        snake.move(head)
+        state.occupy(head, SNAKE)
+        state.vacate(snake.last)
+    for snake in dead:
+        respawn(state, snake)
+    feed(state, meals)
+    cut(state, hits)
+
+
+def pilot_actions(state: ArenaState, pilot: Autopilot,
+                  skip: int = 1) -> list[Optional[tuple[int, int]]]:
+    """Возвращает направления автопилота {pilot} для всех змеек арены,
+    кроме первых {skip}: их направления задаёт игрок. Поле расстояний
+    автопилота обновляется один раз на все змейки.
+    """
+    pilot.sync(state)
+    actions: list[Optional[tuple[int, int]]] = [None] * skip
+    actions.extend(pilot.choose(state, snake)
+                   for snake in state.snakes[skip:])
+    return actions
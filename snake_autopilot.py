@@ -0,0 +1,293 @@
+"""Автопилот змейки: движение к ближайшему яблоку по полю расстояний.
+
+Для каждой клетки поля хранится расстояние {Autopilot.dist} до
+ближайшего яблока с учётом замкнутости поля; камни в поле расстояний
+непроходимы. Змейка на каждом тике выбирает безопасную соседнюю
+клетку с наименьшим расстоянием, то есть спускается по полю к яблоку.
+
+Поле не пересчитывается каждый тик. Когда яблоко или камень
+переносится, меняются только клетки, чьё расстояние от этого
+зависело: новое яблоко или освободившаяся клетка распространяют
+уменьшение расстояний волной, а у исчезнувшего яблока или нового
+камня сначала собираются клетки, потерявшие кратчайший путь, и
+расстояния пересчитываются только для них. Полный обход поля
+выполняется лишь после сброса партии.
+"""
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import Generator, Iterable, Iterator, Optional
+
+from snake_engine import (APPLE, DIRECTIONS, OPPOSITE, SNAKE, STONE,
+                          GameState, ObstacleStore, Snake)
+
+"""Расстояние до недостижимой клетки."""
+UNREACHABLE = 1 << 30
+
+"""Сколько клеток поля расстояний обновляется за один тик."""
+UPDATE_BUDGET = 200
+
+
+@lru_cache(maxsize=2)
+def neighbour_table(width: int,
+                    height: int) -> list[tuple[int, int, int, int]]:
+    """Возвращает для каждой клетки поля номера четырёх соседних клеток
+    с учётом замкнутости поля в порядке {DIRECTIONS}.
+    """
+    size = width * height
+    table = []
+    for index in range(size):
+        pos_x = index % width
+        table.append((
+            index + 1 if pos_x < width - 1 else index - pos_x,
+            index - 1 if pos_x else index + width - 1,
+            index - width if index >= width else index + size - width,
+            index + width if index < size - width else index + width - size,
+        ))
+
+    return table
+
+
+class Autopilot():
+    """Автопилот, который можно подставить вместо {handle_keys} или
+    использовать как политику турнира: {decide} и вызов экземпляра
+    возвращают направление для следующего тика партии. Экземпляр сам
+    перестраивает поле, когда получает новую партию или когда партия
+    расставлена заново и хранилище {GameState.obstacles} заменено.
+
+    Обновления поля выполняются очередью {work} и продолжаются с того
+    места, где остановились: за тик обрабатывается не больше
+    {budget} клеток. Пока очередь не пуста, поле может быть неточным, и
+    змейка идёт по прямой с учётом замкнутости к яблоку {goals}.
+    """
+
+    def __init__(self, budget: int = UPDATE_BUDGET) -> None:
+        """Инициализирует экземпляр класса."""
+        self.budget = budget
+        self.state: Optional[GameState] = None
+        self.obstacles: Optional[ObstacleStore] = None
+        self.work: deque[Iterator[None]] = deque()
+        self.goals: dict[Snake, Optional[int]] = {}
+
+    def __call__(self, state: GameState,
+                 rng=None) -> Optional[tuple[int, int]]:
+        """Возвращает направление для партии {state}. Подпись совпадает
+        с политиками {snake_tournament}.
+        """
+        return self.decide(state)
+
+    def index(self, cell: tuple[int, int]) -> int:
+        """Возвращает номер клетки {cell}."""
+        return cell[1] * self.width + cell[0]
+
+    def rebuild(self, state: GameState) -> None:
+        """Ставит в очередь построение поля расстояний партии {state}
+        обходом в ширину от всех яблок.
+        """
+        self.state = state
+        self.obstacles = state.obstacles
+        self.width = state.width
+        self.table = neighbour_table(state.width, state.height)
+        self.blocked = bytearray(state.field_size)
+        self.dist = [UNREACHABLE] * state.field_size
+        self.known = state.obstacles.positions()
+        self.work.clear()
+        self.goals.clear()
+
+        sources = []
+        for position, code in zip(self.known, state.obstacles.codes):
+            index = self.index(position)
+            if code == APPLE:
+                self.dist[index] = 0
+                sources.append(index)
+            else:
+                self.blocked[index] = 1
+
+        self.work.append(self.lower(sources))
+
+    def lower(self, starts: Iterable[int]) -> Iterator[None]:
+        """Распространяет от клеток {starts} уменьшение расстояний."""
+        dist, blocked, table = self.dist, self.blocked, self.table
+        queue = deque(starts)
+        pop, push = queue.popleft, queue.append
+        while queue:
+            index = pop()
+            step = dist[index] + 1
+            for neighbour in table[index]:
+                if step < dist[neighbour] and not blocked[neighbour]:
+                    dist[neighbour] = step
+                    push(neighbour)
+            yield
+
+    def collect(self, start: int) -> Generator[None, None, list[int]]:
+        """Объявляет недостижимыми клетку {start} и клетки, у которых
+        без неё не остаётся соседа на единицу ближе к яблоку, и
+        возвращает их список.
+        """
+        dist, table = self.dist, self.table
+        affected = [start]
+        queue = deque([(start, dist[start])])
+        dist[start] = UNREACHABLE
+        while queue:
+            index, parent = queue.popleft()
+            for neighbour in table[index]:
+                if dist[neighbour] != parent + 1:
+                    continue
+                for other in table[neighbour]:
+                    if dist[other] == parent:
+                        break
+                else:
+                    dist[neighbour] = UNREACHABLE
+                    affected.append(neighbour)
+                    queue.append((neighbour, parent + 1))
+            yield
+
+        return affected
+
+    def raise_from(self, start: int) -> Iterator[None]:
+        """Пересчитывает расстояния после того, как клетка {start}
+        перестала быть яблоком или стала непроходимой: расстояния
+        затронутых клеток восстанавливаются от нетронутых соседей.
+        Соседи дают начальные оценки, которые затем уточняются обходом
+        в ширину, слитым с отсортированными оценками.
+        """
+        affected = yield from self.collect(start)
+        dist, blocked, table = self.dist, self.blocked, self.table
+        seeds = []
+        for index in affected:
+            if not blocked[index]:
+                best = min([dist[other] for other in table[index]]) + 1
+                if best < UNREACHABLE:
+                    dist[index] = best
+                    seeds.append((best, index))
+            yield
+        seeds.sort(reverse=True)
+
+        queue: deque[int] = deque()
+        while seeds or queue:
+            if queue and (not seeds or dist[queue[0]] <= seeds[-1][0]):
+                index = queue.popleft()
+            else:
+                best, index = seeds.pop()
+                if best != dist[index]:
+                    continue
+
+            step = dist[index] + 1
+            for neighbour in table[index]:
+                if step < dist[neighbour] and not blocked[neighbour]:
+                    dist[neighbour] = step
+                    queue.append(neighbour)
+            yield
+
+    def move_apple(self, old: int, new: int) -> Iterator[None]:
+        """Обновляет поле после переноса яблока из {old} в {new}."""
+        self.dist[new] = 0
+        yield from self.lower([new])
+        yield from self.raise_from(old)
+
+    def move_stone(self, old: int, new: int) -> Iterator[None]:
+        """Обновляет поле после переноса камня из {old} в {new}."""
+        self.blocked[new] = 1
+        yield from self.raise_from(new)
+        self.blocked[old] = 0
+        self.dist[old] = min([self.dist[other] for other in self.table[old]])
+        self.dist[old] += 1
+        yield from self.lower([old])
+
+    def sync(self, state: GameState) -> None:
+        """Ставит в очередь обновления поля для препятствий, которые
+        переместились с прошлого тика, и выполняет очередь в пределах
+        {budget} клеток.
+        """
+        if (state is not self.state
+                or state.obstacles is not self.obstacles):
+            self.rebuild(state)
+
+        obstacles, known = state.obstacles, self.known
+        for number, position in enumerate(zip(obstacles.xs, obstacles.ys)):
+            old = known[number]
+            if position != old:
+                known[number] = position
+                move = (self.move_apple if obstacles.codes[number] == APPLE
+                        else self.move_stone)
+                self.work.append(move(self.index(old), self.index(position)))
+
+        budget, work = self.budget, self.work
+        while work and budget > 0:
+            done = sum(1 for _ in islice(work[0], budget))
+            if done < budget:
+                work.popleft()
+            budget -= done
+
+    def distance(self, state: GameState, index: int, other: int) -> int:
+        """Возвращает расстояние между клетками {index} и {other} по
+        прямой с учётом замкнутости поля, без учёта камней.
+        """
+        width, height = state.width, state.height
+        delta_x = abs(index % width - other % width)
+        delta_y = abs(index // width - other // width)
+        return min(delta_x, width - delta_x) + min(delta_y, height - delta_y)
+
+    def goal(self, state: GameState, snake: Snake) -> Optional[int]:
+        """Возвращает клетку яблока, к которому змейка {snake} идёт,
+        пока поле обновляется, или {None}, если яблок нет. Ближайшее к
+        голове яблоко ищется перебором, только когда прежнее съедено или
+        перенесено, поэтому перебор выполняется раз на яблоко, а не на
+        каждый тик.
+        """
+        goal = self.goals.get(snake)
+        if goal is not None and state.grid[goal] == APPLE:
+            return goal
+
+        head = self.index(snake.get_head_position())
+        obstacles = state.obstacles
+        goal, best = None, UNREACHABLE
+        for position, code in zip(obstacles.positions(), obstacles.codes):
+            if code != APPLE:
+                continue
+            apple = self.index(position)
+            distance = self.distance(state, head, apple)
+            if distance < best:
+                goal, best = apple, distance
+
+        self.goals[snake] = goal
+        return goal
+
+    def decide(self, state: GameState) -> tuple[int, int]:
+        """Возвращает направление змейки партии {state} для следующего
+        тика.
+        """
+        self.sync(state)
+        return self.choose(state, state.snake)
+
+    def choose(self, state: GameState, snake: Snake) -> tuple[int, int]:
+        """Возвращает направление змейки {snake} по уже обновлённому
+        через {sync} полю. Змейка не идёт в клетки змеек и в камни,
+        которые её сбросят, а тупики, из которых нет хода, и остальные
+        камни выбирает, только если других ходов нет. Поле одно на все
+        змейки партии, поэтому на арене {sync} вызывается раз за тик.
+        """
+        grid, dist = state.grid, self.dist
+        length = snake.length
+        back = OPPOSITE[snake.direction]
+        head = self.index(snake.get_head_position())
+        best, best_key = snake.direction, None
+        goal = self.goal(state, snake) if self.work else None
+        for direction, neighbour in zip(DIRECTIONS, self.table[head]):
+            code = grid[neighbour]
+            if (direction == back or code == SNAKE
+                    or (code >= STONE and length <= code - STONE)):
+                continue
+            if not self.work:
+                distance = dist[neighbour]
+            elif goal is None:
+                distance = UNREACHABLE
+            else:
+                distance = self.distance(state, neighbour, goal)
+            dead_end = all(grid[other] == SNAKE
+                           for other in self.table[neighbour])
+            key = (dead_end, code >= STONE, distance)
+            if best_key is None or key < best_key:
+                best, best_key = direction, key
+
+        return best
@@ -0,0 +1,241 @@
+"""Пакетный движок: много партий змейки в массивах NumPy.
+
+Правила те же, что в {snake_engine}: замкнутое поле, яблоки, камни и
+сброс партии. Обычный ход всех партий выполняется векторными
+операциями, а редкие события (съеденное яблоко, камень, сброс)
+обрабатываются по одной партии. Каждая партия тратит случайные числа
+своего {random.Random} в том же порядке, что и {snake_engine.GameState},
+поэтому при одинаковых зёрнах и ходах результаты совпадают.
+"""
+import random
+from typing import Optional, Sequence
+
+import numpy as np
+
+from snake_engine import (APPLE, DEFAULT_COUNT_APPLES, DEFAULT_COUNT_STONES,
+                          DEFAULT_STONE_WEIGHT, DIRECTIONS, EMPTY,
+                          GRID_HEIGHT, GRID_WIDTH, KEEP_DIRECTION, SNAKE,
+                          STONE, FreeCells)
+
+"""Смещения по осям для кодов направлений - индексов в {DIRECTIONS}.
+У противоположных направлений коды отличаются последним битом."""
+DELTA_X = np.array([direction[0] for direction in DIRECTIONS], np.int64)
+DELTA_Y = np.array([direction[1] for direction in DIRECTIONS], np.int64)
+DIRECTION_CODES = range(len(DIRECTIONS))
+
+
+class BatchState():
+    """Состояние {count} партий на полях одинакового размера.
+
+    {grid} - сетки занятости формы (N, H, W) с теми же кодами клеток,
+    что и {GameState.grid}. Тело змейки хранится кольцевым буфером
+    номеров клеток {body}: голова в {start}, длина в {length}. Индекс
+    свободных клеток {free_cells}/{free_slots}/{free_size} повторяет
+    {snake_engine.FreeCells} построчно для каждой партии.
+    """
+
+    def __init__(self,
+                 seeds: Sequence[int],
+                 width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT,
+                 count_apples: int = DEFAULT_COUNT_APPLES,
+                 count_stones: int = DEFAULT_COUNT_STONES,
+                 stone_weight: int = DEFAULT_STONE_WEIGHT) -> None:
+        """Создаёт партии, по одной на каждое зерно из {seeds}."""
+        count = len(seeds)
+        field_size = width * height
+        index_type = np.int16 if field_size < 2 ** 15 else np.int32
+
+        self.count = count
+        self.width = width
+        self.height = height
+        self.field_size = field_size
+        self.count_apples = count_apples
+        self.count_stones = count_stones
+        self.stone_weight = stone_weight
+        self.rngs = [random.Random(seed) for seed in seeds]
+
+        self.grid = np.zeros((count, height, width), np.uint8)
+        self.cells = self.grid.reshape(count, field_size)
+        self.body = np.zeros((count, field_size), index_type)
+        self.start = np.zeros(count, np.int64)
+        self.length = np.ones(count, np.int64)
+        self.heads = np.zeros(count, np.int64)
+        self.direction = np.zeros(count, np.int64)
+        self.eaten_apples = np.zeros(count, np.int64)
+        self.resets = np.zeros(count, np.int64)
+
+        self.free_cells = np.zeros((count, field_size), index_type)
+        self.free_slots = np.zeros((count, field_size), index_type)
+        self.free_size = np.zeros(count, np.int64)
+
+        self.rows = np.arange(count)
+        for game in range(count):
+            self.reset_game(game)
+
+    def take(self, game: int, cell: int) -> None:
+        """Помечает клетку {cell} партии {game} занятой."""
+        slots, cells = self.free_slots[game], self.free_cells[game]
+        slot = int(slots[cell])
+        if slot < 0:
+            return
+
+        self.free_size[game] -= 1
+        last = int(cells[self.free_size[game]])
+        cells[slot] = last
+        slots[last] = slot
+        slots[cell] = -1
+
+    def release(self, game: int, cell: int) -> None:
+        """Возвращает клетку {cell} партии {game} в число свободных."""
+        slots = self.free_slots[game]
+        if slots[cell] >= 0:
+            return
+
+        size = self.free_size[game]
+        self.free_cells[game, size] = cell
+        slots[cell] = size
+        self.free_size[game] = size + 1
+
+    def spawn(self, game: int, code: int) -> None:
+        """Ставит объект с кодом {code} в случайную свободную клетку."""
+        size = int(self.free_size[game])
+        if not size:
+            raise IndexError('На поле не осталось свободных клеток')
+
+        cell = int(self.free_cells[game, self.rngs[game].randrange(size)])
+        self.cells[game, cell] = code
+        self.take(game, cell)
+
+    def reset_game(self, game: int) -> None:
+        """Расставляет партию {game} заново, как {init_game_objects}.
+        Расстановка выполняется на обычном {FreeCells}, а в массивы
+        партии копируется целиком.
+        """
+        rng, width = self.rngs[game], self.width
+        free_cells = FreeCells(width, self.height)
+        row = bytearray(self.field_size)
+
+        self.direction[game] = rng.choice(DIRECTION_CODES)
+        head = (self.height // 2) * width + width // 2
+        row[head] = SNAKE
+        free_cells.take((width // 2, self.height // 2))
+
+        codes = ([APPLE] * self.count_apples
+                 + [STONE + self.stone_weight] * self.count_stones)
+        for code in codes:
+            cell = free_cells.choice(rng)
+            row[cell[1] * width + cell[0]] = code
+            free_cells.take(cell)
+
+        self.cells[game] = np.frombuffer(row, np.uint8)
+        self.free_cells[game] = np.frombuffer(free_cells.cells, np.int32)
+        self.free_slots[game] = np.frombuffer(free_cells.slots, np.int32)
+        self.free_size[game] = len(free_cells)
+        self.start[game] = 0
+        self.length[game] = 1
+        self.body[game, 0] = head
+        self.heads[game] = head
+
+    def snake_positions(self, game: int) -> list[tuple[int, int]]:
+        """Возвращает клетки змейки партии {game}, начиная с головы."""
+        index = (self.start[game] + np.arange(self.length[game]))
+        cells = self.body[game, index % self.field_size]
+        return [(int(cell) % self.width, int(cell) // self.width)
+                for cell in cells]
+
+    def step(self, actions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Продвигает все партии на один тик.
+
+        {actions} - коды направлений (индексы в {DIRECTIONS}) для каждой
+        партии, {KEEP_DIRECTION} сохраняет текущее. Развороты на 180
+        градусов игнорируются. Возвращает маску партий, в которых
+        змейка просто сдвинулась на клетку.
+        """
+        if actions is not None:
+            actions = np.asarray(actions, np.int64)
+            turn = ((actions != KEEP_DIRECTION)
+                    & (actions != (self.direction ^ 1)))
+            self.direction[turn] = actions[turn]
+
+        pos_y, pos_x = np.divmod(self.heads, self.width)
+        pos_x = (pos_x + DELTA_X[self.direction]) % self.width
+        pos_y = (pos_y + DELTA_Y[self.direction]) % self.height
+        new_heads = pos_y * self.width + pos_x
+
+        codes = self.cells[self.rows, new_heads]
+        moved = codes == EMPTY
+        self.move(self.rows[moved], new_heads[moved])
+
+        for game in np.flatnonzero(~moved):
+            self.collide(int(game), int(new_heads[game]), int(codes[game]))
+
+        return moved
+
+    def move(self, games: np.ndarray, new_heads: np.ndarray) -> None:
+        """Сдвигает змеек партий {games} на клетки {new_heads}."""
+        field_size = self.field_size
+        tail_index = (self.start[games] + self.length[games] - 1) % field_size
+        tails = self.body[games, tail_index].astype(np.int64)
+
+        start = (self.start[games] - 1) % field_size
+        self.start[games] = start
+        self.body[games, start] = new_heads
+        self.heads[games] = new_heads
+        self.cells[games, new_heads] = SNAKE
+        self.cells[games, tails] = EMPTY
+
+        slots = self.free_slots[games, new_heads].astype(np.int64)
+        size = self.free_size[games] - 1
+        self.free_size[games] = size
+        last = self.free_cells[games, size].astype(np.int64)
+        self.free_cells[games, slots] = last
+        self.free_slots[games, last] = slots
+        self.free_slots[games, new_heads] = -1
+
+        self.free_cells[games, size] = tails
+        self.free_slots[games, tails] = size
+        self.free_size[games] = size + 1
+
+    def collide(self, game: int, new_head: int, code: int) -> None:
+        """Обрабатывает встречу змейки партии {game} с объектом {code} в
+        клетке {new_head} так же, как {snake_engine.snake_can_move}.
+        """
+        field_size = self.field_size
+        obstacles = self.count_apples + self.count_stones
+        if code == SNAKE:
+            self.restart(game)
+
+        elif code == APPLE:
+            start = (self.start[game] - 1) % field_size
+            self.start[game] = start
+            self.body[game, start] = new_head
+            self.heads[game] = new_head
+            self.length[game] += 1
+            self.eaten_apples[game] += 1
+
+            if self.length[game] + obstacles <= field_size:
+                self.spawn(game, APPLE)
+                self.cells[game, new_head] = SNAKE
+            else:
+                self.restart(game)
+
+        elif self.length[game] <= code - STONE:
+            self.restart(game)
+        else:
+            for _ in range(code - STONE):
+                self.length[game] -= 1
+                tail = int(self.body[
+                    game, (self.start[game] + self.length[game]) % field_size
+                ])
+                self.cells[game, tail] = EMPTY
+                self.release(game, tail)
+
+            self.spawn(game, code)
+            self.cells[game, new_head] = EMPTY
+            self.release(game, new_head)
+
+    def restart(self, game: int) -> None:
+        """Сбрасывает партию {game}, сохраняя счётчик съеденных яблок."""
+        self.resets[game] += 1
+        self.reset_game(game)
@@ -0,0 +1,381 @@
+"""Замеры скорости горячих путей змейки.
+
+Каждый замер повторяется на полях разного размера {BOARD_SIZES} и со
+змейками разной длины {SNAKE_LENGTHS}: проверка хода
+{snake_can_move}, перенос препятствия {randomize_position},
+расстановка объектов {init_game_objects}, построение уровня
+{generate_level}, ход {Snake.move}, ход автопилота {Autopilot.decide},
+сохранение и загрузка снимка партии {snake_save} и отрисовка кадра
+через {FieldRenderer}. Отдельно замер {startup} меряет импорт игровой
+логики {STARTUP_MODULE} в свежем интерпретаторе. Результаты -
+наносекунды на одну операцию - сохраняются в JSON и сравниваются с
+базовой линией: замер, ставший медленнее больше чем на
+{DEFAULT_THRESHOLD}, считается регрессией, и программа завершается с
+кодом 1.
+
+Базовая линия зависит от машины, поэтому снимать её нужно там же, где
+потом идёт сравнение:
+
+    python snake_bench.py --save-baseline bench_baseline.json
+    python snake_bench.py --baseline bench_baseline.json --json out.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from time import perf_counter
+from typing import Callable, Iterator, NamedTuple
+
+import snake_engine as engine
+from snake_autopilot import Autopilot
+from snake_levels import generate_level
+from snake_save import restore_snapshot, take_snapshot
+
+"""Размеры полей и длины змеек, на которых идут замеры. Отрисовка
+меряется только на поле окна игры."""
+BOARD_SIZES = ((32, 24), (100, 100), (500, 500))
+SNAKE_LENGTHS = (1, 100, 1000)
+
+"""Параметры замера: один прогон длится не меньше {TARGET_TIME} секунд,
+из {DEFAULT_REPEAT} прогонов берётся лучший."""
+TARGET_TIME = 0.01
+DEFAULT_REPEAT = 5
+
+"""Модуль, импорт которого меряет замер {startup}: его загружают
+рабочие процессы и тесты, поэтому он должен импортироваться быстро."""
+STARTUP_MODULE = 'snake_engine'
+MEASURE_IMPORT = '''
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+'''
+
+"""Бюджет времени импорта {STARTUP_MODULE} в секундах."""
+STARTUP_BUDGET = 0.05
+
+"""Допустимое замедление относительно базовой линии, доля."""
+DEFAULT_THRESHOLD = 0.25
+
+Bench = Callable[[engine.GameState], Callable[[], object]]
+
+
+class BenchResult(NamedTuple):
+    """Результат одного замера."""
+
+    name: str
+    width: int
+    height: int
+    length: int
+    ns_per_op: float
+
+    @property
+    def key(self) -> str:
+        """Возвращает имя замера вместе с его параметрами. У замеров без
+        поля, например {startup}, ключ - просто имя.
+        """
+        if not self.width:
+            return self.name
+        return f'{self.name}[{self.width}x{self.height},{self.length}]'
+
+
+def serpentine(width: int, height: int,
+               length: int) -> list[tuple[int, int]]:
+    """Возвращает клетки змейки длины {length}, уложенной змейкой по
+    строкам поля, начиная с головы.
+    """
+    cells = []
+    for pos_y in range(height):
+        row = range(width) if pos_y % 2 == 0 else range(width - 1, -1, -1)
+        cells.extend((pos_x, pos_y) for pos_x in row)
+
+    return cells[length - 1::-1]
+
+
+def make_state(width: int, height: int, length: int,
+               state_type=engine.GameState) -> engine.GameState:
+    """Создаёт партию с зерном 0, змейкой длины {length} и обычным
+    количеством яблок и камней в оставшихся клетках.
+    """
+    state = state_type(width, height, count_apples=0, count_stones=0,
+                       seed=0)
+    for cell in state.snake.positions:
+        state.vacate(cell)
+    body = serpentine(width, height, length)
+    state.snake.set_body(body)
+    if length > 1:
+        state.snake.direction = state.direction_to(body[1], body[0])
+    for cell in body:
+        state.occupy(cell, engine.SNAKE)
+
+    state.count_apples = engine.DEFAULT_COUNT_APPLES
+    state.count_stones = engine.DEFAULT_COUNT_STONES
+    engine.get_apples(state, state.count_apples)
+    engine.get_stones(state, state.count_stones)
+    return state
+
+
+def bench_snake_can_move(state: engine.GameState) -> Callable[[], object]:
+    """Проверка хода в свободную клетку."""
+    cell = state.free_cells.choice(state.rng)
+    return lambda: engine.snake_can_move(state, cell)
+
+
+def bench_self_collision(state: engine.GameState) -> Callable[[], object]:
+    """Проверка хода в клетку собственного хвоста."""
+    tail = state.snake.positions[-1]
+    return lambda: engine.snake_can_move(state, tail)
+
+
+def bench_randomize_position(
+        state: engine.GameState) -> Callable[[], object]:
+    """Перенос яблока в случайную свободную клетку."""
+    apple = state.obstacles[0]
+
+    def run() -> None:
+        state.vacate(apple.position)
+        apple.randomize_position(state)
+
+    return run
+
+
+def bench_init_game_objects(
+        state: engine.GameState) -> Callable[[], object]:
+    """Расстановка змейки, яблок и камней на пустом поле."""
+    return lambda: engine.init_game_objects(state)
+
+
+def bench_generate_level(state: engine.GameState) -> Callable[[], object]:
+    """Построение уровня с проверкой достижимости яблок."""
+    return lambda: generate_level(state)
+
+
+def bench_snake_move(state: engine.GameState) -> Callable[[], object]:
+    """Ход змейки без проверки препятствий."""
+    snake, width, height = state.snake, state.width, state.height
+    return lambda: snake.move(snake.new_head(width, height))
+
+
+def bench_autopilot_decide(
+        state: engine.GameState) -> Callable[[], object]:
+    """Выбор хода автопилотом вместе с самим ходом: поле расстояний
+    обновляется по перенесённым яблокам, а не строится заново.
+    """
+    pilot = Autopilot()
+    while True:
+        pilot.decide(state)
+        if not pilot.work:
+            break
+
+    return lambda: engine.step(state, pilot.decide(state))
+
+
+def bench_snapshot(state: engine.GameState) -> Callable[[], object]:
+    """Снимок партии и загрузка его в другую партию того же размера."""
+    loaded = engine.GameState(state.width, state.height, seed=0)
+    return lambda: restore_snapshot(loaded, take_snapshot(state))
+
+
+"""Замеры игровой логики. Расстановка объектов и ходы автопилота от
+длины змейки не зависят и меряются только для змейки из одной клетки."""
+LOGIC_BENCHES: dict[str, Bench] = {
+    'snake_can_move': bench_snake_can_move,
+    'self_collision': bench_self_collision,
+    'randomize_position': bench_randomize_position,
+    'init_game_objects': bench_init_game_objects,
+    'generate_level': bench_generate_level,
+    'snake_move': bench_snake_move,
+    'autopilot_decide': bench_autopilot_decide,
+    'snapshot': bench_snapshot,
+}
+
+
+"""Замеры, которые меряются только для змейки из одной клетки."""
+LENGTH_FREE_BENCHES = ('init_game_objects', 'generate_level',
+                       'autopilot_decide')
+
+
+def measure(run: Callable[[], object], repeat: int = DEFAULT_REPEAT,
+            target: float = TARGET_TIME) -> float:
+    """Возвращает лучшее из {repeat} время одного вызова {run} в
+    наносекундах. Число вызовов в прогоне подбирается так, чтобы прогон
+    длился не меньше {target} секунд.
+    """
+    number = 1
+    while True:
+        start = perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = perf_counter() - start
+        if elapsed >= target:
+            break
+        number *= 10 if elapsed < target / 10 else 2
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, perf_counter() - start)
+
+    return best / number * 1e9
+
+
+def logic_cases(sizes, lengths) -> Iterator[tuple[str, int, int, int]]:
+    """Возвращает сочетания замера, размера поля и длины змейки."""
+    for name in LOGIC_BENCHES:
+        for width, height in sizes:
+            for length in lengths:
+                if length > width * height // 2:
+                    continue
+                if name in LENGTH_FREE_BENCHES and length > 1:
+                    continue
+                if name == 'self_collision' and length < 3:
+                    continue
+                yield name, width, height, length
+
+
+def render_benches(lengths, repeat: int,
+                   target: float) -> Iterator[BenchResult]:
+    """Меряет отрисовку кадра: полную перерисовку поля и кадр, в
+    котором изменились только голова и хвост змейки.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import the_snake
+
+    the_snake.init_display()
+    width, height = the_snake.GRID_WIDTH, the_snake.GRID_HEIGHT
+    for length in lengths:
+        if length > width * height // 2:
+            continue
+
+        state = make_state(width, height, length, the_snake.GameField)
+        renderer = the_snake.FieldRenderer(state)
+        cells = (state.snake.positions[0], state.snake.positions[-1])
+
+        def full_frame() -> None:
+            renderer.invalidate()
+            the_snake.update_display(renderer.render())
+
+        def dirty_frame() -> None:
+            state.changed.update(cells)
+            the_snake.update_display(renderer.render())
+
+        for name, run in (('render_full', full_frame),
+                          ('render_dirty', dirty_frame)):
+            yield BenchResult(name, width, height, length,
+                              measure(run, repeat, target))
+
+
+def import_time(module: str = STARTUP_MODULE) -> float:
+    """Возвращает время импорта модуля {module} в свежем интерпретаторе
+    в секундах. Запуск самого интерпретатора в замер не входит, а всё,
+    что модуль печатает при импорте, пропускается. Байт-код пишется на
+    диск, как при обычном запуске игры, и перед замером модуль один раз
+    импортируется вхолостую, чтобы не мерить компиляцию исходников.
+    """
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    command = [sys.executable, '-c', MEASURE_IMPORT.format(module=module)]
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    subprocess.check_output(command, cwd=cwd, env=env)
+    output = subprocess.check_output(command, cwd=cwd, env=env)
+    return float(output.split()[-1])
+
+
+def startup_bench(repeat: int) -> BenchResult:
+    """Меряет импорт игровой логики: лучшее из {repeat} время импорта
+    {STARTUP_MODULE} в наносекундах.
+    """
+    best = min(import_time() for _ in range(repeat))
+    return BenchResult('startup', 0, 0, 0, best * 1e9)
+
+
+def run_benchmarks(sizes=BOARD_SIZES, lengths=SNAKE_LENGTHS,
+                   render: bool = True, repeat: int = DEFAULT_REPEAT,
+                   target: float = TARGET_TIME) -> Iterator[BenchResult]:
+    """Проводит все замеры и отдаёт результаты по мере готовности."""
+    yield startup_bench(repeat)
+    for name, width, height, length in logic_cases(sizes, lengths):
+        run = LOGIC_BENCHES[name](make_state(width, height, length))
+        yield BenchResult(name, width, height, length,
+                          measure(run, repeat, target))
+
+    if render:
+        yield from render_benches(lengths, repeat, target)
+
+
+def compare(results: list[BenchResult], baseline: dict[str, float],
+            threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """Сравнивает результаты с базовой линией {baseline} (имя замера ->
+    наносекунды) и возвращает описания регрессий. Замер, которого нет
+    в базовой линии, тоже попадает в описания: базовую линию нужно
+    снять заново.
+    """
+    regressions = []
+    for result in results:
+        before = baseline.get(result.key)
+        if not before:
+            regressions.append(f'{result.key}: нет в базовой линии')
+        elif result.ns_per_op > before * (1 + threshold):
+            regressions.append(
+                f'{result.key}: {before:.0f} -> {result.ns_per_op:.0f} нс '
+                f'(+{result.ns_per_op / before - 1:.0%})'
+            )
+
+    return regressions
+
+
+def to_json(results: list[BenchResult]) -> dict:
+    """Возвращает результаты в виде, пригодном для {json.dump}."""
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {result.key: result.ns_per_op for result in results},
+    }
+
+
+def main() -> None:
+    """Разбирает аргументы командной строки и проводит замеры."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--json', help='куда записать результаты')
+    parser.add_argument('--baseline', help='базовая линия для сравнения')
+    parser.add_argument('--save-baseline',
+                        help='записать результаты как базовую линию')
+    parser.add_argument('--threshold', type=float,
+                        default=DEFAULT_THRESHOLD)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--quick', action='store_true',
+                        help='только маленькое поле и короткие змейки')
+    parser.add_argument('--no-render', action='store_true')
+    args = parser.parse_args()
+
+    sizes, lengths = BOARD_SIZES, SNAKE_LENGTHS
+    if args.quick:
+        sizes, lengths = BOARD_SIZES[:1], SNAKE_LENGTHS[:2]
+
+    results: list[BenchResult] = []
+    for result in run_benchmarks(sizes, lengths, not args.no_render,
+                                 args.repeat):
+        results.append(result)
+        print(f'{result.key:<40}{result.ns_per_op:>12.0f} нс')
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(to_json(results), file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print('РЕГРЕССИЯ', regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
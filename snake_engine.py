@@ -0,0 +1,746 @@
+"""Игровая логика змейки, не зависящая от pygame.
+
+Модуль можно импортировать без SDL и дисплея: здесь описаны игровые
+объекты, состояние партии {GameState} и функция {step}, которая
+продвигает игру на один логический тик. Координаты объектов задаются
+в клетках игрового поля, а не в пикселях.
+
+Модуль импортируется при каждом запуске игры и инструментов, поэтому
+он обходится без {typing} и {copy}: их импорт дороже всей логики.
+"""
+import random
+from array import array
+from collections import deque
+from collections.abc import Iterator
+from functools import lru_cache
+
+"""Размеры игрового поля в клетках."""
+GRID_WIDTH, GRID_HEIGHT = 32, 24
+
+"""Направления движения"""
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = (RIGHT, LEFT, UP, DOWN)
+OPPOSITE = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
+"""Код действия, сохраняющего текущее направление: остальные коды -
+индексы в {DIRECTIONS}."""
+KEEP_DIRECTION = -1
+
+"""Ограничение на длину одной партии в тиках для турниров и сред
+обучения."""
+DEFAULT_MAX_TICKS = 5000
+
+"""Количество игровых объектов на поле."""
+DEFAULT_COUNT_APPLES = 20
+DEFAULT_COUNT_STONES = 10
+DEFAULT_STONE_WEIGHT = 5
+
+"""Содержимое клеток в сетке занятости {GameState.grid}. Клетка с
+камнем хранит {STONE} + вес камня, поэтому вес не больше 252."""
+EMPTY = 0
+SNAKE = 1
+APPLE = 2
+STONE = 3
+
+"""Разрядность зерна генератора случайных чисел партии."""
+SEED_BITS = 64
+
+
+class GameObject():
+    """Базовый класс для всех объектов игрового поля.
+
+    Класс не заводит полей, чтобы подклассы хранили только своё:
+    препятствие объявляет в {__slots__} хранилище и номер записи, а
+    змейка хранит атрибуты в словаре. Конкретный класс сам решает, где
+    лежат клетка и имя объекта.
+    """
+
+    __slots__ = ()
+
+    def __init__(self,
+                 position: tuple[int, int] | None = None,
+                 name: str | None = None) -> None:
+        """Инициализирует новый экземпляр класса {GameObject}."""
+        self.position: tuple[int, int] = (
+            position or (GRID_WIDTH // 2, GRID_HEIGHT // 2)
+        )
+        self.name = name or str(type(self).__name__).lower()
+
+    def cell_code(self) -> int:
+        """Возвращает значение, которым объект отмечается в сетке поля."""
+        return EMPTY
+
+
+class Obstacle(GameObject):
+    """Препятствие - лёгкое представление записи {index} хранилища
+    {store}: клетка и код клетки берутся из массивов хранилища, а сам
+    объект хранит только эти два поля. Препятствие, созданное напрямую,
+    получает собственное хранилище из одной записи;
+    {ObstacleStore.append} переносит запись в хранилище партии.
+    """
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self,
+                 position: tuple[int, int] | None = None,
+                 code: int = EMPTY) -> None:
+        """Инициализирует препятствие с кодом клетки {code}."""
+        self.store = ObstacleStore()
+        self.index = self.store.add(
+            code, position or (GRID_WIDTH // 2, GRID_HEIGHT // 2)
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """Препятствия равны, если представляют одну запись."""
+        return (isinstance(other, Obstacle) and other.store is self.store
+                and other.index == self.index)
+
+    def __hash__(self) -> int:
+        """Возвращает хэш записи, которую представляет препятствие."""
+        return hash((id(self.store), self.index))
+
+    @property
+    def position(self) -> tuple[int, int]:
+        """Клетка препятствия."""
+        index = self.index
+        return self.store.xs[index], self.store.ys[index]
+
+    @position.setter
+    def position(self, cell: tuple[int, int]) -> None:
+        """Переносит препятствие в клетку {cell}."""
+        self.store.move(self.index, cell)
+
+    def cell_code(self) -> int:
+        """Возвращает значение, которым объект отмечается в сетке поля."""
+        return self.store.codes[self.index]
+
+    def randomize_position(self, state: 'GameState') -> None:
+        """Переносит объект в случайную свободную клетку поля из
+        {GameState.respawn_cell} и помечает её занятой. Прежнюю клетку
+        объект не освобождает: это делает вызывающий код, когда она
+        действительно пустеет.
+        """
+        self.position = state.respawn_cell(self)
+        state.add_obstacle(self)
+
+
+class Apple(Obstacle):
+    """Класс описывающий игровой объект Яблоко."""
+
+    __slots__ = ()
+    name = 'apple'
+
+    def __init__(self,
+                 position: tuple[int, int] | None = None) -> None:
+        """Инициализирует экземпляр класса."""
+        super().__init__(position, APPLE)
+
+
+class Stone(Obstacle):
+    """Класс описывающий игровой объект Камень. Вес камня хранится в
+    коде клетки: {STONE} + вес.
+    """
+
+    __slots__ = ()
+    name = 'stone'
+
+    def __init__(self,
+                 position: tuple[int, int] | None = None,
+                 weight: int = DEFAULT_STONE_WEIGHT) -> None:
+        """Инициализирует экземпляр класса."""
+        super().__init__(position, STONE + weight)
+
+    @property
+    def weight(self) -> int:
+        """Вес камня."""
+        return self.store.codes[self.index] - STONE
+
+
+class Snake(GameObject):
+    """Класс описывающий игровой объект 'Змейка'.
+
+    Тело хранится в {positions} как {deque} от головы к хвосту, а
+    множество {cells} дублирует его для проверки принадлежности клетки
+    змейке за O(1). Поэтому ход и рост не зависят от длины змейки.
+    """
+
+    def __init__(self,
+                 position: tuple[int, int] | None = None,
+                 name: str | None = None) -> None:
+        """Инициализирует экземпляр класса {Snake}."""
+        super().__init__(position, name)
+        self.set_body([self.position])
+        self.last: tuple[int, int] | None = None
+        self.direction: tuple[int, int] = RIGHT
+
+    @property
+    def length(self) -> int:
+        """Длина змейки в сегментах."""
+        return len(self.positions)
+
+    def reset(self, rng: random.Random) -> None:
+        """Сбрасывает змейку в начальное состояние и выбирает случайное
+        направление генератором партии {rng}.
+        """
+        self.set_body([self.position])
+        self.last: tuple[int, int] | None = None
+        self.direction = rng.choice(DIRECTIONS)
+
+    def set_body(self, positions) -> None:
+        """Размещает змейку по клеткам {positions}, начиная с головы."""
+        self.positions: deque[tuple[int, int]] = deque(positions)
+        self.cells: set[tuple[int, int]] = set(self.positions)
+
+    def update_direction(self, direction: tuple[int, int]) -> None:
+        """Обновляет направление движения змейки."""
+        self.direction = direction
+
+    def new_head(self, width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT) -> tuple[int, int]:
+        """Возвращает координаты новой головы. Поле замкнуто: выходя за
+        край, змейка появляется с противоположной стороны.
+        """
+        pos_x, pos_y = self.get_head_position()
+        return (
+            (pos_x + self.direction[0]) % width,
+            (pos_y + self.direction[1]) % height
+        )
+
+    def grow_up(self, new_segment: tuple[int, int]) -> None:
+        """Увиличивает змейку на один сегмент."""
+        self.positions.appendleft(new_segment)
+        self.cells.add(new_segment)
+
+    def cut_tail(self) -> None:
+        """Уменьшает змейку на один сегмент с конца."""
+        self.truncate(1)
+
+    def truncate(self, count: int) -> list[tuple[int, int]]:
+        """Отрезает {count} сегментов с хвоста за один вызов и возвращает
+        освободившиеся клетки.
+        """
+        positions, cells = self.positions, self.cells
+        removed = [positions.pop() for _ in range(count)]
+        cells.difference_update(removed)
+        return removed
+
+    def get_head_position(self) -> tuple[int, int]:
+        """Возвращает позицию головы змейки."""
+        return self.positions[0]
+
+    def move(self, new_head: tuple[int, int]) -> None:
+        """Сдвигает змейку на одну клетку игрового поля."""
+        self.last = self.positions.pop()
+        self.cells.discard(self.last)
+        self.positions.appendleft(new_head)
+        self.cells.add(new_head)
+
+    def can_bite_itself(self, new_head: tuple[int, int]) -> bool:
+        """Проверяет может ли следующим ходом змейка укусить сама себя."""
+        return new_head in self.cells
+
+    def try_bite(self, new_head: tuple[int, int], object: GameObject) -> bool:
+        """Принимает на вход объект и проверяет можно ли его укусить."""
+        return object.position == new_head
+
+
+def new_seed() -> int:
+    """Возвращает случайное зерно для новой партии."""
+    return random.getrandbits(SEED_BITS)
+
+
+@lru_cache(maxsize=8)
+def identity_cells(size: int) -> array:
+    """Возвращает массив номеров клеток 0..{size}-1. Массив общий, его
+    нужно копировать перед изменением.
+    """
+    return array('i', range(size))
+
+
+class FreeCells():
+    """Множество свободных клеток поля с выбором случайной клетки за O(1).
+
+    Клетки хранятся плотным массивом номеров {cells}, а {slots} для
+    каждой клетки поля хранит её индекс в этом массиве или -1, если
+    клетка занята. Удаление переставляет на место удаляемой клетки
+    последнюю, поэтому все операции не зависят от размера поля.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        """Создаёт множество, в котором свободны все клетки поля."""
+        self.width = width
+        self.size = width * height
+        self.cells = identity_cells(self.size)[:]
+        self.slots = identity_cells(self.size)[:]
+
+    def copy(self) -> 'FreeCells':
+        """Возвращает независимую копию множества. Порядок клеток в
+        копии тот же, поэтому {choice} с тем же генератором выберет ту
+        же клетку.
+        """
+        free_cells = type(self).__new__(type(self))
+        free_cells.width, free_cells.size = self.width, self.size
+        free_cells.cells = self.cells[:]
+        free_cells.slots = self.slots[:]
+        return free_cells
+
+    @classmethod
+    def from_order(cls, width: int, height: int, order: array,
+                   slots: array | None = None) -> 'FreeCells':
+        """Создаёт множество, в котором свободны клетки {order} ровно в
+        этом порядке, так что {choice} выбирает из него те же клетки, что
+        и из множества, с которого снят {order}. Если индекс {slots} того
+        множества известен, он берётся как есть, иначе строится заново
+        проходом по {order}.
+        """
+        free_cells = cls.__new__(cls)
+        free_cells.width = width
+        free_cells.size = len(order)
+        free_cells.cells = order + identity_cells(width * height)[len(order):]
+        if slots is None:
+            slots = array('i', [-1]) * (width * height)
+            for slot, index in enumerate(order):
+                slots[index] = slot
+        free_cells.slots = slots
+        return free_cells
+
+    def order(self) -> array:
+        """Возвращает свободные клетки в порядке, в котором их выбирает
+        {choice}.
+        """
+        return self.cells[:self.size]
+
+    def __len__(self) -> int:
+        """Возвращает количество свободных клеток."""
+        return self.size
+
+    def __contains__(self, cell: tuple[int, int]) -> bool:
+        """Проверяет свободна ли клетка {cell}."""
+        return self.slots[cell[1] * self.width + cell[0]] >= 0
+
+    def take(self, cell: tuple[int, int]) -> None:
+        """Помечает свободную клетку {cell} занятой."""
+        index = cell[1] * self.width + cell[0]
+        slot = self.slots[index]
+        if slot < 0:
+            return
+
+        self.size -= 1
+        last = self.cells[self.size]
+        self.cells[slot] = last
+        self.slots[last] = slot
+        self.slots[index] = -1
+
+    def take_all(self, indices: list[int]) -> None:
+        """Помечает занятыми клетки с номерами {indices} за один проход."""
+        cells, slots, size = self.cells, self.slots, self.size
+        for index in indices:
+            slot = slots[index]
+            if slot < 0:
+                continue
+            size -= 1
+            last = cells[size]
+            cells[slot] = last
+            slots[last] = slot
+            slots[index] = -1
+        self.size = size
+
+    def release(self, cell: tuple[int, int]) -> None:
+        """Возвращает клетку {cell} в число свободных."""
+        index = cell[1] * self.width + cell[0]
+        if self.slots[index] >= 0:
+            return
+
+        self.cells[self.size] = index
+        self.slots[index] = self.size
+        self.size += 1
+
+    def choice(self, rng: random.Random) -> tuple[int, int]:
+        """Возвращает случайную свободную клетку, не занимая её."""
+        if not self.size:
+            raise IndexError('На поле не осталось свободных клеток')
+
+        pos_y, pos_x = divmod(self.cells[rng.randrange(self.size)],
+                              self.width)
+        return pos_x, pos_y
+
+
+class ObstacleStore():
+    """Препятствия партии в параллельных массивах.
+
+    Запись номер {index} - это клетка ({xs}[{index}], {ys}[{index}]) и
+    код клетки {codes}[{index}] в сетке поля: {APPLE} для яблока и
+    {STONE} + вес для камня. Индекс {slots} для каждой клетки поля
+    размером {width}x{height} хранит номер записи препятствия в ней или
+    -1, поэтому препятствие по клетке находится одним обращением к
+    массиву. На запись уходит девять байт вместо сотен байт на объект
+    с {__dict__}, кортеж клетки и элемент словаря, а индекс стоит ещё
+    четыре байта на каждую клетку поля, занята она или нет.
+
+    Объекты {apple_type} и {stone_type} создаются по требованию как
+    представления записей, в том числе при переборе хранилища.
+    Хранилище без размеров поля не ведёт индекс клеток.
+    """
+
+    def __init__(self, width: int = 0, height: int = 0,
+                 apple_type: type | None = None,
+                 stone_type: type | None = None) -> None:
+        """Создаёт пустое хранилище для поля {width}x{height}."""
+        self.width = width
+        self.xs = array('I')
+        self.ys = array('I')
+        self.codes = array('B')
+        self.slots = array('i', [-1]) * (width * height)
+        self.apple_type = apple_type or Apple
+        self.stone_type = stone_type or Stone
+
+    def __len__(self) -> int:
+        """Возвращает количество препятствий."""
+        return len(self.codes)
+
+    def __getitem__(self, index: int) -> Obstacle:
+        """Возвращает представление записи {index}."""
+        if index < 0:
+            index += len(self.codes)
+        if not 0 <= index < len(self.codes):
+            raise IndexError('Нет препятствия с таким номером')
+
+        obstacle_type = (self.apple_type if self.codes[index] == APPLE
+                         else self.stone_type)
+        obstacle = object.__new__(obstacle_type)
+        obstacle.store, obstacle.index = self, index
+        return obstacle
+
+    def __iter__(self) -> Iterator[Obstacle]:
+        """Перебирает представления всех записей."""
+        return map(self.__getitem__, range(len(self.codes)))
+
+    def add(self, code: int, cell: tuple[int, int]) -> int:
+        """Добавляет препятствие с кодом {code} в клетку {cell} и
+        возвращает номер записи.
+        """
+        index = len(self.codes)
+        self.xs.append(cell[0])
+        self.ys.append(cell[1])
+        self.codes.append(code)
+        if self.slots:
+            self.slots[cell[1] * self.width + cell[0]] = index
+        return index
+
+    def extend(self, code: int, indices: list[int]) -> None:
+        """Добавляет препятствия с кодом {code} в клетки с номерами
+        {indices}.
+        """
+        first, width, slots = len(self.codes), self.width, self.slots
+        self.xs.extend([index % width for index in indices])
+        self.ys.extend([index // width for index in indices])
+        self.codes.frombytes(bytes([code]) * len(indices))
+        for number, index in enumerate(indices, first):
+            slots[index] = number
+
+    def append(self, obstacle: Obstacle) -> None:
+        """Переносит запись препятствия {obstacle} в хранилище, после
+        чего объект представляет уже новую запись.
+        """
+        obstacle.store, obstacle.index = self, self.add(
+            obstacle.cell_code(), obstacle.position
+        )
+
+    def move(self, index: int, cell: tuple[int, int]) -> None:
+        """Переносит препятствие {index} в клетку {cell}."""
+        if self.slots:
+            old = self.ys[index] * self.width + self.xs[index]
+            if self.slots[old] == index:
+                self.slots[old] = -1
+            self.slots[cell[1] * self.width + cell[0]] = index
+        self.xs[index], self.ys[index] = cell
+
+    def at(self, cell: tuple[int, int]) -> Obstacle:
+        """Возвращает препятствие в клетке {cell}."""
+        index = self.slots[cell[1] * self.width + cell[0]]
+        if index < 0:
+            raise KeyError(cell)
+        return self[index]
+
+    def positions(self) -> list[tuple[int, int]]:
+        """Возвращает клетки всех препятствий по порядку записей."""
+        return list(zip(self.xs, self.ys))
+
+
+class GameState():
+    """Состояние одной партии: поле, змейка, препятствия и счётчики.
+
+    Содержимое каждой клетки дублируется в плоской сетке занятости
+    {grid} (по байту на клетку, см. {EMPTY}, {SNAKE}, {APPLE}, {STONE}),
+    а препятствия хранятся в {obstacles} ({ObstacleStore}) и доступны по
+    координатам через {ObstacleStore.at}. Поэтому проверка столкновения -
+    это одно обращение по индексу.
+
+    После {track_changes} все клетки, содержимое которых изменилось,
+    собираются в множество {changed}, а {redraw_all} сообщает, что поле
+    расставлено заново. Их очищает тот, кто отрисовывает партию.
+
+    Классы создаваемых объектов задаются атрибутами {snake_type},
+    {apple_type} и {stone_type}, что позволяет подменить их, например,
+    объектами, которые умеют рисовать себя на экране.
+    """
+
+    snake_type = Snake
+    apple_type = Apple
+    stone_type = Stone
+
+    def __init__(self,
+                 width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT,
+                 count_apples: int = DEFAULT_COUNT_APPLES,
+                 count_stones: int = DEFAULT_COUNT_STONES,
+                 seed: int | None = None) -> None:
+        """Инициализирует экземпляр класса и расставляет объекты. Все
+        случайные решения партии берутся из {rng}, созданного по зерну
+        {seed}; если зерно не передано, его выбирает {default_seed}.
+        """
+        self.width = width
+        self.height = height
+        self.field_size = width * height
+        self.count_apples = count_apples
+        self.count_stones = count_stones
+        self.seed = seed if seed is not None else self.default_seed()
+        self.rng = random.Random(self.seed)
+        self.reset: bool = False
+        self.eaten_apples: int = 0
+        self.resets: int = 0
+        self.changed: set[tuple[int, int]] | None = None
+        self.redraw_all: bool = True
+        self.lay_out()
+
+    def default_seed(self) -> int:
+        """Возвращает зерно партии, начатой без явного зерна: новое
+        случайное.
+        """
+        return new_seed()
+
+    def close(self) -> None:
+        """Освобождает ресурсы партии, которая больше не нужна. У
+        обычной партии их нет; подклассы, держащие открытые файлы,
+        закрывают их здесь.
+        """
+
+    def lay_out(self) -> None:
+        """Расставляет змейку и препятствия на пустом поле. Подклассы,
+        у которых на поле есть и другие объекты, расставляют их здесь.
+        """
+        self.snake, self.obstacles = init_game_objects(self)
+
+    def update_eaten_apples(self) -> None:
+        """Обновляет количество съеденных яблок."""
+        self.eaten_apples += 1
+
+    def direction_to(self, cell: tuple[int, int],
+                     neighbor: tuple[int, int]) -> tuple[int, int]:
+        """Возвращает направление из клетки {cell} в соседнюю клетку
+        {neighbor} с учётом замкнутости поля.
+        """
+        delta_x = (neighbor[0] - cell[0]) % self.width
+        delta_y = (neighbor[1] - cell[1]) % self.height
+        if delta_x == 1:
+            return RIGHT
+        if delta_x:
+            return LEFT
+        if delta_y == 1:
+            return DOWN
+        return UP
+
+    def track_changes(self) -> None:
+        """Включает учёт изменившихся клеток в {changed}."""
+        self.changed = set()
+        self.redraw_all = True
+
+    def cell_at(self, cell: tuple[int, int]) -> int:
+        """Возвращает содержимое клетки {cell} из сетки занятости."""
+        return self.grid[cell[1] * self.width + cell[0]]
+
+    def occupy(self, cell: tuple[int, int], code: int) -> None:
+        """Отмечает клетку {cell} занятой объектом с кодом {code}."""
+        self.grid[cell[1] * self.width + cell[0]] = code
+        self.free_cells.take(cell)
+        if self.changed is not None:
+            self.changed.add(cell)
+
+    def occupy_all(self, indices: list[int], code: int) -> None:
+        """Отмечает клетки с номерами {indices} занятыми объектами с
+        кодом {code} за один проход.
+        """
+        grid = self.grid
+        for index in indices:
+            grid[index] = code
+        self.free_cells.take_all(indices)
+        if self.changed is not None:
+            width = self.width
+            self.changed.update(
+                (index % width, index // width) for index in indices
+            )
+
+    def vacate(self, cell: tuple[int, int]) -> None:
+        """Освобождает клетку {cell}."""
+        self.grid[cell[1] * self.width + cell[0]] = EMPTY
+        self.free_cells.release(cell)
+        if self.changed is not None:
+            self.changed.add(cell)
+
+    def new_obstacles(self) -> ObstacleStore:
+        """Возвращает пустое хранилище препятствий для поля партии."""
+        return ObstacleStore(self.width, self.height,
+                             self.apple_type, self.stone_type)
+
+    def respawn_cell(self, obstacle: Obstacle) -> tuple[int, int]:
+        """Возвращает случайную свободную клетку для переносимого
+        препятствия {obstacle}.
+        """
+        return self.free_cells.choice(self.rng)
+
+    def add_obstacle(self, obstacle: Obstacle) -> None:
+        """Отмечает препятствие в его текущей клетке поля. Препятствие,
+        которого ещё нет в {obstacles}, переносится туда.
+        """
+        if obstacle.store is not self.obstacles:
+            self.obstacles.append(obstacle)
+        self.occupy(obstacle.position, obstacle.cell_code())
+
+
+def place_obstacles(state: GameState, code: int, count: int) -> None:
+    """Ставит {count} препятствий с кодом клетки {code} в случайные
+    свободные клетки поля.
+    """
+    obstacles, free_cells, rng = state.obstacles, state.free_cells, state.rng
+    for _ in range(count):
+        cell = free_cells.choice(rng)
+        obstacles.add(code, cell)
+        state.occupy(cell, code)
+
+
+def get_apples(state: GameState,
+               count: int = DEFAULT_COUNT_APPLES) -> None:
+    """Расставляет {count} яблок."""
+    place_obstacles(state, APPLE, count)
+
+
+def get_stones(state: GameState,
+               count: int = DEFAULT_COUNT_STONES) -> None:
+    """Расставляет {count} камней."""
+    place_obstacles(state, STONE + DEFAULT_STONE_WEIGHT, count)
+
+
+def clear_field(state: GameState) -> Snake:
+    """Очищает поле, заводит пустое хранилище препятствий и ставит в
+    центр поля новую змейку, которую и возвращает. Сетка занятости
+    очищается на месте, поэтому представления поверх неё остаются
+    действительными между партиями.
+    """
+    state.free_cells = FreeCells(state.width, state.height)
+    grid = getattr(state, 'grid', None)
+    if grid is None:
+        state.grid = bytearray(state.field_size)
+    else:
+        grid[:] = bytes(state.field_size)
+    state.obstacles = state.new_obstacles()
+    state.redraw_all = True
+    snake = state.snake_type(position=(state.width // 2, state.height // 2))
+    snake.reset(state.rng)
+    state.occupy(snake.position, SNAKE)
+    return snake
+
+
+def init_game_objects(state: GameState) -> tuple[Snake, ObstacleStore]:
+    """Создаёт змейку в центре поля и расставляет вокруг препятствия.
+    Заодно заново заполняет сетку занятости и индекс свободных клеток.
+    """
+    snake = clear_field(state)
+    get_apples(state, state.count_apples)
+    get_stones(state, state.count_stones)
+
+    return snake, state.obstacles
+
+
+def reset_game(state: GameState, new_game: bool = False,
+               seed: int | None = None) -> None:
+    """Сбрасывает змейку к исходному состоянию и задаёт ей случайное
+    направление. Всем препятствиям задаются новые координаты. Если
+    {new_game} = {True}, партия начинается заново с зерна {seed} (или
+    {GameState.default_seed}), а счётчики съеденных яблок и сбросов
+    обнуляются. Иначе сброс засчитывается в {state.resets}.
+    """
+    if new_game:
+        state.seed = seed if seed is not None else state.default_seed()
+        state.rng = random.Random(state.seed)
+        state.eaten_apples = 0
+        state.resets = 0
+    else:
+        state.resets += 1
+
+    state.reset = False
+    state.lay_out()
+
+
+def snake_can_move(state: GameState, new_head: tuple[int, int]) -> bool:
+    """Проверяет есть ли на пути препятствия. Если нет то возвращает {True}
+    и змейка двигается дальше. Если есть препятствие, возвращется {False}.
+    В зависимости от препятсвия змейка вырастет, уменьшится или будет
+    помечена для сброса через {state.reset}.
+    """
+    code = state.cell_at(new_head)
+    if code == EMPTY:
+        return True
+
+    if code == SNAKE:
+        state.reset = True
+        return False
+
+    snake, obstacle = state.snake, state.obstacles.at(new_head)
+    if code == APPLE:
+        snake.grow_up(new_head)
+        state.update_eaten_apples()
+
+        if snake.length + len(state.obstacles) <= state.field_size:
+            obstacle.randomize_position(state)
+            state.occupy(new_head, SNAKE)
+        else:
+            state.reset = True
+
+    elif snake.length <= code - STONE:
+        state.reset = True
+    else:
+        for cell in snake.truncate(code - STONE):
+            state.vacate(cell)
+        obstacle.randomize_position(state)
+        state.vacate(new_head)
+
+    return False
+
+
+def step(state: GameState,
+         action: tuple[int, int] | None = None) -> bool:
+    """Продвигает игру на один логический тик.
+
+    {action} - новое направление движения. Разворот на 180 градусов
+    игнорируется, {None} сохраняет текущее направление. Возвращает
+    {True}, если змейка просто сдвинулась на клетку, и {False}, если
+    она встретила препятствие или партия была сброшена.
+    """
+    snake = state.snake
+    if action is not None and action != OPPOSITE[snake.direction]:
+        snake.update_direction(action)
+
+    new_head = snake.new_head(state.width, state.height)
+    if snake_can_move(state, new_head):
+        snake.move(new_head)
+        state.occupy(new_head, SNAKE)
+        state.vacate(snake.last)
+        return True
+
+    if state.reset:
+        reset_game(state)
+
+    return False
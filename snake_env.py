@@ -0,0 +1,210 @@
+"""Среда обучения с подкреплением поверх правил {snake_engine}.
+
+{SnakeEnv} повторяет интерфейс Gymnasium: {SnakeEnv.reset} начинает
+партию с зерна, {SnakeEnv.step} продвигает её на тик по правилам
+{snake_can_move}. Действие - код направления в {DIRECTIONS} или
+{KEEP_DIRECTION}.
+
+Наблюдение - массив NumPy формы (H, W) с кодами клеток {EMPTY},
+{SNAKE}, {APPLE}, {STONE}. Он выделяется один раз, и сетка занятости
+партии {GameState.grid} сама лежит в его памяти, поэтому движок
+обновляет наблюдение на месте, а шаг ничего не копирует. Сетка
+очищается на месте и при сбросе партии, так что массив остаётся тем же
+самым всё время жизни среды.
+
+С {pixels} наблюдением служат пиксели кадра игры формы (H, W, 3).
+Партия рисуется обычной отрисовкой {the_snake} на поверхность, пиксели
+которой лежат в заранее выделенном массиве среды, поэтому кадр тоже не
+копируется. Массив {pg.surfarray.pixels3d} над экраном для этого не
+годится: пока он существует, экран заблокирован и рисовать на нём
+нельзя.
+
+{VectorSnakeEnv} шагает несколько сред, наблюдения которых - строки
+одного заранее выделенного массива формы (N, H, W).
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+
+from snake_engine import (DEFAULT_COUNT_APPLES, DEFAULT_COUNT_STONES,
+                          DEFAULT_MAX_TICKS, DIRECTIONS, GRID_HEIGHT,
+                          GRID_WIDTH, KEEP_DIRECTION, SEED_BITS, GameState,
+                          reset_game, step)
+
+"""Награды: за каждое съеденное яблоко и за сброс партии."""
+REWARD_APPLE = 1.0
+REWARD_RESET = -1.0
+
+
+class SnakeEnv():
+    """Одна партия змейки с интерфейсом Gymnasium.
+
+    {observation} - массив формы (H, W), поверх памяти которого
+    работает сетка занятости партии. Если передан массив {observation}
+    нужной формы, среда использует его вместо собственного. Партия
+    завершается ({terminated}) сбросом и обрезается ({truncated}) через
+    {max_ticks} тиков. После сброса движок сразу расставляет поле
+    заново, и наблюдение показывает уже новое поле.
+    """
+
+    def __init__(self,
+                 width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT,
+                 count_apples: int = DEFAULT_COUNT_APPLES,
+                 count_stones: int = DEFAULT_COUNT_STONES,
+                 max_ticks: int = DEFAULT_MAX_TICKS,
+                 pixels: bool = False,
+                 seed: Optional[int] = None,
+                 observation: Optional[np.ndarray] = None) -> None:
+        """Создаёт партию с зерном {seed} и связывает её сетку с
+        массивом наблюдения.
+        """
+        state_type = GameState
+        if pixels:
+            import the_snake
+
+            state_type = the_snake.GameField
+        self.pixels = pixels
+        self.renderer = None
+        self.surface = None
+        self.frame: Optional[np.ndarray] = None
+        self.max_ticks = max_ticks
+        self.ticks = 0
+        self.state = state_type(width, height, count_apples, count_stones,
+                                seed=seed)
+
+        if observation is None:
+            observation = np.zeros((height, width), np.uint8)
+        elif observation.shape != (height, width) or (
+                observation.dtype != np.uint8
+                or not observation.flags.c_contiguous):
+            raise ValueError('Массив наблюдения не подходит к полю')
+        observation[...] = np.frombuffer(self.state.grid, np.uint8).reshape(
+            height, width
+        )
+        self.state.grid = memoryview(observation.reshape(-1))
+        self.observation = observation
+
+    def observe(self) -> np.ndarray:
+        """Возвращает наблюдение: сетку поля или пиксели экрана."""
+        if not self.pixels:
+            return self.observation
+
+        return self.render()
+
+    def info(self) -> dict:
+        """Возвращает сведения о партии."""
+        state = self.state
+        return {
+            'seed': state.seed,
+            'length': state.snake.length,
+            'eaten_apples': state.eaten_apples,
+            'ticks': self.ticks,
+        }
+
+    def reset(self, seed: Optional[int] = None) -> tuple[np.ndarray, dict]:
+        """Начинает новую партию с зерна {seed}. Без зерна оно берётся
+        из генератора текущей партии, поэтому цепочка партий среды с
+        заданным начальным зерном воспроизводима.
+        """
+        if seed is None:
+            seed = self.state.rng.getrandbits(SEED_BITS)
+        reset_game(self.state, True, seed)
+        self.ticks = 0
+        return self.observe(), self.info()
+
+    def step(self,
+             action: int = KEEP_DIRECTION
+             ) -> tuple[np.ndarray, float, bool, bool, dict]:
+        """Продвигает партию на тик с направлением {action} и возвращает
+        наблюдение, награду, признаки завершения и обрезки и сведения.
+        """
+        state = self.state
+        eaten_apples, resets = state.eaten_apples, state.resets
+        step(state, None if action == KEEP_DIRECTION else DIRECTIONS[action])
+        self.ticks += 1
+
+        terminated = state.resets != resets
+        reward = (state.eaten_apples - eaten_apples) * REWARD_APPLE
+        if terminated:
+            reward += REWARD_RESET
+        truncated = not terminated and self.ticks >= self.max_ticks
+        return self.observe(), reward, terminated, truncated, self.info()
+
+    def render(self) -> np.ndarray:
+        """Рисует партию и возвращает кадр формы
+        (SCREEN_HEIGHT, SCREEN_WIDTH, 3). Массив выделяется при первом
+        вызове и дальше обновляется на месте: на время отрисовки
+        поверхность над ним подставляется вместо {the_snake.screen}.
+        """
+        import pygame as pg
+
+        import the_snake
+
+        if self.renderer is None:
+            if the_snake.tile_atlas is None:
+                the_snake.init_display()
+            size = (the_snake.SCREEN_WIDTH, the_snake.SCREEN_HEIGHT)
+            self.frame = np.zeros((size[1], size[0], 4), np.uint8)
+            self.surface = pg.image.frombuffer(self.frame, size, 'RGBX')
+            self.renderer = the_snake.make_renderer(self.state)
+
+        screen, the_snake.screen = the_snake.screen, self.surface
+        try:
+            self.renderer.render()
+        finally:
+            the_snake.screen = screen
+
+        return self.frame[:, :, :3]
+
+
+class VectorSnakeEnv():
+    """Несколько сред {SnakeEnv} с общим массивом наблюдений.
+
+    Наблюдения всех сред - строки массива {observations} формы
+    (N, H, W), а награды и признаки завершения пишутся в заранее
+    выделенные массивы. Обрезанная по тикам среда сразу начинает новую
+    партию, сброшенную движок расставляет заново сам.
+    """
+
+    def __init__(self,
+                 seeds: Sequence[int],
+                 width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT,
+                 count_apples: int = DEFAULT_COUNT_APPLES,
+                 count_stones: int = DEFAULT_COUNT_STONES,
+                 max_ticks: int = DEFAULT_MAX_TICKS) -> None:
+        """Создаёт по среде на каждое зерно из {seeds}."""
+        count = len(seeds)
+        self.observations = np.zeros((count, height, width), np.uint8)
+        self.rewards = np.zeros(count, np.float64)
+        self.terminated = np.zeros(count, bool)
+        self.truncated = np.zeros(count, bool)
+        self.envs = [
+            SnakeEnv(width, height, count_apples, count_stones, max_ticks,
+                     seed=seed, observation=self.observations[number])
+            for number, seed in enumerate(seeds)
+        ]
+
+    def reset(self, seeds: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Начинает новые партии во всех средах."""
+        for number, env in enumerate(self.envs):
+            env.reset(None if seeds is None else seeds[number])
+
+        return self.observations
+
+    def step(self, actions: Sequence[int]
+             ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Продвигает каждую среду на тик с её действием из {actions} и
+        возвращает наблюдения, награды и признаки завершения и обрезки.
+        """
+        rewards, terminated = self.rewards, self.terminated
+        truncated = self.truncated
+        for number, (env, action) in enumerate(zip(self.envs, actions)):
+            _, rewards[number], terminated[number], truncated[number], _ = (
+                env.step(int(action))
+            )
+            if truncated[number]:
+                env.reset()
+
+        return self.observations, rewards, terminated, truncated
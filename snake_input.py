@@ -0,0 +1,86 @@
+"""Буфер поворотов между тиками.
+
+Нажатия стрелок приходят событиями чаще, чем идут тики: за один тик
+игрок может успеть нажать вверх и сразу влево. {TurnQueue} копит такие
+повороты в очереди длиной {TURN_QUEUE_SIZE} и отдаёт по одному на тик,
+поэтому быстрая серия поворотов не склеивается в один и не теряется.
+Повтор направления и разворот на 180 градусов относительно предыдущего
+поворота в очередь не попадают.
+
+Для каждого поворота запоминается время нажатия; когда поворот
+применяется на тике, задержка от нажатия до хода попадает в скользящее
+окно из {LATENCY_WINDOW} последних поворотов, по которому считаются
+перцентили {PERCENTILES}.
+"""
+from collections import deque
+from time import perf_counter
+from typing import Optional
+
+from snake_engine import OPPOSITE
+from snake_profiler import PERCENTILES, percentile
+
+"""Сколько поворотов можно нажать наперёд."""
+TURN_QUEUE_SIZE = 3
+
+"""Сколько последних поворотов учитывается в задержке."""
+LATENCY_WINDOW = 600
+
+
+class TurnQueue():
+    """Очередь поворотов {turns} из пар (направление, время нажатия) и
+    задержки {latencies} применённых поворотов в секундах.
+    """
+
+    def __init__(self, size: int = TURN_QUEUE_SIZE,
+                 window: int = LATENCY_WINDOW,
+                 timer=perf_counter) -> None:
+        """Инициализирует экземпляр класса."""
+        self.size = size
+        self.timer = timer
+        self.turns: deque[tuple[tuple[int, int], float]] = deque()
+        self.latencies: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        """Возвращает количество поворотов в очереди."""
+        return len(self.turns)
+
+    def push(self, direction: tuple[int, int],
+             heading: tuple[int, int]) -> bool:
+        """Ставит поворот {direction} в очередь. {heading} - текущее
+        направление змейки, с ним сравнивается поворот, если очередь
+        пуста. Возвращает {False}, если поворот ничего не меняет или
+        очередь заполнена.
+        """
+        if self.turns:
+            heading = self.turns[-1][0]
+        if (direction in (heading, OPPOSITE[heading])
+                or len(self.turns) >= self.size):
+            return False
+
+        self.turns.append((direction, self.timer()))
+        return True
+
+    def pop(self) -> Optional[tuple[int, int]]:
+        """Забирает поворот для очередного тика и запоминает его
+        задержку. Возвращает {None}, если поворотов нет.
+        """
+        if not self.turns:
+            return None
+
+        direction, pressed = self.turns.popleft()
+        self.latencies.append(self.timer() - pressed)
+        return direction
+
+    def clear(self) -> None:
+        """Забывает нажатые повороты, например при открытии меню."""
+        self.turns.clear()
+
+    def stats(self) -> dict[str, float]:
+        """Возвращает перцентили задержки от нажатия до хода в
+        миллисекундах.
+        """
+        values = sorted(self.latencies)
+        return {
+            f'p{percent}': percentile(values, percent) * 1000
+            for percent in PERCENTILES
+        }
@@ -0,0 +1,352 @@
+"""Генератор уровней с гарантией достижимости яблок.
+
+Уровень строится за три шага. Сначала камни ставятся в различные
+свободные клетки, выбранные одной выборкой {sample_ranks} по индексу
+свободных клеток {FreeCells}. Затем заливкой от клетки змейки
+находится область, куда змейка может дойти, не задевая камней, с учётом
+замкнутости поля. Наконец, яблоки выбираются так же, одной выборкой, но
+только среди свободных клеток этой области, поэтому каждое яблоко
+достижимо со старта. Если камни отрезали змейке слишком тесную область,
+камни расставляются заново, не больше {LEVEL_ATTEMPTS} раз.
+
+Заливка идёт не по клеткам, а по отрезкам строк между камнями: отрезки
+строятся по отсортированным клеткам камней, а соседние отрезки в строках
+выше и ниже находятся двоичным поиском. Поэтому время заливки зависит
+от числа камней и строк, а не от площади поля.
+
+Съеденные яблоки и задетые камни переносятся тоже только в эту
+область. Она запоминается при расстановке как маска клеток
+{LevelState.region} и дальше правится на месте: клетка, которую
+покинул камень, присоединяется к области, если граничит с ней, а камень
+ставится только туда, где он не разрежет область, что проверяется по
+восьми соседним клеткам {RING}. Карманы, открытые сдвинутым камнем, в
+маску не попадают, поэтому маска не шире настоящей области, а перенос
+препятствия не зависит от размера поля.
+
+Плотность уровня задаётся пресетами {DENSITIES}: доля клеток поля под
+яблоками и под камнями.
+"""
+import random
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, islice
+from typing import NamedTuple, Optional
+
+from snake_engine import (APPLE, DEFAULT_STONE_WEIGHT, GRID_HEIGHT,
+                          GRID_WIDTH, STONE, GameState, Obstacle,
+                          ObstacleStore, Snake, clear_field)
+
+
+class Density(NamedTuple):
+    """Доли клеток поля под яблоками {apples} и камнями {stones}."""
+
+    apples: float
+    stones: float
+
+
+"""Пресеты плотности уровня."""
+DENSITIES = {
+    'sparse': Density(0.005, 0.005),
+    'normal': Density(0.02, 0.02),
+    'dense': Density(0.04, 0.1),
+    'rocky': Density(0.02, 0.3),
+}
+DEFAULT_DENSITY = 'normal'
+
+"""Сколько раз расставляются камни, прежде чем уровень признаётся
+невозможным."""
+LEVEL_ATTEMPTS = 10
+
+"""Сколько случайных свободных клеток проверяется при переносе
+препятствия, прежде чем маска области строится заново заливкой."""
+REGION_ATTEMPTS = 32
+
+"""Смещения восьми соседних клеток по кругу, начиная с верхней; соседи
+по стороне стоят на чётных местах."""
+RING = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0),
+        (-1, -1))
+
+
+def level_counts(width: int, height: int,
+                 density: Density) -> tuple[int, int]:
+    """Возвращает количество яблок и камней для поля {width}x{height}
+    с плотностью {density}. Хотя бы одно яблоко на поле есть всегда.
+    """
+    size = width * height
+    return (max(1, round(size * density.apples)),
+            round(size * density.stones))
+
+
+def sample_ranks(rng: random.Random, population: int,
+                 count: int) -> list[int]:
+    """Возвращает {count} различных случайных чисел из
+    range({population}). Числа берутся пачкой из {rng.randbytes} и
+    повторы отбрасываются; недостающие числа добираются следующей пачкой.
+    Смещение от взятия остатка 64-битного числа пренебрежимо мало.
+    """
+    picked: dict[int, None] = {}
+    while len(picked) < count:
+        need = count - len(picked)
+        values = array('Q', rng.randbytes(8 * (need + need // 8 + 1)))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        picked.update(dict.fromkeys(value % population for value in values))
+
+    return list(islice(picked, count))
+
+
+def sample_free_cells(state: GameState, count: int) -> list[int]:
+    """Возвращает номера {count} различных случайных свободных клеток,
+    выбранных за один проход.
+    """
+    cells = state.free_cells.cells
+    return [cells[slot] for slot in
+            sample_ranks(state.rng, len(state.free_cells), count)]
+
+
+def open_runs(width: int, height: int,
+              blocked: list[int]) -> list[tuple[list[int], list[int]]]:
+    """Возвращает для каждой строки поля {width}x{height} начала и концы
+    отрезков без клеток с номерами {blocked}, по возрастанию.
+    """
+    starts: list[list[int]] = [[0] for _ in range(height)]
+    ends: list[list[int]] = [[] for _ in range(height)]
+    for index in sorted(blocked):
+        row, column = divmod(index, width)
+        if starts[row][-1] == column:
+            starts[row][-1] = column + 1
+        else:
+            ends[row].append(column)
+            starts[row].append(column + 1)
+    for row_starts, row_ends in zip(starts, ends):
+        if row_starts[-1] == width:
+            row_starts.pop()
+        else:
+            row_ends.append(width)
+
+    return list(zip(starts, ends))
+
+
+def reachable_runs(rows: list[tuple[list[int], list[int]]], width: int,
+                   start: tuple[int, int]) -> list[tuple[int, int, int]]:
+    """Возвращает отрезки (строка, начало, конец) из {rows}, связанные
+    с клеткой {start} с учётом замкнутости поля. Клетка {start} должна
+    лежать в одном из отрезков.
+    """
+    height = len(rows)
+    seen = [bytearray(len(starts)) for starts, _ in rows]
+    first = (start[1], bisect_right(rows[start[1]][0], start[0]) - 1)
+    seen[first[0]][first[1]] = 1
+    queue = [first]
+    for row, run in queue:
+        starts, ends = rows[row]
+        begin, end = starts[run], ends[run]
+        if not begin or end == width:
+            marks, last = seen[row], len(ends) - 1
+            if not begin and ends[last] == width and not marks[last]:
+                marks[last] = 1
+                queue.append((row, last))
+            if end == width and not starts[0] and not marks[0]:
+                marks[0] = 1
+                queue.append((row, 0))
+        for other in ((row - 1) % height, (row + 1) % height):
+            other_starts, other_ends = rows[other]
+            marks, count = seen[other], len(other_starts)
+            index = bisect_right(other_ends, begin)
+            while index < count and other_starts[index] < end:
+                if not marks[index]:
+                    marks[index] = 1
+                    queue.append((other, index))
+                index += 1
+
+    return [(row, rows[row][0][run], rows[row][1][run]) for row, run in queue]
+
+
+def run_cell(runs: list[tuple[int, int, int]], bounds: list[int],
+             width: int, rank: int) -> int:
+    """Возвращает номер клетки, которая идёт под номером {rank} в
+    отрезках {runs} с накопленными длинами {bounds}.
+    """
+    run = bisect_right(bounds, rank)
+    row, _, end = runs[run]
+    return row * width + end - (bounds[run] - rank)
+
+
+def runs_mask(state: GameState,
+              runs: list[tuple[int, int, int]]) -> bytearray:
+    """Возвращает для каждой клетки поля 1, если она лежит в одном из
+    отрезков {runs}, и 0 иначе.
+    """
+    width = state.width
+    mask = bytearray(state.field_size)
+    for row, begin, end in runs:
+        mask[row * width + begin:row * width + end] = b'\x01' * (end - begin)
+    return mask
+
+
+def region_mask(state: GameState) -> bytearray:
+    """Возвращает маску области, достижимой от головы змейки в обход
+    камней, заливкой по текущим клеткам камней.
+    """
+    width, obstacles = state.width, state.obstacles
+    stones = [pos_y * width + pos_x for pos_x, pos_y, code in
+              zip(obstacles.xs, obstacles.ys, obstacles.codes)
+              if code >= STONE]
+    return runs_mask(state, reachable_runs(
+        open_runs(width, state.height, stones), width,
+        state.snake.get_head_position()
+    ))
+
+
+def keeps_region(state: GameState, cell: tuple[int, int]) -> bool:
+    """Проверяет, что камень в клетке {cell} не разрежет область: все
+    соседние по стороне клетки без камней связаны друг с другом через
+    восемь соседних клеток {RING}.
+    """
+    width, height, grid = state.width, state.height, state.grid
+    pos_x, pos_y = cell
+    ring = [
+        grid[(pos_y + delta_y) % height * width + (pos_x + delta_x) % width]
+        < STONE for delta_x, delta_y in RING
+    ]
+    if all(ring):
+        return True
+
+    start, arcs, counted = ring.index(False), 0, False
+    for offset in range(1, len(RING) + 1):
+        index = (start + offset) % len(RING)
+        if not ring[index]:
+            counted = False
+        elif not index % 2 and not counted:
+            arcs, counted = arcs + 1, True
+    return arcs <= 1
+
+
+def joins_region(state: GameState, region: bytearray,
+                 cell: tuple[int, int]) -> bool:
+    """Проверяет, граничит ли клетка {cell} по стороне с областью
+    {region}.
+    """
+    width, height = state.width, state.height
+    pos_x, pos_y = cell
+    return any(
+        region[(pos_y + delta_y) % height * width + (pos_x + delta_x) % width]
+        for delta_x, delta_y in RING[::2]
+    )
+
+
+def place(state: GameState, code: int, cells: list[int]) -> None:
+    """Ставит препятствия с кодом клетки {code} в клетки с номерами
+    {cells}.
+    """
+    state.obstacles.extend(code, cells)
+    state.occupy_all(cells, code)
+
+
+def place_apples(state: GameState, snake: Snake,
+                 stones: list[int]) -> list[tuple[int, int, int]]:
+    """Ставит {state.count_apples} яблок в свободные клетки, достижимые
+    от змейки {snake} в обход камней в клетках {stones}. Возвращает
+    отрезки достижимой области или пустой список, если свободных клеток
+    в ней не хватает.
+    """
+    width = state.width
+    runs = reachable_runs(open_runs(width, state.height, stones), width,
+                          snake.position)
+    bounds = list(accumulate(end - begin for _, begin, end in runs))
+    head_x, head_y = snake.position
+    head_rank = next(
+        bound - end + head_x
+        for (row, begin, end), bound in zip(runs, bounds)
+        if row == head_y and begin <= head_x < end
+    )
+    if bounds[-1] - 1 < state.count_apples:
+        return []
+
+    cells = [
+        run_cell(runs, bounds, width, rank + (rank >= head_rank))
+        for rank in sample_ranks(state.rng, bounds[-1] - 1,
+                                 state.count_apples)
+    ]
+    place(state, APPLE, cells)
+    return runs
+
+
+def build_level(state: GameState) -> tuple[Snake, list]:
+    """Расставляет змейку, {state.count_stones} камней и
+    {state.count_apples} достижимых яблок на пустом поле и возвращает
+    змейку и отрезки достижимой области. Если за {LEVEL_ATTEMPTS}
+    попыток это не удаётся, бросает {ValueError}.
+    """
+    for _ in range(LEVEL_ATTEMPTS):
+        snake = clear_field(state)
+        stones = sample_free_cells(state, state.count_stones)
+        place(state, STONE + DEFAULT_STONE_WEIGHT, stones)
+        runs = place_apples(state, snake, stones)
+        if runs:
+            return snake, runs
+
+    raise ValueError('Камни отрезают змейке слишком тесную область поля')
+
+
+def generate_level(state: GameState) -> tuple[Snake, ObstacleStore]:
+    """Строит уровень {build_level} и возвращает змейку и препятствия."""
+    snake, _ = build_level(state)
+    return snake, state.obstacles
+
+
+class LevelState(GameState):
+    """Партия на уровне из {generate_level} с плотностью {density} -
+    названием пресета из {DENSITIES}. {region} - маска области,
+    куда переносятся препятствия, или {None}, если её нужно построить
+    заново.
+    """
+
+    def __init__(self,
+                 width: int = GRID_WIDTH,
+                 height: int = GRID_HEIGHT,
+                 density: str = DEFAULT_DENSITY,
+                 seed: Optional[int] = None) -> None:
+        """Инициализирует экземпляр класса и строит уровень."""
+        self.density = density
+        self.region: Optional[bytearray] = None
+        super().__init__(width, height,
+                         *level_counts(width, height, DENSITIES[density]),
+                         seed)
+
+    def lay_out(self) -> None:
+        """Строит уровень вместо случайной расстановки препятствий и
+        запоминает маску достижимой области.
+        """
+        self.snake, runs = build_level(self)
+        self.region = runs_mask(self, runs)
+
+    def respawn_cell(self, obstacle: Obstacle) -> tuple[int, int]:
+        """Возвращает случайную свободную клетку области {region} для
+        препятствия {obstacle}, а для камня - клетку, где он не
+        разрежет область. Клетка, которую покидает камень, присоединяется
+        к области. Если за {REGION_ATTEMPTS} попыток клетка не нашлась,
+        возвращается последняя выбранная, а маска строится заново при
+        следующем переносе.
+        """
+        region = self.region
+        if region is None:
+            region = self.region = region_mask(self)
+        width = self.width
+        stone = obstacle.cell_code() >= STONE
+        if stone and joins_region(self, region, obstacle.position):
+            pos_x, pos_y = obstacle.position
+            region[pos_y * width + pos_x] = 1
+
+        for _ in range(REGION_ATTEMPTS):
+            cell = self.free_cells.choice(self.rng)
+            index = cell[1] * width + cell[0]
+            if not region[index] or stone and not keeps_region(self, cell):
+                continue
+            if stone:
+                region[index] = 0
+            return cell
+
+        self.region = None
+        return cell
@@ -0,0 +1,311 @@
+"""Карты змейки: заранее расставленные поля, одинаковые между запусками.
+
+Карта - двоичный файл: заголовок {HEADER} с размером поля и зерном,
+затем сетка клеток по байту на клетку в тех же кодах, что и сетка
+занятости партии {GameState.grid} ({EMPTY}, {APPLE}, {STONE} плюс вес
+камня). Код {SNAKE} отмечает клетку, с которой стартует змейка; если
+такой клетки нет, змейка стартует в центре поля.
+
+{open_map} отображает файл в память через {mmap} и ничего не разбирает:
+сетка карты - это представление {memoryview} прямо поверх файла.
+Отображение живёт, пока карту не закроют {GameMap.close} или
+{MapState.close}; карта - контекстный менеджер. При
+расстановке {MapState} она копируется в сетку партии целиком, а записи
+препятствий и индекс свободных клеток строятся только по непустым
+клеткам, которые {map_cells} один раз находит поиском по сетке. Поэтому
+карта на миллионы клеток открывается мгновенно, а её расстановка стоит
+одно копирование сетки и проход по препятствиям.
+
+Карты можно писать руками в текстовом формате: первая строка - зерно
+вида {TEXT_SEED}, дальше по строке поля на ряд клеток, где {TEXT_CELLS}
+задаёт символы клеток, а цифра - камень такого веса. Запуск модуля
+переводит карты из одного формата в другой и сохраняет в карту
+сгенерированный уровень из {snake_levels}.
+"""
+import argparse
+import mmap
+import os
+import re
+import struct
+from typing import NamedTuple, Optional
+
+from snake_engine import (APPLE, EMPTY, GRID_HEIGHT, GRID_WIDTH, SNAKE, STONE,
+                          FreeCells, GameState, ObstacleStore, Snake)
+from snake_levels import DEFAULT_DENSITY, DENSITIES, LevelState
+
+"""Формат карты: сигнатура, версия, ширина и высота поля, зерно."""
+MAGIC = b'SNKM'
+VERSION = 1
+HEADER = struct.Struct('<4sBHHQ')
+
+"""Символы клеток текстового формата; камни записываются цифрой веса."""
+TEXT_CELLS = {'.': EMPTY, 'S': SNAKE, '*': APPLE}
+TEXT_SEED = 'seed {seed}'
+MAX_TEXT_WEIGHT = 9
+
+"""Таблицы перевода символов текстового формата в коды клеток и
+обратно. Символ {TEXT_INVALID} отмечает то, что перевести нельзя."""
+TEXT_INVALID = b'?'
+TEXT_TO_CODES = bytearray(TEXT_INVALID * 256)
+CODES_TO_TEXT = bytearray(TEXT_INVALID * 256)
+for char, code in [*TEXT_CELLS.items(),
+                   *((str(weight), STONE + weight)
+                     for weight in range(MAX_TEXT_WEIGHT + 1))]:
+    TEXT_TO_CODES[ord(char)] = code
+    CODES_TO_TEXT[code] = ord(char)
+
+
+class GameMap(NamedTuple):
+    """Карта поля {width}x{height} с зерном {seed} и сеткой клеток
+    {cells} по байту на клетку.
+    """
+
+    width: int
+    height: int
+    seed: int
+    cells: memoryview
+
+    def __enter__(self) -> 'GameMap':
+        """Возвращает саму карту."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Закрывает карту при выходе из блока {with}."""
+        self.close()
+
+    def close(self) -> None:
+        """Отпускает сетку карты и, если карта открыта {open_map},
+        закрывает отображение файла. После этого сетку читать нельзя.
+        """
+        data = self.cells.obj
+        self.cells.release()
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def read_header(data) -> tuple[int, int, int]:
+    """Проверяет заголовок карты {data} и возвращает ширину и высоту
+    поля и зерно.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError('Карта обрезана')
+
+    magic, version, width, height, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Неизвестный формат карты')
+    if len(data) != HEADER.size + width * height:
+        raise ValueError('Размер сетки карты не совпадает с заголовком')
+
+    return width, height, seed
+
+
+def read_map(data) -> GameMap:
+    """Возвращает карту из буфера {data} без копирования сетки."""
+    width, height, seed = read_header(data)
+    return GameMap(width, height, seed, memoryview(data)[HEADER.size:])
+
+
+def open_map(path) -> GameMap:
+    """Открывает карту из файла {path}, отображая его в память. Сетка
+    карты читается с диска по мере обращения к ней.
+    """
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return read_map(data)
+    except ValueError:
+        data.close()
+        raise
+
+
+def pack_map(width: int, height: int, seed: int, cells) -> bytes:
+    """Возвращает карту поля {width}x{height} с зерном {seed} и сеткой
+    {cells}.
+    """
+    return HEADER.pack(MAGIC, VERSION, width, height, seed) + bytes(cells)
+
+
+def save_map(data: bytes, path) -> None:
+    """Сохраняет карту {data} в файл {path}. Карта сначала пишется во
+    временный файл, поэтому прерванная запись не портит старую карту.
+    """
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def take_map(state: GameState) -> bytes:
+    """Возвращает карту с расстановкой партии {state}: препятствия на
+    своих местах, а змейка - клеткой старта на месте головы.
+    """
+    cells = bytearray(state.grid)
+    width = state.width
+    for pos_x, pos_y in state.snake.positions:
+        cells[pos_y * width + pos_x] = EMPTY
+    head_x, head_y = state.snake.get_head_position()
+    cells[head_y * width + head_x] = SNAKE
+    return pack_map(width, state.height, state.seed, cells)
+
+
+def text_to_map(text: str) -> bytes:
+    """Возвращает карту, записанную текстом {text}."""
+    header, *lines = text.splitlines() or ['']
+    match = re.fullmatch(TEXT_SEED.format(seed=r'(\d+)'), header.strip())
+    if match is None:
+        raise ValueError('Карта должна начинаться с зерна вида «seed N»')
+
+    rows = [line.strip() for line in lines if line.strip()]
+    if not rows or any(len(row) != len(rows[0]) for row in rows):
+        raise ValueError('Строки поля карты должны быть одной длины')
+
+    cells = ''.join(rows).encode('ascii', 'replace').translate(
+        TEXT_TO_CODES
+    )
+    if TEXT_INVALID in cells:
+        raise ValueError('Неизвестный символ клетки в карте')
+
+    return pack_map(len(rows[0]), len(rows), int(match[1]), cells)
+
+
+def map_to_text(game_map: GameMap) -> str:
+    """Возвращает карту {game_map} текстом."""
+    chars = bytes(game_map.cells).translate(CODES_TO_TEXT)
+    if TEXT_INVALID in chars:
+        raise ValueError(
+            f'Камни тяжелее {MAX_TEXT_WEIGHT} текстом не записать'
+        )
+
+    width = game_map.width
+    rows = [chars[start:start + width].decode('ascii')
+            for start in range(0, len(chars), width)]
+    return '\n'.join([TEXT_SEED.format(seed=game_map.seed), *rows, ''])
+
+
+def map_cells(game_map: GameMap) -> dict[int, list[int]]:
+    """Возвращает номера непустых клеток карты {game_map} по кодам
+    клеток. Коды на карте находятся удалением пустых клеток из сетки, а
+    клетки каждого кода - поиском этого кода по сетке, так что пустые
+    клетки не перебираются по одной.
+    """
+    cells = game_map.cells
+    codes = set(cells.tobytes().translate(None, bytes([EMPTY])))
+    groups = {
+        code: [match.start() for match in
+               re.finditer(re.escape(bytes([code])), cells)]
+        for code in sorted(codes)
+    }
+    if len(groups.get(SNAKE, ())) > 1:
+        raise ValueError('На карте больше одной клетки старта змейки')
+
+    return groups
+
+
+def lay_out_map(state: GameState, game_map: GameMap,
+                groups: dict[int, list[int]]) -> tuple[Snake, ObstacleStore]:
+    """Расставляет змейку и препятствия партии {state} по карте
+    {game_map} с непустыми клетками {groups} из {map_cells}: сетка карты
+    копируется в сетку занятости целиком, а записи препятствий строятся
+    по непустым клеткам. Направление змейки выбирается случайно.
+    """
+    grid = getattr(state, 'grid', None)
+    if grid is None:
+        state.grid = bytearray(game_map.cells)
+    else:
+        grid[:] = game_map.cells
+    state.free_cells = FreeCells(state.width, state.height)
+    state.obstacles = state.new_obstacles()
+    state.redraw_all = True
+
+    for code, indices in groups.items():
+        if code != SNAKE:
+            state.obstacles.extend(code, indices)
+            state.free_cells.take_all(indices)
+    state.count_apples = len(groups.get(APPLE, ()))
+    state.count_stones = len(state.obstacles) - state.count_apples
+
+    return start_snake(state, groups.get(SNAKE, [])), state.obstacles
+
+
+def start_snake(state: GameState, starts: list[int]) -> Snake:
+    """Ставит змейку в клетку старта из {starts}, а если её нет - в
+    центр поля или, если центр занят, в случайную свободную клетку.
+    """
+    if starts:
+        pos_y, pos_x = divmod(starts[0], state.width)
+        position = (pos_x, pos_y)
+    else:
+        position = (state.width // 2, state.height // 2)
+        if position not in state.free_cells:
+            position = state.free_cells.choice(state.rng)
+
+    snake = state.snake_type(position=position)
+    snake.reset(state.rng)
+    state.occupy(snake.position, SNAKE)
+    return snake
+
+
+class MapState(GameState):
+    """Партия на карте {game_map}: при каждом сбросе препятствия
+    возвращаются на места из карты, а не расставляются случайно.
+    Непустые клетки карты {groups} ищутся один раз при создании партии.
+    Если зерно {seed} не передано, берётся зерно карты, в том числе при
+    новой партии из {reset_game}.
+    """
+
+    def __init__(self, game_map: GameMap,
+                 seed: Optional[int] = None) -> None:
+        """Инициализирует экземпляр класса и расставляет карту."""
+        self.game_map = game_map
+        self.groups = map_cells(game_map)
+        super().__init__(game_map.width, game_map.height, 0, 0, seed)
+
+    def default_seed(self) -> int:
+        """Возвращает зерно карты."""
+        return self.game_map.seed
+
+    def close(self) -> None:
+        """Закрывает карту партии: сбрасывать партию после этого нельзя."""
+        self.game_map.close()
+
+    def lay_out(self) -> None:
+        """Расставляет объекты по карте вместо случайной расстановки."""
+        self.snake, self.obstacles = lay_out_map(self, self.game_map,
+                                                 self.groups)
+
+
+def main() -> None:
+    """Переводит карты между двоичным и текстовым форматом и сохраняет
+    сгенерированные уровни картами.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    to_text = commands.add_parser('to-text', help='карта в текст')
+    to_text.add_argument('source')
+    to_text.add_argument('target')
+    from_text = commands.add_parser('from-text', help='текст в карту')
+    from_text.add_argument('source')
+    from_text.add_argument('target')
+    generate = commands.add_parser('generate', help='уровень в карту')
+    generate.add_argument('target')
+    generate.add_argument('--width', type=int, default=GRID_WIDTH)
+    generate.add_argument('--height', type=int, default=GRID_HEIGHT)
+    generate.add_argument('--density', choices=DENSITIES,
+                          default=DEFAULT_DENSITY)
+    generate.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'to-text':
+        with (open_map(args.source) as game_map,
+              open(args.target, 'w', encoding='ascii') as file):
+            file.write(map_to_text(game_map))
+    elif args.command == 'from-text':
+        with open(args.source, encoding='ascii') as file:
+            save_map(text_to_map(file.read()), args.target)
+    else:
+        state = LevelState(args.width, args.height, args.density, args.seed)
+        save_map(take_map(state), args.target)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Замеры времени фаз игрового цикла.
+
+{FrameProfiler} делит каждый кадр на фазы {PHASES}: ввод, логику,
+отрисовку и вывод на экран. Время фазы за кадр копится отметками
+{FrameProfiler.mark}, а последние {PROFILE_WINDOW} кадров хранятся
+скользящим окном, по которому считаются перцентили {PERCENTILES}.
+Выключенный профилировщик на каждую отметку тратит одну проверку.
+"""
+import json
+from collections import deque
+from time import perf_counter
+from typing import Optional
+
+"""Фазы кадра. {FRAME} - сумма всех фаз кадра."""
+PHASES = ('input', 'logic', 'draw', 'display')
+FRAME = 'frame'
+
+"""Сколько последних кадров учитывается в перцентилях."""
+PROFILE_WINDOW = 600
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Возвращает перцентиль {percent} отсортированного списка
+    {values} методом ближайшего ранга.
+    """
+    if not values:
+        return 0.0
+
+    rank = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(rank)]
+
+
+class FrameProfiler():
+    """Скользящие гистограммы времени фаз кадра."""
+
+    def __init__(self, enabled: bool = False,
+                 window: int = PROFILE_WINDOW,
+                 timer=perf_counter) -> None:
+        """Инициализирует экземпляр класса."""
+        self.enabled = enabled
+        self.used = enabled
+        self.timer = timer
+        self.frames = 0
+        self.samples: dict[str, deque[float]] = {
+            phase: deque(maxlen=window) for phase in (*PHASES, FRAME)
+        }
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.last: Optional[float] = None
+
+    def toggle(self) -> None:
+        """Включает или выключает замеры. Включённые замеры начинаются
+        с текущего момента.
+        """
+        self.enabled = not self.enabled
+        self.used = self.used or self.enabled
+        self.start()
+
+    def start(self) -> None:
+        """Начинает новый кадр."""
+        if not self.enabled:
+            return
+
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.last = self.timer()
+
+    def mark(self, phase: str) -> None:
+        """Относит время с предыдущей отметки к фазе {phase}."""
+        if not self.enabled:
+            return
+
+        now = self.timer()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end_frame(self) -> None:
+        """Добавляет время фаз завершённого кадра в гистограммы."""
+        if not self.enabled:
+            return
+
+        for phase, elapsed in self.current.items():
+            self.samples[phase].append(elapsed)
+        self.samples[FRAME].append(sum(self.current.values()))
+        self.frames += 1
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Возвращает перцентили времени каждой фазы в миллисекундах."""
+        stats = {}
+        for phase, samples in self.samples.items():
+            values = sorted(samples)
+            stats[phase] = {
+                f'p{percent}': percentile(values, percent) * 1000
+                for percent in PERCENTILES
+            }
+
+        return stats
+
+    def dump(self, path: str,
+             extra: Optional[dict[str, dict[str, float]]] = None) -> None:
+        """Записывает перцентили в файл {path} в формате JSON. {extra} -
+        перцентили других замеров в миллисекундах, которые записываются
+        рядом с фазами кадра.
+        """
+        with open(path, 'w') as file:
+            json.dump({
+                'frames': self.frames,
+                'window': len(self.samples[FRAME]),
+                'milliseconds': {**self.stats(), **(extra or {})},
+            }, file, indent=2)
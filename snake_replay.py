@@ -0,0 +1,322 @@
+"""Запись и воспроизведение партий змейки.
+
+Все случайные решения партии берутся из генератора, созданного по
+зерну {GameState.seed}, поэтому партию полностью задают зерно,
+параметры поля и направление змейки на каждом тике. Запись хранит
+только их: заголовок {HEADER} и по {DIRECTION_BITS} бита на тик -
+индекс направления в {DIRECTIONS}. Час игры при шести тиках в секунду
+занимает около 5 КБ.
+
+{ReplayPlayer} проигрывает запись и перематывает её к любому тику: по
+ходу партии он сохраняет снимки состояния {Keyframe}, поэтому перемотка
+заново разыгрывает не больше одного интервала между снимками. В снимке
+нет сетки занятости: она строится заново по змейке и препятствиям.
+Единственная часть снимка, растущая с полем, - порядок свободных клеток,
+без которого партия после перемотки выбирала бы другие клетки. Поэтому
+интервал {keyframe_interval} растёт с размером поля так, чтобы снимки
+занимали не больше {KEYFRAME_BYTES_PER_TICK} байт на тик записи.
+
+Запуск без окна: python snake_replay.py replays/<зерно>.snkr --tick 1000
+"""
+import argparse
+import struct
+from array import array
+from typing import Iterator, NamedTuple, Optional
+
+from snake_engine import DIRECTIONS, SNAKE, FreeCells, GameState, step
+
+"""Формат файла записи: сигнатура, версия, зерно, ширина и высота поля,
+количество яблок и камней, число записанных тиков."""
+MAGIC = b'SNKR'
+VERSION = 1
+HEADER = struct.Struct('<4sBQHHHHI')
+
+"""Упаковка направлений: по два бита на тик, четыре тика в байте."""
+DIRECTION_BITS = 2
+TICKS_PER_BYTE = 8 // DIRECTION_BITS
+DIRECTION_MASK = (1 << DIRECTION_BITS) - 1
+DIRECTION_CODES = {
+    direction: code for code, direction in enumerate(DIRECTIONS)
+}
+
+"""Через сколько тиков {ReplayPlayer} сохраняет снимок партии на
+небольших полях и сколько байт снимков на тик записи допускается на
+больших."""
+KEYFRAME_INTERVAL = 256
+KEYFRAME_BYTES_PER_TICK = 64
+
+
+class Replay(NamedTuple):
+    """Запись партии: зерно, параметры поля и упакованные направления
+    змейки {moves} на каждом из {ticks} тиков.
+    """
+
+    seed: int
+    width: int
+    height: int
+    count_apples: int
+    count_stones: int
+    ticks: int
+    moves: bytes
+
+    def codes(self) -> bytes:
+        """Возвращает индексы направлений в {DIRECTIONS}, по байту на
+        тик.
+        """
+        codes = bytearray(self.ticks)
+        for tick in range(self.ticks):
+            byte = self.moves[tick // TICKS_PER_BYTE]
+            shift = tick % TICKS_PER_BYTE * DIRECTION_BITS
+            codes[tick] = byte >> shift & DIRECTION_MASK
+
+        return bytes(codes)
+
+    def directions(self) -> Iterator[tuple[int, int]]:
+        """Возвращает направления змейки по тикам."""
+        for code in self.codes():
+            yield DIRECTIONS[code]
+
+    def to_bytes(self) -> bytes:
+        """Возвращает запись в двоичном формате."""
+        return HEADER.pack(
+            MAGIC, VERSION, self.seed, self.width, self.height,
+            self.count_apples, self.count_stones, self.ticks
+        ) + self.moves
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Replay':
+        """Читает запись из двоичного формата {to_bytes}."""
+        if len(data) < HEADER.size:
+            raise ValueError('Запись партии обрезана')
+
+        magic, version, *fields, ticks = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Неизвестный формат записи партии')
+
+        moves = bytes(data[HEADER.size:])
+        if len(moves) != -(-ticks // TICKS_PER_BYTE):
+            raise ValueError('Запись партии обрезана')
+
+        return cls(*fields, ticks, moves)
+
+
+class ReplayRecorder():
+    """Записывает партию {state}, пока она продвигается через {step}.
+
+    Запись тика - это добавление или дописывание одного байта, так что
+    на время кадра она не влияет.
+    """
+
+    def __init__(self, state: GameState, enabled: bool = True) -> None:
+        """Инициализирует экземпляр класса и начинает запись партии."""
+        self.start(state, enabled)
+
+    def start(self, state: GameState, enabled: bool = True) -> None:
+        """Начинает новую запись с текущего состояния партии {state}.
+        Вызывается сразу после того, как партия расставлена заново.
+        Партию, продолженную не с начала (например, из сохранения),
+        заново разыграть по зерну нельзя, и для неё запись выключается
+        через {enabled}.
+        """
+        self.params = (state.seed, state.width, state.height,
+                       state.count_apples, state.count_stones)
+        self.enabled = enabled
+        self.ticks = 0
+        self.moves = bytearray()
+
+    def record(self, direction: tuple[int, int]) -> None:
+        """Дописывает в запись направление змейки на очередном тике."""
+        if not self.enabled:
+            return
+
+        shift = self.ticks % TICKS_PER_BYTE * DIRECTION_BITS
+        if shift:
+            self.moves[-1] |= DIRECTION_CODES[direction] << shift
+        else:
+            self.moves.append(DIRECTION_CODES[direction])
+        self.ticks += 1
+
+    def step(self, state: GameState) -> bool:
+        """Записывает направление змейки и продвигает партию на тик."""
+        self.record(state.snake.direction)
+        return step(state)
+
+    def replay(self) -> Replay:
+        """Возвращает то, что записано к этому моменту."""
+        return Replay(*self.params, self.ticks, bytes(self.moves))
+
+
+def save_replay(replay: Replay, path) -> None:
+    """Сохраняет запись партии в файл {path}."""
+    with open(path, 'wb') as file:
+        file.write(replay.to_bytes())
+
+
+def load_replay(path) -> Replay:
+    """Загружает запись партии из файла {path}."""
+    with open(path, 'rb') as file:
+        return Replay.from_bytes(file.read())
+
+
+def play_replay(replay: Replay, state_type=GameState) -> GameState:
+    """Заново разыгрывает запись {replay} и возвращает итоговое
+    состояние партии типа {state_type}.
+    """
+    state = state_type(replay.width, replay.height, replay.count_apples,
+                       replay.count_stones, seed=replay.seed)
+    for direction in replay.directions():
+        state.snake.update_direction(direction)
+        step(state)
+
+    return state
+
+
+def keyframe_interval(field_size: int) -> int:
+    """Возвращает интервал между снимками для поля из {field_size}
+    клеток: не меньше {KEYFRAME_INTERVAL} тиков и такой, чтобы порядок
+    свободных клеток занимал не больше {KEYFRAME_BYTES_PER_TICK} байт на
+    тик.
+    """
+    itemsize = array('i').itemsize
+    return max(KEYFRAME_INTERVAL,
+               -(-field_size * itemsize // KEYFRAME_BYTES_PER_TICK))
+
+
+class Keyframe(NamedTuple):
+    """Снимок партии на тике {tick}: тело и направление змейки,
+    препятствия с кодами их клеток, порядок свободных клеток
+    {FreeCells.order}, счётчики и состояние генератора случайных чисел.
+    """
+
+    tick: int
+    snake: tuple[tuple[int, int], ...]
+    direction: tuple[int, int]
+    last: Optional[tuple[int, int]]
+    obstacles: tuple[tuple[tuple[int, int], int], ...]
+    free_cells: array
+    eaten_apples: int
+    resets: int
+    rng_state: tuple
+
+
+def take_keyframe(state: GameState, tick: int) -> Keyframe:
+    """Снимает снимок партии {state} на тике {tick}."""
+    snake = state.snake
+    return Keyframe(
+        tick, tuple(snake.positions), snake.direction, snake.last,
+        tuple(zip(state.obstacles.positions(), state.obstacles.codes)),
+        state.free_cells.order(), state.eaten_apples, state.resets,
+        state.rng.getstate()
+    )
+
+
+def restore_keyframe(state: GameState, keyframe: Keyframe) -> None:
+    """Возвращает партию {state} в состояние снимка {keyframe}. Объекты
+    создаются заново из {state.snake_type}, {state.apple_type} и
+    {state.stone_type}, поэтому их можно сразу рисовать. Сетка
+    занятости строится по ним заново.
+    """
+    snake = state.snake_type(position=keyframe.snake[0])
+    snake.set_body(keyframe.snake)
+    snake.direction = keyframe.direction
+    snake.last = keyframe.last
+
+    grid, width = state.grid, state.width
+    grid[:] = bytes(state.field_size)
+    for pos_x, pos_y in keyframe.snake:
+        grid[pos_y * width + pos_x] = SNAKE
+    obstacles = state.new_obstacles()
+    for position, code in keyframe.obstacles:
+        obstacles.add(code, position)
+        grid[position[1] * width + position[0]] = code
+
+    state.free_cells = FreeCells.from_order(width, state.height,
+                                            keyframe.free_cells)
+    state.snake, state.obstacles = snake, obstacles
+    state.eaten_apples, state.resets = keyframe.eaten_apples, keyframe.resets
+    state.rng.setstate(keyframe.rng_state)
+    state.reset = False
+    state.redraw_all = True
+
+
+class ReplayPlayer():
+    """Проигрыватель записи {replay} с перемоткой.
+
+    При создании запись один раз проигрывается целиком без отрисовки,
+    и каждые {interval} тиков (по умолчанию - {keyframe_interval} для
+    поля записи) сохраняется снимок {Keyframe}. После этого {seek} к
+    любому тику восстанавливает ближайший снимок и разыгрывает не
+    больше {interval} тиков.
+    """
+
+    def __init__(self, replay: Replay, state_type=GameState,
+                 interval: Optional[int] = None) -> None:
+        """Создаёт партию типа {state_type} и снимки записи {replay}."""
+        self.replay = replay
+        self.interval = interval or keyframe_interval(replay.width
+                                                      * replay.height)
+        self.codes = replay.codes()
+        self.state = state_type(replay.width, replay.height,
+                                replay.count_apples, replay.count_stones,
+                                seed=replay.seed)
+        self.tick = 0
+        self.keyframes = [take_keyframe(self.state, 0)]
+        self.advance(replay.ticks)
+        self.seek(0)
+
+    @property
+    def finished(self) -> bool:
+        """Проверяет, проиграна ли запись до конца."""
+        return self.tick >= self.replay.ticks
+
+    def advance(self, count: int = 1) -> int:
+        """Проигрывает до {count} тиков вперёд и возвращает, сколько
+        тиков проиграно на самом деле.
+        """
+        count = min(count, self.replay.ticks - self.tick)
+        state, interval = self.state, self.interval
+        for tick in range(self.tick, self.tick + count):
+            if tick and not tick % interval and (
+                    tick // interval == len(self.keyframes)):
+                self.keyframes.append(take_keyframe(state, tick))
+            state.snake.update_direction(DIRECTIONS[self.codes[tick]])
+            step(state)
+
+        self.tick += count
+        return count
+
+    def seek(self, tick: int) -> None:
+        """Перематывает запись к тику {tick}."""
+        tick = max(0, min(tick, self.replay.ticks))
+        keyframe = self.keyframes[
+            min(tick // self.interval, len(self.keyframes) - 1)
+        ]
+        if tick < self.tick or keyframe.tick > self.tick:
+            restore_keyframe(self.state, keyframe)
+            self.tick = keyframe.tick
+        self.advance(tick - self.tick)
+
+
+def main() -> None:
+    """Без окна перематывает запись к заданному тику и печатает
+    счётчики партии.
+    """
+    parser = argparse.ArgumentParser(description='Проигрывание записи '
+                                                 'партии без окна.')
+    parser.add_argument('path')
+    parser.add_argument('--tick', type=int, default=None,
+                        help='тик, к которому перемотать запись '
+                             '(по умолчанию - конец записи)')
+    args = parser.parse_args()
+
+    replay = load_replay(args.path)
+    player = ReplayPlayer(replay)
+    player.seek(replay.ticks if args.tick is None else args.tick)
+    state = player.state
+    print(f'зерно {replay.seed}, тик {player.tick} из {replay.ticks}, '
+          f'длина {state.snake.length}, яблок {state.eaten_apples}, '
+          f'сбросов {state.resets}')
+
+
+if __name__ == '__main__':
+    main()
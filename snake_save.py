@@ -0,0 +1,293 @@
+"""Сохранение партии змейки между запусками игры.
+
+Снимок партии - небольшой двоичный блок: заголовок {HEADER} с
+параметрами поля, зерном, направлением, счётчиками и контрольной
+суммой, затем номера клеток тела змейки от головы к хвосту в {array},
+номера клеток препятствий и их коды в сетке занятости (код задаёт и
+тип, и вес камня) и состояние генератора случайных чисел партии. Сетка
+занятости и индекс свободных клеток {FreeCells} в снимок не входят и при
+загрузке строятся заново по змейке и препятствиям, поэтому размер
+снимка и время его записи зависят от длины змейки и числа препятствий,
+а не от размера поля.
+
+Индекс свободных клеток собирается заново всегда одинаково, поэтому
+партия, загруженная из снимка, продолжается одинаково при каждой
+загрузке. С партией, которая шла дальше без сохранения, она может
+разойтись: порядок свободных клеток, от которого зависит выбор
+генератора, у неё другой.
+
+Номера клеток хранятся в массиве {array('H')}, если поле не больше
+{SMALL_FIELD_SIZE} клеток, и в {array('I')} на полях больше. Контрольная
+сумма покрывает и заголовок, и данные. Снимок, который не сходится с
+суммой, длиной или размером поля, отвергается с {ValueError} до того,
+как создаётся или меняется партия.
+
+{Autosaver} пишет снимки в файл в фоновом потоке, поэтому автосохранение
+не задерживает кадр игры.
+"""
+import os
+import random
+import struct
+import sys
+import zlib
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from snake_engine import APPLE, DIRECTIONS, SNAKE, FreeCells, GameState
+
+"""Формат снимка: сигнатура, версия, тип массива номеров клеток, ширина
+и высота поля, количество яблок и камней, зерно, индекс направления в
+{DIRECTIONS}, съеденные яблоки, сбросы, длина змейки, число препятствий
+и {zlib.crc32} заголовка без суммы и всего, что идёт после него."""
+MAGIC = b'SNKS'
+VERSION = 3
+HEADER = struct.Struct('<4sBcHHHHQBIIIII')
+CHECKSUM = struct.Struct('<I')
+
+"""Наибольшее поле, номера клеток которого помещаются в {array('H')}."""
+SMALL_FIELD_SIZE = 1 << 16
+
+"""Состояние генератора {random.Random}: 624 слова и позиция в них."""
+RNG_WORDS = 625
+
+
+def cells_typecode(field_size: int) -> str:
+    """Возвращает тип массива для номеров клеток поля из {field_size}
+    клеток.
+    """
+    return 'H' if field_size <= SMALL_FIELD_SIZE else 'I'
+
+
+def pack_array(values: array) -> bytes:
+    """Возвращает массив {values} байтами в порядке little-endian. Сам
+    массив не меняется.
+    """
+    if sys.byteorder == 'big':
+        values = values[:]
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_array(typecode: str, data: bytes, offset: int,
+                 count: int) -> tuple[array, int]:
+    """Читает из {data} с позиции {offset} массив из {count} элементов
+    типа {typecode}. Возвращает массив и позицию после него.
+    """
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    if end > len(data):
+        raise ValueError('Снимок партии обрезан')
+    values.frombytes(memoryview(data)[offset:end])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, end
+
+
+def take_snapshot(state: GameState) -> bytes:
+    """Возвращает снимок партии {state}."""
+    width, field_size = state.width, state.field_size
+    typecode = cells_typecode(field_size)
+    snake = state.snake
+    obstacles = state.obstacles
+
+    body = array(typecode, [pos_y * width + pos_x
+                            for pos_x, pos_y in snake.positions])
+    cells = array(typecode, [
+        pos_y * width + pos_x
+        for pos_x, pos_y in zip(obstacles.xs, obstacles.ys)
+    ])
+    codes = obstacles.codes.tobytes()
+    rng_state = array('I', state.rng.getstate()[1])
+
+    payload = b''.join((
+        pack_array(body), pack_array(cells), codes, pack_array(rng_state)
+    ))
+    header = HEADER.pack(
+        MAGIC, VERSION, typecode.encode(), width, state.height,
+        state.count_apples, state.count_stones, state.seed,
+        DIRECTIONS.index(snake.direction), state.eaten_apples,
+        state.resets, len(body), len(cells), 0
+    )[:-CHECKSUM.size]
+    return header + CHECKSUM.pack(
+        zlib.crc32(payload, zlib.crc32(header))
+    ) + payload
+
+
+def snapshot_size(typecode: str, length: int, count: int) -> int:
+    """Возвращает размер снимка со змейкой длины {length} и {count}
+    препятствиями, номера клеток которых хранятся в массиве типа
+    {typecode}.
+    """
+    itemsize = array(typecode).itemsize
+    return (HEADER.size + itemsize * (length + count) + count
+            + array('I').itemsize * RNG_WORDS)
+
+
+def read_header(data: bytes) -> tuple:
+    """Проверяет заголовок снимка {data}, его длину и контрольную сумму
+    и возвращает поля заголовка без сигнатуры, версии и суммы.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError('Снимок партии обрезан')
+
+    (magic, version, typecode, width, height, count_apples, count_stones,
+     seed, direction, *counters, length, count,
+     checksum) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Неизвестный формат снимка партии')
+    field_size = width * height
+    if not field_size or typecode != cells_typecode(field_size).encode():
+        raise ValueError('Снимок партии повреждён: неверное поле')
+    if len(data) != snapshot_size(typecode.decode(), length, count):
+        raise ValueError('Снимок партии обрезан')
+    prefix = HEADER.size - CHECKSUM.size
+    if zlib.crc32(memoryview(data)[HEADER.size:],
+                  zlib.crc32(memoryview(data)[:prefix])) != checksum:
+        raise ValueError('Снимок партии повреждён: неверная сумма')
+    if (not length or length + count > field_size
+            or count_apples + count_stones != count
+            or direction >= len(DIRECTIONS)):
+        raise ValueError('Снимок партии повреждён: неверные счётчики')
+
+    return (typecode.decode(), width, height, count_apples, count_stones,
+            seed, direction, *counters, length, count)
+
+
+def check_cells(field_size: int, *arrays: array) -> None:
+    """Проверяет, что номера клеток в массивах {arrays} не выходят за
+    поле из {field_size} клеток.
+    """
+    if any(values and max(values) >= field_size for values in arrays):
+        raise ValueError('Снимок партии повреждён: клетка вне поля')
+
+
+def snapshot_grid(field_size: int, body: array, cells: array,
+                  codes: bytes) -> bytearray:
+    """Возвращает сетку занятости поля из {field_size} клеток со змейкой
+    в клетках {body} и препятствиями с кодами {codes} в клетках
+    {cells}. Если объекты снимка делят клетку, бросает {ValueError}.
+    """
+    check_cells(field_size, body, cells)
+    if codes and min(codes) < APPLE:
+        raise ValueError('Снимок партии повреждён: неверный код клетки')
+
+    grid = bytearray(field_size)
+    for index in body:
+        grid[index] = SNAKE
+    for index, code in zip(cells, codes):
+        grid[index] = code
+    if grid.count(0) != field_size - len(body) - len(cells):
+        raise ValueError('Снимок партии повреждён: объекты в одной клетке')
+    return grid
+
+
+def restore_snapshot(state: GameState, data: bytes) -> None:
+    """Возвращает партию {state} в состояние снимка {data}. Размер поля
+    партии должен совпадать с размером поля в снимке. Змейка создаётся
+    заново из {state.snake_type}, препятствия - в новом хранилище
+    {state.new_obstacles}, сетка занятости переписывается на месте, а
+    индекс свободных клеток строится заново по змейке и препятствиям.
+    Повреждённый снимок отвергается с {ValueError} до того, как партия
+    изменится.
+    """
+    (typecode, width, height, count_apples, count_stones, seed,
+     direction, eaten_apples, resets, length, count) = read_header(data)
+    if (width, height) != (state.width, state.height):
+        raise ValueError('Снимок партии сделан на поле другого размера')
+
+    body, offset = unpack_array(typecode, data, HEADER.size, length)
+    cells, offset = unpack_array(typecode, data, offset, count)
+    codes = data[offset:offset + count]
+    rng_state, _ = unpack_array('I', data, offset + count, RNG_WORDS)
+    state.grid[:] = snapshot_grid(state.field_size, body, cells, codes)
+    state.rng.setstate((random.Random.VERSION, tuple(rng_state), None))
+
+    positions = [(index % width, index // width) for index in body]
+    snake = state.snake_type(position=positions[0])
+    snake.set_body(positions)
+    snake.direction = DIRECTIONS[direction]
+
+    obstacles = state.new_obstacles()
+    for index, code in zip(cells, codes):
+        obstacles.add(code, (index % width, index // width))
+
+    state.free_cells = FreeCells(width, height)
+    state.free_cells.take_all(body)
+    state.free_cells.take_all(cells)
+    state.count_apples, state.count_stones = count_apples, count_stones
+    state.seed = seed
+    state.snake, state.obstacles = snake, obstacles
+    state.eaten_apples, state.resets = eaten_apples, resets
+    state.reset = False
+    state.redraw_all = True
+    if state.changed is not None:
+        state.changed.clear()
+
+
+def write_file(data: bytes, path) -> None:
+    """Записывает {data} в файл {path} через временный файл, поэтому
+    прерванная запись не портит прежнее содержимое.
+    """
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def save_snapshot(state: GameState, path) -> None:
+    """Сохраняет снимок партии {state} в файл {path}."""
+    write_file(take_snapshot(state), path)
+
+
+def load_snapshot(path, state_type=GameState) -> GameState:
+    """Загружает партию типа {state_type} из снимка в файле {path}.
+    Партия создаётся без препятствий, чтобы не расставлять их впустую, и
+    только после проверки заголовка снимка.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    _, width, height, _, _, seed, *_ = read_header(data)
+    state = state_type(width, height, 0, 0, seed=seed)
+    restore_snapshot(state, data)
+    return state
+
+
+class Autosaver():
+    """Сохраняет партию в файл {path} каждые {interval} тиков. Снимок
+    снимается сразу, а в файл пишется в фоновом потоке {writer};
+    {pending} - последняя незаконченная запись.
+    """
+
+    def __init__(self, path, interval: int) -> None:
+        """Инициализирует экземпляр класса."""
+        self.path = path
+        self.interval = interval
+        self.ticks = 0
+        self.writer = ThreadPoolExecutor(1)
+        self.pending: Optional[Future] = None
+
+    def update(self, state: GameState, ticks: int) -> None:
+        """Учитывает {ticks} сыгранных тиков и сохраняет партию, если с
+        прошлого сохранения прошло {interval} тиков.
+        """
+        self.ticks += ticks
+        if self.ticks >= self.interval:
+            self.save(state)
+
+    def save(self, state: GameState) -> None:
+        """Сохраняет партию {state}, если задан файл {path}."""
+        self.ticks = 0
+        if self.path:
+            self.pending = self.writer.submit(write_file,
+                                              take_snapshot(state),
+                                              self.path)
+
+    def close(self) -> None:
+        """Дожидается записи всех снимков. Ошибка последней записи
+        пробрасывается.
+        """
+        self.writer.shutdown()
+        if self.pending is not None:
+            self.pending.result()
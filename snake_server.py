@@ -0,0 +1,366 @@
+"""Сетевая игра: сервер на asyncio, который ведёт партию, и клиенты.
+
+Сервер {GameServer} - единственный источник правды: он продвигает
+арену {snake_arena} с частотой {TICK_RATE} тиков в секунду и
+принимает от игроков направления. У каждого игрока своя змейка на
+общем поле. Клиенты подключаются по TCP и держат у себя копию сетки
+занятости, в которой видны все змейки.
+
+Все сообщения сервера начинаются с длины {FRAME}. Сразу после
+подключения и после каждого сброса партии клиент получает полное поле
+{FULL_HEADER}, а на остальных тиках - только изменения {DELTA_HEADER}:
+номера и новые коды клеток, содержимое которых изменилось за тик, то
+есть новую голову, освободившийся хвост и перенесённые яблоки и камни.
+Изменения кодируются один раз за тик и одним вызовом {write} уходят
+каждому клиенту, поэтому сотни зрителей почти не замедляют тик.
+Клиент, который не успевает читать, отключается, чтобы не копить
+буфер. Игрок отправляет серверу по байту на каждый поворот - индекс
+направления в {DIRECTIONS}; первый такой байт выпускает на арену его
+змейку, а при отключении она убирается с поля. Клиент, который ничего
+не отправляет, остаётся зрителем без змейки.
+
+Запуск сервера: python snake_server.py --port 8765
+Нагрузочная проверка: python snake_server.py --load-test 300
+"""
+import argparse
+import asyncio
+import multiprocessing
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from snake_arena import ArenaState, arena_step
+from snake_engine import DIRECTIONS, GRID_HEIGHT, GRID_WIDTH, Snake
+from snake_profiler import PERCENTILES, percentile
+
+"""Адрес сервера по умолчанию."""
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+"""Частота тиков сервера, как {LOGIC_SPEED} в игре."""
+TICK_RATE = 6
+
+"""Сколько байт может ждать отправки одному клиенту. Клиент с большим
+буфером отключается."""
+MAX_WRITE_BUFFER = 1 << 18
+
+"""Очередь подключений, ещё не принятых сервером. При очереди меньше
+числа одновременно подключающихся клиентов часть подключений ждёт
+повтора по таймауту TCP."""
+LISTEN_BACKLOG = 1024
+
+"""Сколько последних тиков учитывается в опозданиях {GameServer.lag}."""
+LAG_WINDOW = 600
+
+"""Формат сообщений: длина сообщения, затем тип, номер тика и данные.
+Полное поле - ширина, высота и сетка занятости, изменения - их число и
+пары (номер клетки, код)."""
+MSG_FULL = 0
+MSG_DELTA = 1
+FRAME = struct.Struct('<I')
+FULL_HEADER = struct.Struct('<BIHH')
+DELTA_HEADER = struct.Struct('<BIH')
+CHANGE = struct.Struct('<IB')
+
+
+class GameServer():
+    """Сервер арены {state}.
+
+    {players} сопоставляет подключению игрока его змейку, а {actions} -
+    змейке направление, пришедшее до тика; из нескольких направлений
+    одного игрока побеждает последнее. Опоздание каждого тика
+    относительно расписания в секундах копится в {lag}.
+    """
+
+    def __init__(self, state: ArenaState, rate: float = TICK_RATE) -> None:
+        """Инициализирует экземпляр класса."""
+        self.state = state
+        self.interval = 1 / rate
+        self.tick = 0
+        self.players: dict[asyncio.StreamWriter, Snake] = {}
+        self.actions: dict[Snake, tuple[int, int]] = {}
+        self.clients: set[asyncio.StreamWriter] = set()
+        self.lag: deque[float] = deque(maxlen=LAG_WINDOW)
+        state.track_changes()
+
+    def full_message(self) -> bytes:
+        """Возвращает сообщение с полным полем."""
+        state = self.state
+        payload = FULL_HEADER.pack(MSG_FULL, self.tick, state.width,
+                                   state.height) + bytes(state.grid)
+        return FRAME.pack(len(payload)) + payload
+
+    def delta_message(self) -> bytes:
+        """Возвращает сообщение с клетками, изменившимися за тик."""
+        state = self.state
+        width, grid = state.width, state.grid
+        changes = [
+            CHANGE.pack(pos_y * width + pos_x, grid[pos_y * width + pos_x])
+            for pos_x, pos_y in state.changed
+        ]
+        payload = DELTA_HEADER.pack(MSG_DELTA, self.tick, len(changes))
+        return FRAME.pack(len(payload) + CHANGE.size * len(changes)) + (
+            payload + b''.join(changes)
+        )
+
+    def advance(self) -> None:
+        """Продвигает арену на тик и рассылает изменения клиентам."""
+        state = self.state
+        arena_step(state, [self.actions.get(snake)
+                           for snake in state.snakes])
+        self.actions.clear()
+        self.tick += 1
+
+        if state.redraw_all:
+            message = self.full_message()
+        else:
+            message = self.delta_message()
+        state.changed.clear()
+        state.redraw_all = False
+        self.broadcast(message)
+
+    def broadcast(self, message: bytes) -> None:
+        """Отправляет сообщение {message} всем клиентам и отключает тех,
+        у кого накопилось больше {MAX_WRITE_BUFFER} байт.
+        """
+        for writer in tuple(self.clients):
+            if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                self.clients.discard(writer)
+                writer.close()
+            else:
+                writer.write(message)
+
+    def steer(self, writer: asyncio.StreamWriter, code: int) -> None:
+        """Запоминает направление с индексом {code} для змейки игрока
+        {writer}, при первом направлении выпуская змейку на арену. Пока
+        на поле нет свободных клеток, игрок остаётся зрителем.
+        """
+        snake = self.players.get(writer)
+        if code >= len(DIRECTIONS) or (
+                snake is None and not self.state.free_cells):
+            return
+        if snake is None:
+            snake = self.players[writer] = self.state.add_snake()
+        self.actions[snake] = DIRECTIONS[code]
+
+    def leave(self, writer: asyncio.StreamWriter) -> None:
+        """Отключает клиента {writer} и убирает с арены его змейку."""
+        self.clients.discard(writer)
+        snake = self.players.pop(writer, None)
+        if snake is not None:
+            self.actions.pop(snake, None)
+            self.state.remove_snake(snake)
+        writer.close()
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """Обслуживает подключение клиента: отправляет ему поле и
+        принимает направления, пока клиент не отключится.
+        """
+        writer.write(self.full_message())
+        self.clients.add(writer)
+        try:
+            while True:
+                data = await reader.read(64)
+                if not data:
+                    break
+                self.steer(writer, data[-1])
+        except ConnectionError:
+            pass
+        finally:
+            self.leave(writer)
+
+    async def serve(self, host: str = DEFAULT_HOST,
+                    port: int = DEFAULT_PORT) -> asyncio.Server:
+        """Начинает принимать подключения. Порт 0 выбирает свободный."""
+        return await asyncio.start_server(self.handle, host, port,
+                                          backlog=LISTEN_BACKLOG)
+
+    async def run(self, ticks: Optional[int] = None) -> None:
+        """Продвигает арену по расписанию {TICK_RATE} тиков в секунду:
+        {ticks} тиков или бесконечно. Тик, начавшийся позже срока, не
+        сдвигает расписание следующих.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        end = None if ticks is None else self.tick + ticks
+        while end is None or self.tick < end:
+            deadline += self.interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            self.lag.append(max(0.0, loop.time() - deadline))
+            self.advance()
+
+    def lag_stats(self) -> dict[str, float]:
+        """Возвращает перцентили опоздания тиков в миллисекундах."""
+        values = sorted(self.lag)
+        return {
+            f'p{percent}': percentile(values, percent) * 1000
+            for percent in PERCENTILES
+        }
+
+
+class GameClient():
+    """Клиент сервера: копия сетки занятости {grid} и номер тика
+    {tick}, к которому она относится. Используется и как игрок, и как
+    зритель, в том числе в тестах вместо настоящего клиента.
+    """
+
+    def __init__(self) -> None:
+        """Инициализирует экземпляр класса."""
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.width = self.height = 0
+        self.grid = bytearray()
+        self.tick = -1
+
+    async def connect(self, host: str = DEFAULT_HOST,
+                      port: int = DEFAULT_PORT) -> None:
+        """Подключается к серверу и получает от него поле."""
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        await self.receive()
+
+    def apply(self, message: bytes) -> None:
+        """Применяет к копии поля сообщение сервера {message}."""
+        kind = message[0]
+        if kind == MSG_FULL:
+            _, self.tick, self.width, self.height = (
+                FULL_HEADER.unpack_from(message)
+            )
+            self.grid = bytearray(message[FULL_HEADER.size:])
+        elif kind == MSG_DELTA:
+            _, self.tick, count = DELTA_HEADER.unpack_from(message)
+            grid = self.grid
+            for index, code in CHANGE.iter_unpack(
+                    message[DELTA_HEADER.size:]):
+                grid[index] = code
+        else:
+            raise ValueError('Неизвестное сообщение сервера')
+
+    async def receive(self) -> int:
+        """Ждёт сообщения сервера, применяет его и возвращает номер
+        тика.
+        """
+        size, = FRAME.unpack(await self.reader.readexactly(FRAME.size))
+        self.apply(await self.reader.readexactly(size))
+        return self.tick
+
+    async def follow(self, tick: int) -> None:
+        """Принимает сообщения, пока копия поля не дойдёт до тика
+        {tick}.
+        """
+        while self.tick < tick:
+            await self.receive()
+
+    def send_direction(self, direction: tuple[int, int]) -> None:
+        """Просит сервер повернуть змейку в направлении {direction}."""
+        self.writer.write(bytes([DIRECTIONS.index(direction)]))
+
+    async def close(self) -> None:
+        """Отключается от сервера."""
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def spectate(port: int, count: int, ticks: int) -> list[bytes]:
+    """Подключает к серверу {count} зрителей, ведёт их копии поля до
+    тика {ticks} и возвращает эти копии.
+    """
+    clients = [GameClient() for _ in range(count)]
+    await asyncio.gather(*(client.connect(port=port) for client in clients))
+    await asyncio.gather(*(client.follow(ticks) for client in clients))
+    grids = [bytes(client.grid) for client in clients]
+    await asyncio.gather(*(client.close() for client in clients))
+    return grids
+
+
+def watch(port: int, count: int, ticks: int) -> list[bytes]:
+    """Запускает {spectate} в отдельном процессе."""
+    return asyncio.run(spectate(port, count, ticks))
+
+
+async def load_test(spectators: int, ticks: int,
+                    rate: float = TICK_RATE,
+                    width: int = GRID_WIDTH,
+                    height: int = GRID_HEIGHT) -> dict:
+    """Поднимает сервер на свободном порту, подключает к нему
+    {spectators} зрителей и одного игрока и проводит {ticks} тиков.
+    Зрители работают в отдельном процессе, чтобы разбор их сообщений
+    не отнимал время у сервера. Возвращает перцентили опоздания тиков и
+    число зрителей, чья копия поля в конце совпала с полем сервера.
+    """
+    server = GameServer(ArenaState(width, height, seed=0, count_snakes=0),
+                        rate)
+    listener = await server.serve(port=0)
+    port = listener.sockets[0].getsockname()[1]
+    player = GameClient()
+    await player.connect(port=port)
+
+    async def steer() -> None:
+        for tick in range(ticks):
+            player.send_direction(DIRECTIONS[tick // 3 % len(DIRECTIONS)])
+            await player.receive()
+
+    loop = asyncio.get_running_loop()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(1, mp_context=context) as executor:
+        watching = loop.run_in_executor(executor, watch, port, spectators,
+                                        ticks)
+        while len(server.clients) <= spectators and not watching.done():
+            await asyncio.sleep(server.interval)
+        await asyncio.gather(server.run(ticks), steer())
+        grids = await watching
+
+    await player.close()
+    listener.close()
+    await listener.wait_closed()
+    return {
+        'spectators': spectators,
+        'ticks': ticks,
+        'synced': grids.count(bytes(server.state.grid)),
+        'lag_ms': server.lag_stats(),
+    }
+
+
+async def serve_forever(host: str, port: int, width: int,
+                        height: int) -> None:
+    """Запускает сервер и бесконечно продвигает арену."""
+    server = GameServer(ArenaState(width, height, count_snakes=0))
+    listener = await server.serve(host, port)
+    async with listener:
+        await server.run()
+
+
+def main() -> None:
+    """Разбирает аргументы командной строки и запускает сервер или
+    нагрузочную проверку.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--width', type=int, default=GRID_WIDTH)
+    parser.add_argument('--height', type=int, default=GRID_HEIGHT)
+    parser.add_argument('--load-test', type=int, metavar='SPECTATORS',
+                        help='проверить сервер с этим числом зрителей')
+    parser.add_argument('--ticks', type=int, default=TICK_RATE * 10,
+                        help='тиков в нагрузочной проверке')
+    args = parser.parse_args()
+
+    if args.load_test is None:
+        asyncio.run(serve_forever(args.host, args.port, args.width,
+                                  args.height))
+        return
+
+    result = asyncio.run(load_test(args.load_test, args.ticks,
+                                   width=args.width, height=args.height))
+    lag = ', '.join(f'{name} {value:.2f} мс'
+                    for name, value in result['lag_ms'].items())
+    print(f'зрителей {result["spectators"]}, тиков {result["ticks"]}, '
+          f'совпало полей {result["synced"]}, опоздание тика: {lag}')
+
+
+if __name__ == '__main__':
+    main()
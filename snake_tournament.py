@@ -0,0 +1,246 @@
+"""Турнир автопилотов змейки без окна и pygame.
+
+Каждая пара (политика, зерно) разыгрывается отдельной партией в пуле
+процессов {ProcessPoolExecutor}. Результаты партий приходят по мере
+готовности, в каком бы порядке ни закончились партии, и сводятся в общий
+отчёт по политикам. Каждый результат помечен политикой и зерном своей
+партии, поэтому отчёт от порядка прихода не зависит.
+
+Запуск: python snake_tournament.py --policies random greedy --games 1000
+"""
+import argparse
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from snake_autopilot import Autopilot
+from snake_engine import (APPLE, DEFAULT_COUNT_APPLES, DEFAULT_COUNT_STONES,
+                          DEFAULT_MAX_TICKS, DIRECTIONS, EMPTY, GRID_HEIGHT,
+                          GRID_WIDTH, OPPOSITE, SNAKE, STONE, GameState,
+                          step)
+
+"""Сколько партий отдаётся процессу за один раз."""
+JOBS_CHUNK_SIZE = 16
+
+Policy = Callable[[GameState, random.Random], Optional[tuple[int, int]]]
+
+
+class Job(NamedTuple):
+    """Одна партия турнира."""
+
+    policy: str
+    seed: int
+    max_ticks: int = DEFAULT_MAX_TICKS
+    width: int = GRID_WIDTH
+    height: int = GRID_HEIGHT
+    count_apples: int = DEFAULT_COUNT_APPLES
+    count_stones: int = DEFAULT_COUNT_STONES
+
+
+class GameResult(NamedTuple):
+    """Итог партии: длина змейки перед проигрышем, съеденные яблоки
+    (как их считает {GameState.update_eaten_apples}) и прожитые тики.
+    """
+
+    policy: str
+    seed: int
+    length: int
+    eaten_apples: int
+    ticks: int
+
+
+def is_safe(state: GameState, cell: tuple[int, int]) -> bool:
+    """Проверяет, что ход в клетку {cell} не сбросит партию."""
+    code = state.cell_at(cell)
+    if code == SNAKE:
+        return False
+    return code < STONE or state.snake.length > code - STONE
+
+
+def neighbour(state: GameState,
+              direction: tuple[int, int]) -> tuple[int, int]:
+    """Возвращает соседнюю с головой клетку в направлении {direction}."""
+    pos_x, pos_y = state.snake.get_head_position()
+    return (
+        (pos_x + direction[0]) % state.width,
+        (pos_y + direction[1]) % state.height
+    )
+
+
+def safe_directions(state: GameState) -> list[tuple[int, int]]:
+    """Возвращает направления, ход в которые не сбросит партию."""
+    back = OPPOSITE[state.snake.direction]
+    return [
+        direction for direction in DIRECTIONS
+        if direction != back and is_safe(state, neighbour(state, direction))
+    ]
+
+
+def straight_policy(state: GameState,
+                    rng: random.Random) -> Optional[tuple[int, int]]:
+    """Никогда не поворачивает."""
+    return None
+
+
+def random_policy(state: GameState,
+                  rng: random.Random) -> Optional[tuple[int, int]]:
+    """Выбирает случайное безопасное направление."""
+    directions = safe_directions(state)
+    return rng.choice(directions) if directions else None
+
+
+def greedy_policy(state: GameState,
+                  rng: random.Random) -> Optional[tuple[int, int]]:
+    """Делает безопасный ход, ближайший к ближайшему яблоку с учётом
+    замкнутости поля.
+    """
+    apples = [position for position in state.obstacles.positions()
+              if state.cell_at(position) == APPLE]
+    directions = safe_directions(state)
+    if not apples or not directions:
+        return None
+
+    def distance(cell: tuple[int, int]) -> int:
+        best = state.field_size
+        for apple in apples:
+            delta_x = abs(apple[0] - cell[0])
+            delta_y = abs(apple[1] - cell[1])
+            best = min(best,
+                       min(delta_x, state.width - delta_x)
+                       + min(delta_y, state.height - delta_y))
+        return best
+
+    return min(directions,
+               key=lambda direction: (
+                   distance(neighbour(state, direction)),
+                   state.cell_at(neighbour(state, direction)) != EMPTY
+               ))
+
+
+"""Политики, доступные турниру по имени. Имя, а не функция, передаётся
+в процесс-исполнитель, поэтому политики должны быть объявлены здесь.
+{Autopilot} хранит поле расстояний между тиками и сам перестраивает
+его для каждой новой партии."""
+POLICIES: dict[str, Policy] = {
+    'straight': straight_policy,
+    'random': random_policy,
+    'greedy': greedy_policy,
+    'autopilot': Autopilot(),
+}
+
+
+def play_game(job: Job) -> GameResult:
+    """Разыгрывает одну партию до первого сброса или до лимита тиков."""
+    policy = POLICIES[job.policy]
+    state = GameState(job.width, job.height, job.count_apples,
+                      job.count_stones, seed=job.seed)
+    policy_rng = random.Random(f'{job.policy}:{job.seed}')
+
+    length = state.snake.length
+    for tick in range(1, job.max_ticks + 1):
+        length = state.snake.length
+        step(state, policy(state, policy_rng))
+        if state.resets:
+            return GameResult(job.policy, job.seed, length,
+                              state.eaten_apples, tick)
+
+    return GameResult(job.policy, job.seed, state.snake.length,
+                      state.eaten_apples, job.max_ticks)
+
+
+def play_games(jobs: list[Job]) -> list[GameResult]:
+    """Разыгрывает пачку партий {jobs} в одном процессе."""
+    return [play_game(job) for job in jobs]
+
+
+def run_tournament(jobs: Iterable[Job],
+                   workers: Optional[int] = None) -> Iterator[GameResult]:
+    """Разыгрывает партии {jobs} в {workers} процессах пачками по
+    {JOBS_CHUNK_SIZE} и отдаёт результаты каждой пачки, как только она
+    сыграна: долгая партия не задерживает уже готовые.
+    """
+    jobs = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(play_games, chunk)
+            for chunk in iter(lambda: list(islice(jobs, JOBS_CHUNK_SIZE)),
+                              [])
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+class Report():
+    """Сводка результатов турнира по политикам."""
+
+    def __init__(self) -> None:
+        """Инициализирует экземпляр класса."""
+        self.results: dict[str, list[GameResult]] = {}
+
+    def add(self, result: GameResult) -> None:
+        """Добавляет результат партии в отчёт."""
+        self.results.setdefault(result.policy, []).append(result)
+
+    def summary(self) -> list[dict]:
+        """Возвращает средние и лучшие показатели каждой политики."""
+        rows = []
+        for policy, results in sorted(self.results.items()):
+            games = len(results)
+            rows.append({
+                'policy': policy,
+                'games': games,
+                'mean_length': sum(r.length for r in results) / games,
+                'max_length': max(r.length for r in results),
+                'mean_apples': sum(r.eaten_apples for r in results) / games,
+                'mean_ticks': sum(r.ticks for r in results) / games,
+            })
+
+        return rows
+
+    def format(self) -> str:
+        """Возвращает отчёт в виде текстовой таблицы."""
+        lines = [
+            f'{"политика":<12}{"партий":>8}{"длина":>9}{"макс.":>7}'
+            f'{"яблок":>9}{"тиков":>10}'
+        ]
+        for row in self.summary():
+            lines.append(
+                f'{row["policy"]:<12}{row["games"]:>8}'
+                f'{row["mean_length"]:>9.1f}{row["max_length"]:>7}'
+                f'{row["mean_apples"]:>9.1f}{row["mean_ticks"]:>10.1f}'
+            )
+
+        return '\n'.join(lines)
+
+
+def main() -> None:
+    """Разбирает аргументы командной строки и проводит турнир."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--policies', nargs='+', default=sorted(POLICIES),
+                        choices=sorted(POLICIES))
+    parser.add_argument('--games', type=int, default=100,
+                        help='партий на каждую политику')
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--max-ticks', type=int, default=DEFAULT_MAX_TICKS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true',
+                        help='печатать результат каждой партии')
+    args = parser.parse_args()
+
+    jobs = [
+        Job(policy, seed, args.max_ticks)
+        for seed in range(args.first_seed, args.first_seed + args.games)
+        for policy in args.policies
+    ]
+    report = Report()
+    for result in run_tournament(jobs, args.workers):
+        report.add(result)
+        if args.verbose:
+            print(*result, sep='\t')
+
+    print(report.format())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import random
+
+import snake_arena
+import snake_engine as engine
+from snake_autopilot import Autopilot
+
+
+def place(state, snake, body, direction):
+    for cell in snake.positions:
+        state.vacate(cell)
+    snake.set_body(body)
+    snake.direction = direction
+    for cell in body:
+        state.occupy(cell, engine.SNAKE)
+
+
+def expected_grid(state):
+    grid = bytearray(state.field_size)
+    for snake in state.snakes:
+        for pos_x, pos_y in snake.positions:
+            assert not grid[pos_y * state.width + pos_x], (
+                'Две змейки не могут занимать одну клетку.'
+            )
+            grid[pos_y * state.width + pos_x] = engine.SNAKE
+    for obstacle in state.obstacles:
+        pos_x, pos_y = obstacle.position
+        grid[pos_y * state.width + pos_x] = obstacle.cell_code()
+    return grid
+
+
+def test_arena_keeps_board_consistent():
+    state = snake_arena.ArenaState(30, 20, seed=1, count_snakes=50)
+    pilot = Autopilot()
+    rng = random.Random(2)
+    for tick in range(500):
+        if tick % 2:
+            actions = snake_arena.pilot_actions(state, pilot, skip=0)
+        else:
+            actions = [rng.choice(engine.DIRECTIONS) for _ in state.snakes]
+        snake_arena.arena_step(state, actions)
+        assert state.grid == expected_grid(state)
+        assert len(state.free_cells) == state.grid.count(engine.EMPTY)
+
+    assert state.deaths, 'На тесной арене змейки должны сталкиваться.'
+    assert len(state.snakes) == 50
+
+
+def test_head_to_head_kills_both():
+    state = snake_arena.ArenaState(12, 8, 0, 0, seed=3, count_snakes=2)
+    first, second = state.snakes
+    place(state, first, [(2, 1), (1, 1)], engine.RIGHT)
+    place(state, second, [(4, 1), (5, 1)], engine.LEFT)
+
+    snake_arena.arena_step(state)
+    assert state.deaths == 2
+    assert state.resets == 1
+    assert first.length == second.length == 1
+
+
+def test_head_to_body_kills_only_the_attacker():
+    state = snake_arena.ArenaState(12, 8, 0, 0, seed=4, count_snakes=2)
+    first, second = state.snakes
+    place(state, first, [(3, 1), (2, 1)], engine.RIGHT)
+    place(state, second, [(4, 2), (4, 1), (4, 0)], engine.DOWN)
+
+    snake_arena.arena_step(state)
+    assert state.deaths == 1
+    assert state.resets == 1
+    assert list(second.positions) == [(4, 3), (4, 2), (4, 1)]
+
+
+def test_crowded_arena_survives_a_full_board():
+    state = snake_arena.ArenaState(8, 6, count_apples=10, count_stones=0,
+                                   seed=0, count_snakes=8)
+    pilot = Autopilot()
+    full = False
+    for _ in range(3000):
+        snake_arena.arena_step(
+            state, snake_arena.pilot_actions(state, pilot, skip=0)
+        )
+        full = full or not state.free_cells
+        assert state.grid == expected_grid(state)
+        assert len(state.free_cells) == state.grid.count(engine.EMPTY)
+
+    assert full, 'Змейки должны заполнить поле целиком.'
+    assert len(state.snakes) == 8
+
+
+def test_empty_arena_has_no_player_snake():
+    state = snake_arena.ArenaState(12, 8, 2, 2, seed=5, count_snakes=0)
+    assert state.snake is None
+    assert state.grid.count(engine.SNAKE) == 0
+    snake_arena.arena_step(state)
+
+    first, second = state.add_snake(), state.add_snake()
+    assert state.snake is first
+    state.remove_snake(first)
+    assert state.snake is second
+    state.remove_snake(second)
+    assert state.snake is None
+    snake_arena.arena_step(state)
+    assert state.grid.count(engine.SNAKE) == 0
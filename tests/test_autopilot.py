@@ -0,0 +1,91 @@
+import statistics
+from time import perf_counter
+
+import snake_engine as engine
+from snake_autopilot import Autopilot
+
+
+def test_incremental_field_matches_full_rebuild():
+    state = engine.GameState(16, 12, count_apples=6, count_stones=8, seed=2)
+    pilot = Autopilot()
+    checked = 0
+    for _ in range(4000):
+        direction = pilot.decide(state)
+        if not pilot.work:
+            fresh = Autopilot(budget=state.field_size * 10)
+            fresh.sync(state)
+            assert pilot.dist == fresh.dist, (
+                'Поле расстояний после обновлений должно совпадать с '
+                'построенным заново.'
+            )
+            checked += 1
+        engine.step(state, direction)
+
+    assert checked > 1000
+    assert state.eaten_apples > 100
+
+
+def test_autopilot_avoids_its_body_and_heavy_stones():
+    state = engine.GameState(10, 10, count_apples=0, count_stones=0, seed=0)
+    for cell in state.snake.positions:
+        state.vacate(cell)
+    body = [(5, 5), (4, 5), (4, 4), (5, 4), (6, 4)]
+    state.snake.set_body(body)
+    state.snake.direction = engine.RIGHT
+    for cell in body:
+        state.occupy(cell, engine.SNAKE)
+    stone = engine.Stone(position=(6, 5), weight=5)
+    state.obstacles.append(stone)
+    state.add_obstacle(stone)
+    apple = engine.Apple(position=(9, 5))
+    state.obstacles.append(apple)
+    state.add_obstacle(apple)
+
+    assert Autopilot().decide(state) == engine.DOWN
+
+
+def test_autopilot_updates_instead_of_rebuilding():
+    state = engine.GameState(100, 100, seed=3)
+    rebuilds = []
+    for _ in range(5):
+        start = perf_counter()
+        Autopilot(budget=state.field_size * 10).decide(state)
+        rebuilds.append(perf_counter() - start)
+
+    pilot = Autopilot()
+    pilot.decide(state)
+    timings = []
+    for _ in range(3000):
+        start = perf_counter()
+        direction = pilot.decide(state)
+        timings.append(perf_counter() - start)
+        engine.step(state, direction)
+
+    rebuild = statistics.median(rebuilds)
+    assert statistics.median(timings) < rebuild / 10, (
+        'Ход автопилота должен стоить намного меньше, чем построение поля '
+        'расстояний заново.'
+    )
+    assert statistics.mean(timings) < rebuild / 5
+
+
+def test_pending_updates_do_not_scan_every_apple():
+    medians = []
+    for count in (20, 4000):
+        state = engine.GameState(200, 200, count_apples=count,
+                                 count_stones=0, seed=4)
+        pilot = Autopilot(budget=1)
+        timings = []
+        for _ in range(500):
+            pilot.sync(state)
+            assert pilot.work
+            start = perf_counter()
+            direction = pilot.choose(state, state.snake)
+            timings.append(perf_counter() - start)
+            engine.step(state, direction)
+        assert state.eaten_apples > 0
+        medians.append(statistics.median(timings))
+
+    assert medians[1] < medians[0] * 3, (
+        'Пока поле обновляется, ход не должен перебирать все яблоки.'
+    )
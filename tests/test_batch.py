@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def modules():
+    import snake_batch
+    import snake_engine
+    return snake_engine, snake_batch
+
+
+def test_batch_matches_scalar_engine(modules):
+    engine, batch_module = modules
+    seeds = list(range(8))
+    batch = batch_module.BatchState(seeds, 10, 8, 6, 5)
+    states = [engine.GameState(10, 8, 6, 5, seed=seed)
+              for seed in seeds]
+
+    rng = random.Random(99)
+    for tick in range(2000):
+        actions = [rng.randrange(4) for _ in seeds]
+        batch.step(np.array(actions))
+        for game, state in enumerate(states):
+            engine.step(state, engine.DIRECTIONS[actions[game]])
+            assert bytes(state.grid) == batch.cells[game].tobytes(), (
+                f'Поле партии {game} разошлось на тике {tick}.'
+            )
+            assert (list(state.snake.positions)
+                    == batch.snake_positions(game))
+            assert state.eaten_apples == batch.eaten_apples[game]
+
+    assert batch.eaten_apples.sum() and batch.resets.sum()
+
+
+def test_batch_keeps_direction(modules):
+    engine, batch_module = modules
+    batch = batch_module.BatchState([1, 2, 3], count_apples=0,
+                                    count_stones=0)
+    direction = batch.direction.copy()
+    batch.step(np.full(3, batch_module.KEEP_DIRECTION))
+    batch.step(direction ^ 1)
+    assert (batch.direction == direction).all(), (
+        'Пакетный движок должен игнорировать развороты на 180 градусов.'
+    )
@@ -0,0 +1,28 @@
+import snake_bench
+
+
+def test_quick_run_covers_every_path():
+    results = list(snake_bench.run_benchmarks(
+        sizes=[(12, 9)], lengths=[1, 10], repeat=1, target=0.001
+    ))
+    names = {result.name for result in results}
+    assert names == {*snake_bench.LOGIC_BENCHES, 'startup',
+                     'render_full', 'render_dirty'}
+    assert all(result.ns_per_op > 0 for result in results)
+
+
+def test_compare_reports_slowdowns_and_missing_keys():
+    results = [
+        snake_bench.BenchResult('snake_move', 10, 10, 1, 130.0),
+        snake_bench.BenchResult('snake_move', 10, 10, 5, 120.0),
+        snake_bench.BenchResult('snake_move', 10, 10, 9, 999.0),
+    ]
+    baseline = {
+        'snake_move[10x10,1]': 100.0,
+        'snake_move[10x10,5]': 100.0,
+    }
+    regressions = snake_bench.compare(results, baseline, threshold=0.25)
+    assert len(regressions) == 2
+    assert regressions[0].startswith('snake_move[10x10,1]')
+    assert regressions[1].startswith('snake_move[10x10,9]')
+    assert 'нет в базовой линии' in regressions[1]
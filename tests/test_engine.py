@@ -0,0 +1,151 @@
+import random
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+from conftest import BASE_DIR
+
+
+@pytest.fixture
+def engine():
+    import snake_engine
+    return snake_engine
+
+
+@pytest.fixture
+def state(engine):
+    state = engine.GameState(count_apples=0, count_stones=0,
+                             seed=0)
+    state.snake.update_direction(engine.RIGHT)
+    return state
+
+
+def put_snake(engine, state, positions):
+    for cell in state.snake.positions:
+        state.vacate(cell)
+    state.snake.set_body(positions)
+    for cell in positions:
+        state.occupy(cell, engine.SNAKE)
+
+
+def put_obstacle(state, obstacle):
+    state.obstacles.append(obstacle)
+    state.add_obstacle(obstacle)
+
+
+def test_engine_imports_without_pygame():
+    code = 'import sys, snake_engine; assert "pygame" not in sys.modules'
+    result = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR)
+    assert result.returncode == 0, (
+        'Модуль `snake_engine` не должен импортировать pygame.'
+    )
+
+
+def test_step_moves_and_wraps(engine, state):
+    put_snake(engine, state, [(state.width - 1, 0)])
+    assert engine.step(state)
+    assert state.snake.get_head_position() == (0, 0), (
+        'Выходя за край поля, змейка должна появляться с другой стороны.'
+    )
+
+
+def test_step_eats_apple(engine, state):
+    head = state.snake.get_head_position()
+    apple = engine.Apple(position=(head[0] + 1, head[1]))
+    put_obstacle(state, apple)
+
+    assert not engine.step(state)
+    assert state.snake.length == 2
+    assert state.eaten_apples == 1
+    assert apple.position not in state.snake.positions
+
+
+def test_step_stone_cuts_tail(engine, state):
+    put_snake(engine, state, [(5, 5), (4, 5), (3, 5), (2, 5)])
+    put_obstacle(state, engine.Stone(position=(6, 5), weight=2))
+
+    assert not engine.step(state)
+    assert list(state.snake.positions) == [(5, 5), (4, 5)]
+
+
+def test_step_heavy_stone_resets(engine, state):
+    put_snake(engine, state, [(5, 5), (4, 5)])
+    state.eaten_apples = 3
+    put_obstacle(state, engine.Stone(position=(6, 5), weight=2))
+
+    engine.step(state)
+    assert state.snake.length == 1
+    assert state.eaten_apples == 3
+    assert not state.reset
+
+
+def test_step_ignores_reverse(engine, state):
+    engine.step(state, engine.LEFT)
+    assert state.snake.direction == engine.RIGHT
+
+
+def test_step_bites_itself(engine, state):
+    put_snake(engine, state, [(5, 5), (5, 6), (6, 6), (6, 5), (7, 5)])
+    engine.step(state)
+    assert state.snake.length == 1, (
+        'Укусив себя, змейка должна сбрасываться в начальное состояние.'
+    )
+
+
+def test_grid_and_free_cells_follow_the_game(engine):
+    rng = random.Random(1)
+    state = engine.GameState(8, 6, count_apples=6, count_stones=4, seed=1)
+    for _ in range(3000):
+        engine.step(state, rng.choice(engine.DIRECTIONS))
+        used = set(state.snake.positions)
+        used.update(obstacle.position for obstacle in state.obstacles)
+        free = {
+            (x, y) for x in range(state.width) for y in range(state.height)
+            if (x, y) in state.free_cells
+        }
+        assert len(state.free_cells) == len(free)
+        assert not used & free, (
+            'Занятые клетки не должны попадать в индекс свободных клеток.'
+        )
+        assert len(used) + len(free) == state.field_size
+        assert state.snake.cells == set(state.snake.positions)
+        for cell in state.snake.positions:
+            assert state.cell_at(cell) == engine.SNAKE
+        for obstacle in state.obstacles:
+            assert state.cell_at(obstacle.position) == obstacle.cell_code()
+            assert state.obstacles.at(obstacle.position) == obstacle
+        assert state.grid.count(engine.EMPTY) == len(free)
+
+
+class RecordView():
+    __slots__ = ('store', 'index')
+
+
+def test_obstacle_store_is_compact(engine):
+    width, height, count = 500, 500, 50000
+    cells = [divmod(index, width)[::-1] for index in
+             random.Random(2).sample(range(width * height), count)]
+    tracemalloc.start()
+    store = engine.ObstacleStore(width, height)
+    for cell in cells:
+        store.add(engine.STONE + 2, cell)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    index = 4 * width * height
+    assert used < index + 16 * count, (
+        f'Хранилище занимает {used} байт, из них индекс клеток {index}.'
+    )
+
+    stone = store.at(cells[7])
+    assert not hasattr(stone, '__dict__')
+    assert not hasattr(engine.Apple(), '__dict__')
+    assert sys.getsizeof(stone) == sys.getsizeof(RecordView()), (
+        'Препятствие должно хранить только хранилище и номер записи.'
+    )
+    assert (stone.position, stone.weight) == (cells[7], 2)
+    stone.position = (0, 0) if cells[7] != (0, 0) else (1, 0)
+    assert store.at(stone.position) == stone
+    with pytest.raises(KeyError):
+        store.at(cells[7])
@@ -0,0 +1,97 @@
+import random
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BASE_DIR
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def modules():
+    import snake_engine
+    import snake_env
+    return snake_engine, snake_env
+
+
+def test_observation_is_updated_in_place(modules):
+    engine, env_module = modules
+    env = env_module.SnakeEnv(12, 10, seed=1)
+    observation, _ = env.reset(seed=2)
+    state = engine.GameState(12, 10, seed=2)
+
+    rng = random.Random(3)
+    resets = 0
+    for _ in range(2000):
+        action = rng.randrange(4)
+        result, reward, terminated, _, _ = env.step(action)
+        engine.step(state, engine.DIRECTIONS[action])
+        assert result is observation, (
+            'Наблюдение должно обновляться на месте, а не выделяться заново.'
+        )
+        assert observation.tobytes() == bytes(state.grid)
+        resets += terminated
+        if terminated:
+            assert reward < 0
+
+    assert resets == state.resets
+
+
+def test_reset_seed_is_reproducible(modules):
+    _, env_module = modules
+    first = env_module.SnakeEnv(10, 8)
+    second = env_module.SnakeEnv(10, 8)
+    for env in (first, second):
+        env.reset(seed=7)
+        env.reset()
+    assert first.state.seed == second.state.seed
+    assert first.observation.tobytes() == second.observation.tobytes()
+
+
+def test_vector_env_shares_observations(modules):
+    _, env_module = modules
+    vector = env_module.VectorSnakeEnv(range(4), 10, 8, max_ticks=50)
+    singles = [env_module.SnakeEnv(10, 8, seed=seed, max_ticks=50)
+               for seed in range(4)]
+
+    rng = random.Random(4)
+    for _ in range(300):
+        actions = [rng.randrange(4) for _ in singles]
+        observations, rewards, terminated, truncated = vector.step(actions)
+        for number, env in enumerate(singles):
+            _, reward, done, cut, _ = env.step(actions[number])
+            if cut:
+                env.reset()
+            assert rewards[number] == reward
+            assert terminated[number] == done
+            assert truncated[number] == cut
+            assert observations[number].tobytes() == (
+                env.observation.tobytes()
+            )
+
+
+def test_pixel_observation_is_frame(_the_snake, modules):
+    _, env_module = modules
+    _the_snake.init_display()
+    env = env_module.SnakeEnv(pixels=True, seed=5)
+    pixels, _ = env.reset(seed=5)
+    assert pixels.shape == (_the_snake.SCREEN_HEIGHT,
+                            _the_snake.SCREEN_WIDTH, 3)
+    for _ in range(20):
+        result, *_ = env.step(env_module.KEEP_DIRECTION)
+        assert np.shares_memory(result, pixels)
+
+    head = _the_snake.tile_atlas.rect(env.state.snake.get_head_position())
+    assert tuple(pixels[head.centery, head.centerx]) == (
+        _the_snake.SNAKE_COLOR
+    )
+
+
+def test_env_does_not_import_batch_or_tournament():
+    code = (
+        'import snake_env, sys; '
+        'assert not {"snake_batch", "snake_tournament"} & set(sys.modules)'
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, check=True)
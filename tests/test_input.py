@@ -0,0 +1,50 @@
+import pygame
+
+import snake_engine as engine
+import snake_input
+from snake_replay import ReplayRecorder
+
+
+def test_turn_queue_keeps_quick_turns_and_measures_latency():
+    now = [0.0]
+    turns = snake_input.TurnQueue(size=2, timer=lambda: now[0])
+    assert turns.push(engine.UP, engine.RIGHT)
+    assert not turns.push(engine.UP, engine.RIGHT), 'Повтор не нужен.'
+    assert not turns.push(engine.DOWN, engine.RIGHT), 'Разворот запрещён.'
+    now[0] += 0.01
+    assert turns.push(engine.LEFT, engine.RIGHT)
+    assert not turns.push(engine.DOWN, engine.RIGHT), 'Очередь заполнена.'
+
+    now[0] += 0.1
+    assert turns.pop() == engine.UP
+    now[0] += 0.1
+    assert turns.pop() == engine.LEFT
+    assert turns.pop() is None
+
+    stats = turns.stats()
+    assert round(stats['p50'], 6) == 110.0
+    assert round(stats['p99'], 6) == 200.0
+
+
+def test_turns_between_ticks_are_applied_one_per_tick(_the_snake):
+    _the_snake.init_display()
+    state = _the_snake.GameField(10, 8, 0, 0, seed=1)
+    state.snake.direction = engine.RIGHT
+    recorder = ReplayRecorder(state, enabled=False)
+    _the_snake.game.new_game = False
+    _the_snake.game.close_menu()
+
+    pygame.event.clear()
+    for key in (pygame.K_UP, pygame.K_LEFT):
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+    assert not _the_snake.quit_pressed(state.snake)
+
+    start = state.snake.get_head_position()
+    _the_snake.play_ticks(state, recorder, 2)
+    assert state.snake.direction == engine.LEFT
+    assert state.snake.get_head_position() == (
+        (start[0] - 1) % state.width, (start[1] - 1) % state.height
+    )
+    assert len(_the_snake.turns.latencies) == 2
+    _the_snake.game.new_game = True
+    _the_snake.game.open_menu()
@@ -0,0 +1,114 @@
+from collections import deque
+from statistics import median
+from time import perf_counter
+
+import pytest
+
+import snake_engine as engine
+import snake_levels
+
+
+def reachable_cells(state):
+    start = state.snake.get_head_position()
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        pos_x, pos_y = queue.popleft()
+        for delta_x, delta_y in engine.DIRECTIONS:
+            cell = ((pos_x + delta_x) % state.width,
+                    (pos_y + delta_y) % state.height)
+            if cell not in seen and state.cell_at(cell) < engine.STONE:
+                seen.add(cell)
+                queue.append(cell)
+    return seen
+
+
+@pytest.mark.parametrize('density', list(snake_levels.DENSITIES))
+def test_every_apple_is_reachable(density):
+    for seed in range(20):
+        state = snake_levels.LevelState(40, 30, density, seed=seed)
+        reachable = reachable_cells(state)
+        apples = [obstacle.position for obstacle in state.obstacles
+                  if obstacle.cell_code() == engine.APPLE]
+        assert len(apples) == state.count_apples
+        assert all(apple in reachable for apple in apples), (
+            f'Яблоко за камнями: плотность {density}, зерно {seed}.'
+        )
+        assert len(state.obstacles) == (state.count_apples
+                                        + state.count_stones)
+        assert len(state.free_cells) == state.grid.count(engine.EMPTY)
+
+
+def test_runs_wrap_around_the_field():
+    width = 6
+    stones = [0 * width + 2, 1 * width + 0, 1 * width + 1, 1 * width + 2,
+              1 * width + 3, 1 * width + 4, 1 * width + 5]
+    rows = snake_levels.open_runs(width, 3, stones)
+    assert rows[0] == ([0, 3], [2, 6])
+    assert rows[1] == ([], [])
+
+    runs = snake_levels.reachable_runs(rows, width, (4, 0))
+    assert sorted(runs) == [(0, 0, 2), (0, 3, 6), (2, 0, 6)]
+
+
+def test_respawns_stay_in_reachable_region():
+    state = snake_levels.LevelState(40, 30, 'rocky', seed=0)
+    reachable = reachable_cells(state)
+    assert len(reachable) < state.field_size - state.count_stones, (
+        'На уровне должны быть клетки, замкнутые камнями.'
+    )
+    for _ in range(10):
+        for obstacle in state.obstacles:
+            old = obstacle.position
+            obstacle.randomize_position(state)
+            state.vacate(old)
+        reachable = reachable_cells(state)
+        apples = [obstacle.position for obstacle in state.obstacles
+                  if obstacle.cell_code() == engine.APPLE]
+        assert all(apple in reachable for apple in apples), (
+            'Яблоко перенесено за камни.'
+        )
+    assert len(state.free_cells) == state.grid.count(engine.EMPTY)
+
+
+def median_respawn(state):
+    apple = next(obstacle for obstacle in state.obstacles
+                 if obstacle.cell_code() == engine.APPLE)
+    timings = []
+    for _ in range(200):
+        old = apple.position
+        start = perf_counter()
+        apple.randomize_position(state)
+        timings.append(perf_counter() - start)
+        state.vacate(old)
+    return median(timings)
+
+
+def test_respawn_does_not_scan_the_field():
+    state = snake_levels.LevelState(500, 500, 'rocky', seed=1)
+    plain = engine.GameState(500, 500, 1, 0, seed=1)
+    level, layout = median_respawn(state), median_respawn(plain)
+    assert level < 10 * layout, (
+        f'Перенос яблока на уровне стоит {level * 1e6:.1f} мкс, а на '
+        f'обычном поле - {layout * 1e6:.1f} мкс.'
+    )
+
+
+def median_reset(state):
+    timings = []
+    for _ in range(5):
+        start = perf_counter()
+        engine.reset_game(state)
+        timings.append(perf_counter() - start)
+    return median(timings)
+
+
+def test_level_costs_about_as_much_as_random_layout():
+    state = snake_levels.LevelState(500, 500, seed=1)
+    plain = engine.GameState(500, 500, state.count_apples,
+                             state.count_stones, seed=1)
+    level, layout = median_reset(state), median_reset(plain)
+    assert level < 3 * layout, (
+        f'Уровень 500x500 строится {level * 1000:.1f} мс, а случайная '
+        f'расстановка - {layout * 1000:.1f} мс.'
+    )
@@ -0,0 +1,103 @@
+from time import perf_counter
+
+import pytest
+
+import snake_engine as engine
+import snake_maps
+from snake_levels import LevelState
+
+TEXT_MAP = '''seed 7
+*....
+..S.3
+9...*
+'''
+
+
+def test_generated_level_persists_across_resets(tmp_path):
+    level = LevelState(40, 30, 'dense', seed=2)
+    path = tmp_path / 'level.snkm'
+    snake_maps.save_map(snake_maps.take_map(level), path)
+
+    state = snake_maps.MapState(snake_maps.open_map(path))
+    assert state.seed == level.seed
+    assert state.snake.position == level.snake.position
+    assert (state.count_apples, state.count_stones) == (
+        level.count_apples, level.count_stones
+    )
+    layout = bytes(state.grid)
+    assert layout == bytes(level.grid)
+
+    state.snake.move(state.snake.new_head(state.width, state.height))
+    state.obstacles[0].randomize_position(state)
+    engine.reset_game(state, True)
+    assert state.seed == level.seed
+    assert bytes(state.grid) == layout
+    assert set(state.obstacles.positions()) == set(level.obstacles.positions())
+    assert len(state.free_cells) == state.grid.count(engine.EMPTY)
+
+    data = state.game_map.cells.obj
+    state.close()
+    assert data.closed
+
+
+def test_text_round_trip():
+    data = snake_maps.text_to_map(TEXT_MAP)
+    game_map = snake_maps.read_map(data)
+    assert (game_map.width, game_map.height, game_map.seed) == (5, 3, 7)
+    assert snake_maps.map_to_text(game_map) == TEXT_MAP
+
+    state = snake_maps.MapState(game_map)
+    assert state.snake.position == (2, 1)
+    assert (state.count_apples, state.count_stones) == (2, 2)
+    assert state.obstacles.at((4, 1)).weight == 3
+    assert state.obstacles.at((0, 2)).weight == 9
+
+    with pytest.raises(ValueError):
+        snake_maps.text_to_map('seed 7\n..#..\n')
+    with pytest.raises(ValueError):
+        snake_maps.text_to_map('seed 7\n...\n....\n')
+
+
+def test_large_map_opens_without_parsing(tmp_path):
+    width, height = 2000, 2000
+    cells = bytearray(width * height)
+    cells[::997] = bytes([engine.STONE + 1]) * len(cells[::997])
+    path = tmp_path / 'large.snkm'
+    snake_maps.save_map(snake_maps.pack_map(width, height, 1, cells), path)
+
+    opening, parsing = [], []
+    for _ in range(3):
+        start = perf_counter()
+        with snake_maps.open_map(path) as game_map:
+            middle = perf_counter()
+            groups = snake_maps.map_cells(game_map)
+            opening.append(middle - start)
+            parsing.append(perf_counter() - middle)
+            assert game_map.cells[997] == engine.STONE + 1
+    assert min(opening) < min(parsing) / 10, (
+        f'Карта 2000x2000 открывается {min(opening) * 1000:.1f} мс, а '
+        f'один проход по её сетке занимает {min(parsing) * 1000:.1f} мс.'
+    )
+    assert len(groups[engine.STONE + 1]) == len(cells[::997])
+    with pytest.raises(ValueError):
+        game_map.cells[997]
+
+
+def test_new_game_on_map_uses_map_seed():
+    state = snake_maps.MapState(
+        snake_maps.read_map(snake_maps.text_to_map(TEXT_MAP)), seed=3
+    )
+    assert state.seed == 3
+    engine.reset_game(state, True)
+    assert state.seed == 7
+    engine.reset_game(state, True, seed=5)
+    assert state.seed == 5
+
+
+def test_oversized_map_is_rejected(_the_snake, tmp_path):
+    width = _the_snake.MAX_BOARD_SIZE + 1
+    path = tmp_path / 'wide.snkm'
+    snake_maps.save_map(snake_maps.pack_map(width, 2, 1, bytes(width * 2)),
+                        path)
+    with pytest.raises(ValueError):
+        _the_snake.load_game(10, 10, map_path=str(path))
@@ -0,0 +1,37 @@
+import json
+
+import snake_profiler
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert snake_profiler.percentile(values, 50) == 50
+    assert snake_profiler.percentile(values, 99) == 99
+    assert snake_profiler.percentile([], 95) == 0.0
+
+
+def test_profiler_collects_phases_and_dumps(tmp_path):
+    now = [0.0]
+    profiler = snake_profiler.FrameProfiler(timer=lambda: now[0])
+    profiler.start()
+    profiler.mark('input')
+    profiler.end_frame()
+    assert profiler.frames == 0, 'Выключенный профилировщик не копит кадры.'
+
+    profiler.toggle()
+    for _ in range(10):
+        profiler.start()
+        now[0] += 0.001
+        profiler.mark('input')
+        now[0] += 0.004
+        profiler.mark('draw')
+        profiler.end_frame()
+
+    stats = profiler.stats()
+    assert round(stats['input']['p50'], 6) == 1.0
+    assert round(stats['frame']['p99'], 6) == 5.0
+    assert stats['logic']['p95'] == 0.0
+
+    path = tmp_path / 'profile.json'
+    profiler.dump(path)
+    assert json.loads(path.read_text())['frames'] == 10
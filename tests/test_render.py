@@ -0,0 +1,117 @@
+import random
+
+import pygame
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def display(_the_snake):
+    _the_snake.init_display()
+
+
+def test_dirty_render_matches_full_redraw(_the_snake):
+    state = _the_snake.GameField(seed=3)
+    renderer = _the_snake.FieldRenderer(state)
+    renderer.render()
+
+    rng = random.Random(5)
+    for _ in range(500):
+        _the_snake.engine.step(state, rng.choice(_the_snake.engine.DIRECTIONS))
+        renderer.render()
+    dirty = pygame.image.tostring(_the_snake.screen, 'RGB')
+
+    renderer.invalidate()
+    renderer.render()
+    full = pygame.image.tostring(_the_snake.screen, 'RGB')
+    assert dirty == full, (
+        'Частичная перерисовка должна давать ту же картинку, что и полная.'
+    )
+
+
+def test_smooth_movement_is_restored(_the_snake):
+    state = _the_snake.GameField(seed=4)
+    renderer = _the_snake.FieldRenderer(state)
+    renderer.render()
+
+    rng = random.Random(6)
+    for _ in range(300):
+        renderer.render(rng.random())
+        _the_snake.engine.step(state, rng.choice(_the_snake.engine.DIRECTIONS))
+    renderer.render()
+    smooth = pygame.image.tostring(_the_snake.screen, 'RGB')
+
+    renderer.invalidate()
+    renderer.render()
+    full = pygame.image.tostring(_the_snake.screen, 'RGB')
+    assert smooth == full, (
+        'Промежуточные кадры плавного движения не должны оставлять следов.'
+    )
+
+
+def test_fixed_timestep(_the_snake):
+    now = [0.0]
+    timer = _the_snake.FixedTimestep(10, max_steps=3, timer=lambda: now[0])
+    assert timer.ticks() == 0
+
+    now[0] = 0.25
+    assert timer.ticks() == 2
+    assert abs(timer.alpha() - 0.5) < 1e-9
+
+    now[0] = 10
+    assert timer.ticks() == 3, (
+        'После подвисания шаги догоняются не больше чем {max_steps} за раз.'
+    )
+    assert timer.alpha() == 0
+
+
+def test_large_board_is_drawn_pixel_per_cell(_the_snake):
+    state = _the_snake.GameField(1000, 1000, seed=7)
+    renderer = _the_snake.make_renderer(state)
+    assert isinstance(renderer, _the_snake.PixelRenderer)
+    assert renderer.render() is None
+    assert renderer.render() == [], (
+        'Если поле не менялось, кадр не должен перерисовываться.'
+    )
+
+    for _ in range(50):
+        _the_snake.engine.step(state)
+    renderer.render()
+    target = renderer.target
+    head_x, head_y = state.snake.get_head_position()
+    pixel = (target.x + int((head_x + 0.5) * target.w / state.width),
+             target.y + int((head_y + 0.5) * target.h / state.height))
+    assert _the_snake.screen.get_at(pixel)[:3] == _the_snake.SNAKE_COLOR
+
+
+def test_camera_follows_the_head(_the_snake):
+    state = _the_snake.GameField(200, 200, seed=8)
+    renderer = _the_snake.make_renderer(state, camera=(40, 30))
+    renderer.render()
+    view = renderer.view_rect()
+    assert view.size == (40, 30)
+    assert view.collidepoint(state.snake.get_head_position())
+    assert _the_snake.screen.get_at(renderer.target.center)[:3] == (
+        _the_snake.SNAKE_COLOR
+    )
+
+
+def test_arena_dirty_render_matches_full_redraw(_the_snake):
+    import snake_arena
+
+    state = _the_snake.arena_field()(seed=6, count_snakes=20)
+    renderer = _the_snake.FieldRenderer(state)
+    renderer.render()
+
+    rng = random.Random(7)
+    for _ in range(300):
+        snake_arena.arena_step(
+            state, [rng.choice(_the_snake.engine.DIRECTIONS)
+                    for _ in state.snakes]
+        )
+        renderer.render()
+    dirty = pygame.image.tostring(_the_snake.screen, 'RGB')
+
+    renderer.invalidate()
+    renderer.render()
+    full = pygame.image.tostring(_the_snake.screen, 'RGB')
+    assert dirty == full
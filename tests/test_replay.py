@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+import snake_engine as engine
+import snake_replay
+
+
+def record_game(seed, ticks):
+    state = engine.GameState(12, 9, count_apples=5, count_stones=4,
+                             seed=seed)
+    recorder = snake_replay.ReplayRecorder(state)
+    rng = random.Random(seed)
+    for _ in range(ticks):
+        if rng.random() < 0.3:
+            state.snake.update_direction(rng.choice(engine.DIRECTIONS))
+        recorder.step(state)
+    return state, recorder.replay()
+
+
+def test_same_seed_gives_same_game():
+    first = engine.GameState(seed=42)
+    second = engine.GameState(seed=42)
+    assert first.grid == second.grid
+    assert first.snake.direction == second.snake.direction
+
+
+def test_replay_reproduces_the_game(tmp_path):
+    state, replay = record_game(7, 3000)
+    path = tmp_path / 'game.snkr'
+    snake_replay.save_replay(replay, path)
+
+    loaded = snake_replay.load_replay(path)
+    assert loaded == replay
+    played = snake_replay.play_replay(loaded)
+    assert played.grid == state.grid
+    assert played.snake.positions == state.snake.positions
+    assert (played.eaten_apples, played.resets) == (
+        state.eaten_apples, state.resets
+    )
+
+
+def test_replay_is_two_bits_per_tick():
+    _, replay = record_game(3, 6 * 3600)
+    size = len(replay.to_bytes())
+    assert size == snake_replay.HEADER.size + 6 * 3600 // 4, (
+        'Час игры должен занимать в записи по два бита на тик.'
+    )
+
+
+def test_truncated_replay_is_rejected():
+    _, replay = record_game(5, 10)
+    with pytest.raises(ValueError):
+        snake_replay.Replay.from_bytes(replay.to_bytes()[:-1])
+
+
+def test_player_seeks_to_the_same_state():
+    state, replay = record_game(9, 2000)
+    player = snake_replay.ReplayPlayer(replay, interval=100)
+    assert len(player.keyframes) == 20
+
+    player.seek(replay.ticks)
+    assert player.state.grid == state.grid
+    assert player.state.snake.positions == state.snake.positions
+
+    player.seek(1234)
+    expected = snake_replay.ReplayPlayer(replay._replace(ticks=1234))
+    expected.seek(1234)
+    assert player.state.grid == expected.state.grid
+    assert (player.state.free_cells.order()
+            == expected.state.free_cells.order())
+    assert player.state.free_cells.slots == expected.state.free_cells.slots
+    assert player.state.rng.getstate() == expected.state.rng.getstate()
+
+
+def test_keyframes_stay_small_on_large_boards():
+    assert snake_replay.keyframe_interval(32 * 24) == (
+        snake_replay.KEYFRAME_INTERVAL
+    )
+    state = engine.GameState(300, 200, seed=4)
+    recorder = snake_replay.ReplayRecorder(state)
+    for _ in range(100):
+        recorder.step(state)
+    player = snake_replay.ReplayPlayer(recorder.replay())
+    keyframe, = player.keyframes
+
+    free_cells = keyframe.free_cells
+    assert not hasattr(keyframe, 'grid')
+    assert (free_cells.itemsize * len(free_cells) / player.interval
+            <= snake_replay.KEYFRAME_BYTES_PER_TICK)
+
+    player.seek(100)
+    player.seek(50)
+    player.seek(100)
+    assert player.state.grid == state.grid
+    assert player.state.free_cells.order() == state.free_cells.order()
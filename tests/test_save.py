@@ -0,0 +1,132 @@
+import random
+import struct
+import zlib
+
+import pytest
+
+import snake_engine as engine
+import snake_save
+from snake_bench import make_state
+
+
+def played_state(width, height, seed, ticks):
+    state = engine.GameState(width, height, 6, 5, seed=seed)
+    rng = random.Random(seed)
+    for _ in range(ticks):
+        engine.step(state, rng.choice(engine.DIRECTIONS))
+    return state
+
+
+def test_snapshot_restores_the_game(tmp_path):
+    state = played_state(14, 10, 3, 3000)
+    path = tmp_path / 'game.save'
+    snake_save.save_snapshot(state, path)
+    loaded = snake_save.load_snapshot(path)
+
+    assert loaded.grid == state.grid
+    assert list(loaded.snake.positions) == list(state.snake.positions)
+    assert loaded.snake.direction == state.snake.direction
+    assert [(o.position, o.cell_code()) for o in loaded.obstacles] == [
+        (o.position, o.cell_code()) for o in state.obstacles
+    ]
+    assert (loaded.seed, loaded.eaten_apples, loaded.resets) == (
+        state.seed, state.eaten_apples, state.resets
+    )
+    assert (loaded.count_apples, loaded.count_stones) == (6, 5)
+    assert loaded.rng.getstate() == state.rng.getstate()
+    assert len(loaded.free_cells) == loaded.grid.count(engine.EMPTY)
+
+    again = snake_save.load_snapshot(path)
+    rng = random.Random(3)
+    for _ in range(1000):
+        direction = rng.choice(engine.DIRECTIONS)
+        engine.step(loaded, direction)
+        engine.step(again, direction)
+        assert len(loaded.free_cells) == loaded.grid.count(engine.EMPTY)
+    assert loaded.grid == again.grid, (
+        'Партия из одного снимка должна продолжаться одинаково.'
+    )
+
+
+def test_snapshot_uses_two_bytes_per_cell_on_small_fields():
+    state = played_state(14, 10, 4, 500)
+    size = (snake_save.HEADER.size + 2 * state.snake.length
+            + 3 * len(state.obstacles) + 4 * snake_save.RNG_WORDS)
+    assert len(snake_save.take_snapshot(state)) == size
+
+
+def test_snapshot_does_not_grow_with_the_field():
+    state = make_state(1000, 1000, 100)
+    data = snake_save.take_snapshot(state)
+    assert len(data) == snake_save.snapshot_size('I', 100,
+                                                 len(state.obstacles))
+
+    loaded = engine.GameState(1000, 1000, 0, 0, seed=1)
+    snake_save.restore_snapshot(loaded, data)
+    assert loaded.grid == state.grid
+    assert len(loaded.free_cells) == len(state.free_cells)
+
+
+@pytest.mark.parametrize('cut', [5, snake_save.HEADER.size + 1, -1])
+def test_broken_snapshot_is_rejected(cut):
+    data = snake_save.take_snapshot(played_state(14, 10, 5, 100))
+    state = engine.GameState(14, 10, seed=0)
+    with pytest.raises(ValueError):
+        snake_save.restore_snapshot(state, data[:cut])
+
+
+def tampered(data, offset, value):
+    data = bytearray(data)
+    data[offset] = value
+    prefix = snake_save.HEADER.size - snake_save.CHECKSUM.size
+    snake_save.CHECKSUM.pack_into(data, prefix, zlib.crc32(
+        data[snake_save.HEADER.size:], zlib.crc32(data[:prefix])
+    ))
+    return bytes(data)
+
+
+def test_corrupt_snapshot_is_rejected():
+    state = played_state(14, 10, 6, 100)
+    data = snake_save.take_snapshot(state)
+    direction = struct.calcsize('<4sBcHHHHQ')
+    body = snake_save.HEADER.size + 1
+    obstacle = (snake_save.HEADER.size + 2 * state.snake.length
+                + 2 * len(state.obstacles))
+    broken = [
+        data[:-1] + bytes([data[-1] ^ 1]),
+        data[:direction] + bytes([data[direction] ^ 1])
+        + data[direction + 1:],
+        tampered(data, direction, len(engine.DIRECTIONS)),
+        tampered(data, body, 0xFF),
+        tampered(data, obstacle, engine.SNAKE),
+        tampered(data, obstacle - 2, data[obstacle - 4]),
+    ]
+
+    loaded = engine.GameState(14, 10, seed=0)
+    grid = bytes(loaded.grid)
+    for data in broken:
+        with pytest.raises(ValueError):
+            snake_save.restore_snapshot(loaded, data)
+        assert loaded.grid == grid
+
+
+@pytest.mark.parametrize('offset, value', [
+    (struct.calcsize('<4sBcHH') + 1, 0x13), (struct.calcsize('<4sBc'), 0),
+], ids=['count_apples', 'width'])
+def test_corrupt_header_is_rejected_on_load(tmp_path, offset, value):
+    path = tmp_path / 'game.save'
+    data = snake_save.take_snapshot(played_state(14, 10, 7, 100))
+    path.write_bytes(tampered(data, offset, value))
+    with pytest.raises(ValueError):
+        snake_save.load_snapshot(path)
+
+
+def test_autosaver_writes_in_background(tmp_path):
+    state = played_state(14, 10, 8, 100)
+    path = tmp_path / 'game.save'
+    autosaver = snake_save.Autosaver(path, interval=10)
+    autosaver.update(state, 5)
+    assert autosaver.pending is None
+    autosaver.update(state, 5)
+    autosaver.close()
+    assert path.read_bytes() == snake_save.take_snapshot(state)
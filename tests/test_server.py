@@ -0,0 +1,98 @@
+import asyncio
+
+import snake_engine as engine
+import snake_server
+from snake_arena import ArenaState, arena_step
+
+
+async def play(server, clients, players, ticks):
+    listener = await server.serve(port=0)
+    port = listener.sockets[0].getsockname()[1]
+    await asyncio.gather(*(client.connect(port=port) for client in clients))
+
+    async def steer(player, turn):
+        for tick in range(ticks):
+            if tick % 5 == 0:
+                player.send_direction(engine.DIRECTIONS[(tick + turn) % 4])
+            await player.receive()
+
+    await asyncio.gather(
+        server.run(ticks),
+        *(steer(player, turn) for turn, player in
+          enumerate(clients[:players])),
+        *(client.follow(ticks) for client in clients[players:])
+    )
+    snakes = list(server.players.values())
+    grid = bytes(server.state.grid)
+    await asyncio.gather(*(client.close() for client in clients))
+    listener.close()
+    await listener.wait_closed()
+    return snakes, grid
+
+
+def test_clients_mirror_server_grid():
+    state = ArenaState(10, 8, 6, 8, seed=2, count_snakes=0)
+    server = snake_server.GameServer(state, rate=500)
+    clients = [snake_server.GameClient() for _ in range(3)]
+    snakes, grid = asyncio.run(play(server, clients, 2, 300))
+
+    assert len(snakes) == len(set(map(id, snakes))) == 2, (
+        'У каждого игрока должна быть своя змейка.'
+    )
+    assert state.deaths, 'За партию змейки должны хотя бы раз погибнуть.'
+    for client in clients:
+        assert client.tick == server.tick
+        assert client.grid == grid, (
+            'Копия поля у клиента должна совпадать с полем сервера.'
+        )
+
+
+def test_plain_move_sends_head_and_tail_only():
+    state = ArenaState(10, 8, 0, 0, seed=3, count_snakes=1)
+    server = snake_server.GameServer(state)
+    arena_step(state)
+    state.changed.clear()
+    state.redraw_all = False
+
+    arena_step(state)
+    message = server.delta_message()
+    assert len(message) == (snake_server.FRAME.size
+                            + snake_server.DELTA_HEADER.size
+                            + 2 * snake_server.CHANGE.size)
+
+
+async def join_and_leave(server):
+    listener = await server.serve(port=0)
+    port = listener.sockets[0].getsockname()[1]
+    player = snake_server.GameClient()
+    await player.connect(port=port)
+    player.send_direction(engine.UP)
+    await server.run(2)
+    joined = len(server.state.snakes)
+    await player.close()
+    await server.run(2)
+    listener.close()
+    await listener.wait_closed()
+    return joined
+
+
+def test_snake_leaves_with_its_player():
+    state = ArenaState(10, 8, 0, 0, seed=5, count_snakes=0)
+    server = snake_server.GameServer(state, rate=500)
+    assert not state.grid.count(engine.SNAKE)
+
+    assert asyncio.run(join_and_leave(server)) == 1
+    assert not state.snakes and not server.players
+    assert not state.grid.count(engine.SNAKE)
+    assert len(state.free_cells) == state.field_size
+
+
+def test_hundreds_of_spectators_keep_tick_rate():
+    rate = 30
+    alone = asyncio.run(snake_server.load_test(0, 30, rate=rate))
+    result = asyncio.run(snake_server.load_test(200, 30, rate=rate))
+    assert result['synced'] == 200
+    assert result['lag_ms']['p50'] < (
+        alone['lag_ms']['p50'] + 1000 / rate / 4
+    ), f'Зрители замедляют тики: {result["lag_ms"]} против {alone["lag_ms"]}.'
+
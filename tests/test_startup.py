@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+from conftest import BASE_DIR
+from snake_bench import STARTUP_BUDGET, import_time
+
+
+def test_engine_import_is_fast():
+    code = 'import snake_engine, sys; assert "pygame" not in sys.modules'
+    subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, check=True)
+
+    engine = min(import_time('snake_engine') for _ in range(3))
+    assert engine < STARTUP_BUDGET, (
+        f'Импорт `snake_engine` занял {engine * 1000:.1f} мс при бюджете '
+        f'{STARTUP_BUDGET * 1000:.0f} мс.'
+    )
+
+
+def test_import_does_not_load_feature_modules():
+    code = (
+        'import the_snake, sys; '
+        'assert not {"snake_arena", "snake_autopilot", "snake_levels", '
+        '"snake_maps", "snake_replay", "snake_save"} & set(sys.modules)'
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, check=True)
+
+
+def test_import_does_not_open_display():
+    code = (
+        'import the_snake, pygame; '
+        'assert not pygame.display.get_init(); '
+        'assert not pygame.font.get_init()'
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR,
+                            capture_output=True)
+    assert result.returncode == 0, (
+        'Импорт `the_snake` не должен открывать окно и создавать шрифты: '
+        'это делает `init_display()`.'
+    )
@@ -0,0 +1,44 @@
+import pytest
+
+
+@pytest.fixture
+def tournament():
+    import snake_tournament
+    return snake_tournament
+
+
+def test_tournament_matches_single_process(tournament):
+    jobs = [tournament.Job(policy, seed, max_ticks=300)
+            for seed in range(4) for policy in tournament.POLICIES]
+    results = list(tournament.run_tournament(jobs, workers=2))
+
+    assert sorted(results) == sorted(map(tournament.play_game, jobs)), (
+        'Результат партии должен зависеть только от политики и зерна.'
+    )
+
+
+def test_report_summary(tournament):
+    report = tournament.Report()
+    report.add(tournament.GameResult('random', 1, 5, 4, 100))
+    report.add(tournament.GameResult('random', 2, 3, 2, 50))
+
+    row, = report.summary()
+    assert row['games'] == 2
+    assert row['mean_length'] == 4
+    assert row['max_length'] == 5
+    assert row['mean_ticks'] == 75
+
+
+def test_results_stream_as_games_finish(tournament, monkeypatch):
+    monkeypatch.setattr(tournament, 'JOBS_CHUNK_SIZE', 1)
+    jobs = [tournament.Job('straight', 0, max_ticks=100000, width=400,
+                           height=400, count_apples=0, count_stones=0)]
+    jobs += [tournament.Job('straight', seed, max_ticks=5)
+             for seed in range(1, 5)]
+    results = tournament.run_tournament(jobs, workers=2)
+
+    assert next(results).ticks <= 5, (
+        'Готовые партии не должны ждать долгую партию.'
+    )
+    assert sorted(result.seed for result in results) == [0, 2, 3, 4]
+
@@ -1,9 +1,21 @@
-from random import choice
-from typing import Optional
+import argparse
+import math
+import os
+from functools import lru_cache
+from time import perf_counter
+from typing import TYPE_CHECKING, Optional
 
 import pygame as pg
 
-pg.init()
+import snake_engine as engine
+from snake_engine import DOWN, LEFT, OPPOSITE, RIGHT, UP, reset_game
+from snake_input import TurnQueue
+from snake_profiler import FRAME, PERCENTILES, PHASES, FrameProfiler
+
+if TYPE_CHECKING:
+    from snake_autopilot import Autopilot
+    from snake_replay import ReplayPlayer, ReplayRecorder
+    from snake_save import Autosaver
 
 """Константы для размеров поля и сетки"""
 SCREEN_WIDTH, SCREEN_HEIGHT = 640, 480
@@ -15,18 +27,11 @@ MENU_FONT_SIZE = 35
 TITLE_FONT_SIZE = 60
 GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
 GRID_HEIGHT = SCREEN_HEIGHT // GRID_SIZE
-FIELD_SIZE = GRID_WIDTH * GRID_HEIGHT
-FIELD_CELLS = set(
-    (x * GRID_SIZE, y * GRID_SIZE)
-    for x in range(GRID_WIDTH)
-    for y in range(GRID_HEIGHT)
-)
 
-"""Направления движения"""
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
+"""Наибольшая сторона поля в клетках. Поля, которые не помещаются в
+окно клетками по {GRID_SIZE} пикселей, рисуются по пикселю на клетку и
+масштабируются на окно."""
+MAX_BOARD_SIZE = 1000
 
 """Цвета объектов и игрового поля."""
 BOARD_BACKGROUND_COLOR = (47, 71, 22)
@@ -38,189 +43,589 @@ SNAKE_COLOR = (0, 255, 0)
 STONE_COLOR = (107, 99, 92)
 DEFAULT_COLOR = (0, 0, 0)
 
-"""Управление скорость и замедлением игры."""
+"""Управление скорость и замедлением игры. {GAME_SPEED} - кадров в
+секунду, {LOGIC_SPEED} - шагов змейки в секунду, независимо от частоты
+кадров."""
 GAME_SPEED = 60
-SLOW_SPEED = 10
-
-"""Количество игровых объектов на поле."""
-DEFAULT_COUNT_APPLES = 20
-DEFAULT_COUNT_STONES = 10
-DEFAULT_STONE_WEIGHT = 5
+LOGIC_SPEED = 6
+MAX_CATCH_UP_TICKS = 5
+SMOOTH_MOVEMENT = False
+
+"""Каталог для записей сыгранных партий, задаётся переменной окружения
+SNAKE_REPLAYS. Пустое значение отключает сохранение записей."""
+REPLAYS_DIR = os.environ.get('SNAKE_REPLAYS', 'replays')
+
+"""Файл сохранения партии, задаётся переменной окружения SNAKE_SAVE.
+Пустое значение отключает сохранение. Партия сохраняется при выходе и
+каждые {AUTOSAVE_TICKS} тиков, а при запуске загружается из файла, и
+её можно продолжить из меню."""
+SAVE_FILE = os.environ.get('SNAKE_SAVE', 'snake.save')
+AUTOSAVE_TICKS = LOGIC_SPEED * 10
+
+"""Автопилот вместо клавиатуры, включается переменной окружения
+SNAKE_AUTOPILOT или ключом --autopilot."""
+AUTOPILOT = bool(os.environ.get('SNAKE_AUTOPILOT'))
+
+"""Скорости проигрывания записей относительно {LOGIC_SPEED} и шаг
+перемотки в тиках."""
+REPLAY_SPEEDS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+REPLAY_SEEK_TICKS = LOGIC_SPEED * 10
+
+"""Профилирование кадра: включается переменной окружения SNAKE_PROFILE
+или клавишей {PROFILE_KEY}, при выходе перцентили записываются в файл
+из SNAKE_PROFILE_FILE. Таблица на экране обновляется раз в
+{PROFILE_REFRESH} кадров. Строка {TURN_LATENCY} - задержка от нажатия
+стрелки до хода змейки."""
+PROFILE_FILE = os.environ.get('SNAKE_PROFILE_FILE', 'profile.json')
+PROFILE_REFRESH = 30
+TURN_LATENCY = 'turn'
+PROFILE_FONT_SIZE = 20
+PROFILE_COLUMN_WIDTH = 60
+PROFILE_PADDING = 4
+PROFILE_POSITION = (4, 4)
+PROFILE_COLOR = (255, 255, 255)
+PROFILE_BACKGROUND = (0, 0, 0)
 
 """Клавиши."""
 KEY_ENTER = 13
-
-"""Основной эран игры."""
-screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
-
-"""Меню игры."""
-main_menu = pg.Surface((MENU_WIDTH, MENU_HEIGHT))
-main_menu_rect = main_menu.get_rect(center=MIDDLE_SCREEN)
-title_menu = pg.Surface((TITLE_MENU_WIDTH, TITLE_MENU_HEIGHT))
-title_menu_rect = main_menu.get_rect(
-    center=(SCREEN_WIDTH // 2, main_menu_rect.y + TITLE_MENU_HEIGHT)
+PROFILE_KEY = pg.K_F3
+TURN_KEYS = {pg.K_UP: UP, pg.K_DOWN: DOWN, pg.K_LEFT: LEFT, pg.K_RIGHT: RIGHT}
+
+"""Сколько отрисованных надписей хранится в кэше текста."""
+TEXT_CACHE_SIZE = 32
+
+"""Основной эран игры. До вызова {init_display} это обычная поверхность
+в памяти: при импорте модуля окно не открывается."""
+screen = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+"""Меню игры. Поверхности меню создаются в {init_display}."""
+main_menu_rect = pg.Rect((0, 0), (MENU_WIDTH, MENU_HEIGHT))
+main_menu_rect.center = MIDDLE_SCREEN
+title_menu_rect = main_menu_rect.copy()
+title_menu_rect.center = (
+    SCREEN_WIDTH // 2, main_menu_rect.y + TITLE_MENU_HEIGHT
 )
+main_menu: Optional[pg.Surface] = None
+title_menu: Optional[pg.Surface] = None
 
 """Объект в котором будет хранится фон для игры."""
-background_surface = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-
-"""Создание фона для созданиея на ней текстуры (например песка)."""
-background_surface.fill(BOARD_BACKGROUND_COLOR)
-
-"""Отрисовка фона на экране"""
-screen.blit(background_surface, (0, 0))
+background_surface: Optional[pg.Surface] = None
 
 """Создаем объект для управления заголовком игры."""
 game_caption = pg.display.set_caption
-game_caption('Змейка')
 
-"""Создаем объект текст."""
-menu_font = pg.font.Font(None, MENU_FONT_SIZE)
-title_font = pg.font.Font(None, TITLE_FONT_SIZE)
+"""Шрифты для текста, создаются в {init_display}."""
+menu_font: Optional[pg.font.Font] = None
+title_font: Optional[pg.font.Font] = None
+profile_font: Optional[pg.font.Font] = None
 
 """Объект для управления временем."""
 clock = pg.time.Clock()
 
 
-class GameObject():
-    """Базовый класс от которого наследуются все игровые объекты."""
+class TileAtlas():
+    """Заранее отрисованные клетки поля, по одной на каждый цвет, и
+    заранее рассчитанные области экрана для каждой клетки. Рисование
+    клетки сводится к копированию готовой поверхности.
+    """
+
+    def __init__(self, width: int, height: int, size: int) -> None:
+        """Рассчитывает области клеток и рисует основные плитки."""
+        self.width = width
+        self.size = size
+        self.rects = [
+            pg.Rect(x * size, y * size, size, size)
+            for y in range(height)
+            for x in range(width)
+        ]
+        self.tiles: dict[tuple, pg.Surface] = {}
+        for color in (SNAKE_COLOR, APPLE_COLOR, STONE_COLOR):
+            self.tile(color)
+        self.tile(BOARD_BACKGROUND_COLOR, border=False)
+
+    def tile(self, color: tuple[int, int, int],
+             border: bool = True) -> pg.Surface:
+        """Возвращает плитку цвета {color}, отрисовывая её при первом
+        обращении.
+        """
+        tile = self.tiles.get((color, border))
+        if tile is None:
+            tile = pg.Surface((self.size, self.size))
+            tile.fill(color)
+            if border:
+                pg.draw.rect(tile, BORDER_COLOR, tile.get_rect(), 1)
+            self.tiles[(color, border)] = tile
+
+        return tile
+
+    def rect(self, cell: tuple[int, int]) -> pg.Rect:
+        """Возвращает область экрана, занимаемую клеткой {cell}."""
+        return self.rects[cell[1] * self.width + cell[0]]
 
-    def __init__(self,
-                 body_color: tuple[int, int, int] = DEFAULT_COLOR,
-                 name: Optional[str] = None) -> None:
-        """Инициализирует новый экземпляр класса {GameObject}."""
-        self.position: tuple[int, int] = MIDDLE_SCREEN
-        self.body_color = body_color
-        self.name = name or str(type(self).__name__).lower()
+
+"""Плитки для отрисовки клеток поля, создаются в {init_display}."""
+tile_atlas: Optional[TileAtlas] = None
+
+
+def init_display() -> None:
+    """Открывает окно игры и создаёт всё, что нужно для отрисовки: фон,
+    меню, шрифты и плитки клеток. Инициализируются только те модули
+    pygame, которые использует игра, - дисплей и шрифты.
+    """
+    global screen, main_menu, title_menu, background_surface
+    global menu_font, title_font, profile_font, tile_atlas
+
+    pg.display.init()
+    pg.font.init()
+    screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
+    game_caption('Змейка')
+
+    main_menu = pg.Surface((MENU_WIDTH, MENU_HEIGHT))
+    title_menu = pg.Surface((TITLE_MENU_WIDTH, TITLE_MENU_HEIGHT))
+
+    background_surface = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    background_surface.fill(BOARD_BACKGROUND_COLOR)
+    screen.blit(background_surface, (0, 0))
+
+    menu_font = pg.font.Font(None, MENU_FONT_SIZE)
+    title_font = pg.font.Font(None, TITLE_FONT_SIZE)
+    profile_font = pg.font.Font(None, PROFILE_FONT_SIZE)
+    tile_atlas = TileAtlas(GRID_WIDTH, GRID_HEIGHT, GRID_SIZE)
+
+
+class GameObject(engine.GameObject):
+    """Базовый класс от которого наследуются все игровые объекты.
+    Добавляет к логике из {snake_engine} цвет и отрисовку на экране.
+    Цвет {body_color} задаётся классом, поэтому представления
+    препятствий из {engine.ObstacleStore} не хранят его в себе. Клетка
+    и имя объекта хранятся в словаре атрибутов, а препятствия берут
+    клетку из хранилища.
+    """
+
+    body_color = DEFAULT_COLOR
 
     def draw(self) -> None:
         """Базовый метод рисования объектов. Определяется для
         каждого подкласса отдельно.
         """
 
-    def draw_cell(self, position: tuple[int, int],
-                  color: Optional[tuple[int, int, int]] = None,
-                  tail: bool = False) -> None:
-        """Отрисовывает ячейку заданых размеров."""
-        color = color or self.body_color
+    def blit_sequence(self) -> list[tuple[pg.Surface, pg.Rect]]:
+        """Возвращает клетки объекта в виде, пригодном для
+        {Surface.blits}. Определяется для каждого подкласса отдельно.
+        """
+        return []
 
-        rect = pg.Rect(
-            position,
-            (GRID_SIZE, GRID_SIZE)
+    def cell_blit(self, position: tuple[int, int],
+                  color: Optional[tuple[int, int, int]] = None,
+                  tail: bool = False) -> tuple[pg.Surface, pg.Rect]:
+        """Возвращает плитку и область экрана для клетки {position}."""
+        return (
+            tile_atlas.tile(color or self.body_color, not tail),
+            tile_atlas.rect(position)
         )
-        pg.draw.rect(screen, color, rect)
-        if not tail:
-            pg.draw.rect(screen, BORDER_COLOR, rect, 1)
 
-    def randomize_position(self,
-                           used_cells: list[tuple[int, int]] = []) -> None:
-        """Задаёт объекту случайные координаты."""
-        self.position = choice(tuple(FIELD_CELLS - set(used_cells)))
+    def draw_cell(self, position: tuple[int, int],
+                  color: Optional[tuple[int, int, int]] = None,
+                  tail: bool = False) -> pg.Rect:
+        """Отрисовывает клетку поля с координатами {position} и
+        возвращает занятую ей область экрана.
+        """
+        tile, rect = self.cell_blit(position, color, tail)
+        screen.blit(tile, rect)
+        return rect
 
 
-class Apple(GameObject):
+class Apple(GameObject, engine.Apple):
     """Класс описывающий игровой объект Яблоко."""
 
-    def __init__(self,
-                 body_color: tuple[int, int, int] = APPLE_COLOR,
-                 used_cells: list = [],
-                 name: Optional[str] = None) -> None:
-        """Инициализирует экземпляр класса {Apple}."""
-        super().__init__(body_color, name)
-        self.randomize_position(used_cells)
+    body_color = APPLE_COLOR
+
+    def blit_sequence(self) -> list[tuple[pg.Surface, pg.Rect]]:
+        """Возвращает клетку объекта для {Surface.blits}."""
+        return [self.cell_blit(self.position)]
 
     def draw(self) -> None:
         """Рисует объект на экране."""
         self.draw_cell(self.position)
 
 
-class Stone(GameObject):
+class Stone(GameObject, engine.Stone):
     """Класс описывающий игровой объект Камень."""
 
-    def __init__(self,
-                 body_color: tuple[int, int, int] = STONE_COLOR,
-                 used_cells: list = [],
-                 weight: int = DEFAULT_STONE_WEIGHT) -> None:
-        """Инициализирует экземпляр класса."""
-        super().__init__(body_color)
-        self.randomize_position(used_cells)
-        self.weight = weight
+    body_color = STONE_COLOR
+
+    def blit_sequence(self) -> list[tuple[pg.Surface, pg.Rect]]:
+        """Возвращает клетку объекта для {Surface.blits}."""
+        return [self.cell_blit(self.position)]
 
     def draw(self) -> None:
         """Рисует объет на экране."""
         self.draw_cell(self.position)
 
 
-class Snake(GameObject):
+class Snake(GameObject, engine.Snake):
     """Класс описывающий игровой объект 'Змейка'."""
 
-    def __init__(self,
-                 body_color: tuple[int, int, int] = SNAKE_COLOR) -> None:
-        """Инициализирует экземпляр класса {Snake}."""
-        super().__init__(body_color)
-        self.reset()
-        self.direction: tuple[int, int] = RIGHT
+    body_color = SNAKE_COLOR
 
-    def reset(self) -> None:
-        """Сбрасывает змейку в начальное состояние."""
-        self.positions = [self.position]
-        self.length = 1
-        self.last: Optional[tuple[int, int]] = None
-        self.direction = choice([RIGHT, LEFT, UP, DOWN])
-
-    def update_direction(self, direction: tuple[int, int]) -> None:
-        """Обновляет направление движения змейки."""
-        self.direction = direction
-
-    def new_head(self) -> tuple[int, int]:
-        """Возвращает координаты новой головы."""
-        pos_x, pos_y = self.get_head_position()
-        return (
-            (pos_x + self.direction[0] * GRID_SIZE) % SCREEN_WIDTH,
-            (pos_y + self.direction[1] * GRID_SIZE) % SCREEN_HEIGHT
-        )
+    def blit_sequence(self) -> list[tuple[pg.Surface, pg.Rect]]:
+        """Возвращает клетки змейки для {Surface.blits}. Если {last}
+        содержит координаты старого сегмента, он затирается первым.
+        """
+        tile, rect = tile_atlas.tile(SNAKE_COLOR), tile_atlas.rect
+        sequence = [(tile, rect(position)) for position in self.positions]
+        if self.last and self.last not in self.cells:
+            sequence.insert(
+                0, self.cell_blit(self.last, BOARD_BACKGROUND_COLOR, True)
+            )
+
+        return sequence
 
-    def grow_up(self, new_segment: tuple[int, int]) -> None:
-        """Увиличивает змейку на один сегмент."""
-        self.positions.insert(0, new_segment)
-        self.update_size_info()
+    def draw(self) -> None:
+        """Отрисовывает змейку на экране и если {last} содержит
+        координаты старого сегмента, затирает его.
+        """
+        screen.blits(self.blit_sequence(), False)
 
-    def cut_tail(self) -> None:
-        """Уменьшает змейку на один сегмент с конца."""
-        self.positions.pop()
-        self.update_size_info()
 
-    def update_size_info(self) -> None:
-        """Обновляет информацию о размере змейки."""
-        self.length = len(self.positions)
-        game.update_snake_length(self.length)
+class GameField(engine.GameState):
+    """Состояние партии, объекты которой умеют рисовать себя на экране."""
 
-    def get_head_position(self) -> tuple[int, int]:
-        """Возвращает позицию головы змейки."""
-        return self.positions[0]
+    snake_type = Snake
+    apple_type = Apple
+    stone_type = Stone
 
     def draw(self) -> None:
-        """Отрисовывает змейку на экране и если {last} содержит
-        координаты старого сегмента, затирает его.
+        """Рисует змейку и все препятствия одним вызовом {blits}."""
+        sequence = self.snake.blit_sequence()
+        for obstacle in self.obstacles:
+            sequence.extend(obstacle.blit_sequence())
+
+        screen.blits(sequence, False)
+
+    def cell_blit(self, cell: tuple[int, int]
+                  ) -> tuple[pg.Surface, pg.Rect]:
+        """Возвращает плитку и область экрана для клетки {cell} по её
+        текущему содержимому.
         """
-        for position in self.positions:
-            self.draw_cell(position, SNAKE_COLOR)
+        code = self.cell_at(cell)
+        if code == engine.EMPTY:
+            return self.snake.cell_blit(cell, BOARD_BACKGROUND_COLOR, True)
+        if code == engine.SNAKE:
+            return self.snake.cell_blit(cell, SNAKE_COLOR)
+
+        return self.obstacles.at(cell).cell_blit(cell)
+
+
+@lru_cache(maxsize=None)
+def arena_field() -> type:
+    """Возвращает класс арены {ArenaField}. Модуль {snake_arena}
+    импортируется только при первом вызове, когда арена нужна.
+    """
+    from snake_arena import ArenaState
+
+    class ArenaField(ArenaState, GameField):
+        """Арена, змейки и препятствия которой умеют рисовать себя на
+        экране.
+        """
+
+        def draw(self) -> None:
+            """Рисует всех змеек и препятствия одним вызовом {blits}.
+            Поле перед этим залито фоном, поэтому старые сегменты змеек
+            не затираются: на их месте уже может стоять другой объект.
+            """
+            tile, rect = tile_atlas.tile(SNAKE_COLOR), tile_atlas.rect
+            sequence = [(tile, rect(cell))
+                        for snake in self.snakes for cell in snake.positions]
+            for obstacle in self.obstacles:
+                sequence.extend(obstacle.blit_sequence())
+
+            screen.blits(sequence, False)
 
-        if self.last:
-            self.draw_cell(self.last, BOARD_BACKGROUND_COLOR, True)
+    return ArenaField
+
+
+@lru_cache(maxsize=None)
+def level_field() -> type:
+    """Возвращает класс партии на уровне {LevelField}, импортируя
+    {snake_levels} при первом вызове.
+    """
+    from snake_levels import LevelState
+
+    class LevelField(LevelState, GameField):
+        """Партия на уровне из {snake_levels}, объекты которой умеют
+        рисовать себя на экране.
+        """
+
+    return LevelField
+
+
+@lru_cache(maxsize=None)
+def map_field() -> type:
+    """Возвращает класс партии на карте {MapField}, импортируя
+    {snake_maps} при первом вызове.
+    """
+    from snake_maps import MapState
+
+    class MapField(MapState, GameField):
+        """Партия на карте из {snake_maps}, объекты которой умеют
+        рисовать себя на экране.
+        """
+
+    return MapField
+
+
+def update_display(rects: Optional[list[pg.Rect]]) -> None:
+    """Выводит на экран области {rects}, а при {None} - весь экран."""
+    if rects is None:
+        pg.display.update()
+    elif rects:
+        pg.display.update(rects)
+
+
+def part_rect(cell: tuple[int, int], side: tuple[int, int],
+              fraction: float) -> tuple[pg.Rect, pg.Rect]:
+    """Возвращает часть клетки {cell} размером {fraction}, прижатую к
+    стороне {side}, и ту же часть в координатах плитки.
+    """
+    cell_rect = tile_atlas.rect(cell)
+    size = round(GRID_SIZE * fraction)
+    if side == RIGHT:
+        area = pg.Rect(GRID_SIZE - size, 0, size, GRID_SIZE)
+    elif side == LEFT:
+        area = pg.Rect(0, 0, size, GRID_SIZE)
+    elif side == DOWN:
+        area = pg.Rect(0, GRID_SIZE - size, GRID_SIZE, size)
+    else:
+        area = pg.Rect(0, 0, GRID_SIZE, size)
+
+    return area.move(cell_rect.topleft), area
+
+
+class FieldRenderer():
+    """Отрисовывает игровое поле, обновляя на экране только те клетки,
+    которые изменились с прошлого кадра: новую голову, освободившийся
+    хвост и переставленные препятствия.
+
+    Если в {render} передана доля прошедшего тика, голова заранее
+    вползает в следующую клетку, а хвост уползает из своей. Такие
+    клетки запоминаются в {overlay} и восстанавливаются кадром позже.
+    """
+
+    def __init__(self, state: GameField) -> None:
+        """Включает для партии {state} учёт изменившихся клеток."""
+        self.state = state
+        self.overlay: list[tuple[int, int]] = []
+        state.track_changes()
+
+    def invalidate(self) -> None:
+        """Требует перерисовать поле целиком на следующем кадре,
+        например после закрытия меню.
+        """
+        self.state.redraw_all = True
+
+    def render(self,
+               alpha: Optional[float] = None) -> Optional[list[pg.Rect]]:
+        """Рисует изменения на экране и возвращает их области для
+        {update_display}, или {None}, если перерисован весь экран.
+        {alpha} - доля интервала до следующего тика для плавного
+        движения, {None} отключает сглаживание.
+        """
+        state = self.state
+        rects: Optional[list[pg.Rect]] = None
+        if state.redraw_all:
+            screen.blit(background_surface, (0, 0))
+            state.draw()
+            state.redraw_all = False
+        else:
+            cells = state.changed.union(self.overlay)
+            sequence = [state.cell_blit(cell) for cell in cells]
+            screen.blits(sequence, False)
+            rects = [rect for _, rect in sequence]
+
+        state.changed.clear()
+        self.overlay = []
+        if alpha is not None:
+            motion = self.draw_motion(alpha)
+            if rects is not None:
+                rects.extend(motion)
+
+        return rects
+
+    def draw_motion(self, alpha: float) -> list[pg.Rect]:
+        """Рисует змейку сдвинутой на долю {alpha} клетки вперёд и
+        возвращает затронутые области экрана.
+        """
+        state = self.state
+        snake = state.snake
+        next_cell = snake.new_head(state.width, state.height)
+        code = state.cell_at(next_cell)
+        if code not in (engine.EMPTY, engine.APPLE):
+            return []
+
+        tile = tile_atlas.tile(SNAKE_COLOR)
+        head_part, head_area = part_rect(
+            next_cell, OPPOSITE[snake.direction], alpha
+        )
+        sequence = [(tile, head_part, head_area)]
+        self.overlay.append(next_cell)
+
+        if code == engine.EMPTY:
+            tail = snake.positions[-1]
+            if snake.length > 1:
+                toward = state.direction_to(tail, snake.positions[-2])
+            else:
+                toward = snake.direction
+            tail_part, tail_area = part_rect(tail, toward, 1 - alpha)
+            sequence[:0] = [
+                snake.cell_blit(tail, BOARD_BACKGROUND_COLOR, True),
+                (tile, tail_part, tail_area)
+            ]
+            self.overlay.append(tail)
+
+        screen.blits(sequence, False)
+        return [tile_atlas.rect(cell) for cell in self.overlay]
+
+
+def cell_palette() -> list[tuple[int, int, int]]:
+    """Возвращает палитру, в которой номер цвета совпадает с кодом
+    клетки в {GameState.grid}.
+    """
+    palette = [STONE_COLOR] * 256
+    palette[engine.EMPTY] = BOARD_BACKGROUND_COLOR
+    palette[engine.SNAKE] = SNAKE_COLOR
+    palette[engine.APPLE] = APPLE_COLOR
+    return palette
+
+
+class PixelRenderer():
+    """Отрисовывает большое поле по пикселю на клетку.
+
+    Сетка занятости {state.grid} сама служит изображением поля: поверх
+    неё без копирования создаётся 8-битная поверхность с палитрой
+    {cell_palette}, поэтому ходы змейки ничего не рисуют. На кадре, где
+    поле изменилось, видимая часть поля масштабируется на окно с
+    сохранением пропорций. Видимая часть - всё поле или, если задан
+    {camera}, окно такого размера в клетках вокруг головы змейки.
+    Время кадра зависит от размера окна, а не поля.
+    """
+
+    def __init__(self, state: GameField,
+                 camera: Optional[tuple[int, int]] = None) -> None:
+        """Включает для партии {state} учёт изменившихся клеток."""
+        self.state = state
+        self.grid: Optional[bytearray] = None
+        self.world: Optional[pg.Surface] = None
+        self.frame: Optional[pg.Surface] = None
+        view = (state.width, state.height)
+        if camera:
+            view = (min(camera[0], view[0]), min(camera[1], view[1]))
+        scale = min(SCREEN_WIDTH / view[0], SCREEN_HEIGHT / view[1])
+        self.view_size = view
+        self.target = pg.Rect(0, 0, int(view[0] * scale),
+                              int(view[1] * scale))
+        self.target.center = MIDDLE_SCREEN
+        state.track_changes()
+
+    def invalidate(self) -> None:
+        """Требует перерисовать поле на следующем кадре."""
+        self.state.redraw_all = True
+
+    def view_rect(self) -> pg.Rect:
+        """Возвращает видимую часть поля в клетках: окно камеры с
+        головой змейки в центре, прижатое к краям поля.
+        """
+        state = self.state
+        width, height = self.view_size
+        head_x, head_y = state.snake.get_head_position()
+        return pg.Rect(
+            min(max(head_x - width // 2, 0), state.width - width),
+            min(max(head_y - height // 2, 0), state.height - height),
+            width, height
+        )
+
+    def render(self,
+               alpha: Optional[float] = None) -> Optional[list[pg.Rect]]:
+        """Выводит видимую часть поля на экран. Возвращает {None}, если
+        кадр перерисован, и пустой список, если поле не менялось.
+        Плавное движение {alpha} не поддерживается.
+        """
+        state = self.state
+        if state.grid is not self.grid:
+            self.grid = state.grid
+            self.world = pg.image.frombuffer(
+                state.grid, (state.width, state.height), 'P'
+            )
+            self.world.set_palette(cell_palette())
+            self.frame = pg.Surface(self.target.size, 0, self.world)
+            self.frame.set_palette(cell_palette())
+            state.redraw_all = True
+
+        if not state.redraw_all and not state.changed:
+            return []
+
+        if state.redraw_all:
+            screen.blit(background_surface, (0, 0))
+        state.changed.clear()
+        state.redraw_all = False
+        view = self.world.subsurface(self.view_rect())
+        pg.transform.scale(view, self.target.size, self.frame)
+        screen.blit(self.frame, self.target)
+        return None
+
+
+def make_renderer(state: GameField,
+                  camera: Optional[tuple[int, int]] = None):
+    """Выбирает отрисовку поля: клетками {TileAtlas}, если поле
+    помещается в окно, и по пикселю на клетку в остальных случаях.
+    """
+    if (camera is None and state.width <= GRID_WIDTH
+            and state.height <= GRID_HEIGHT):
+        return FieldRenderer(state)
+
+    return PixelRenderer(state, camera)
+
+
+class FixedTimestep():
+    """Планировщик логических шагов с фиксированной частотой {rate} в
+    секунду, не зависящей от частоты кадров. Прошедшее время копится в
+    {accumulator}; после подвисания пропущенные шаги догоняются, но не
+    больше {max_steps} за раз.
+    """
+
+    def __init__(self, rate: float,
+                 max_steps: int = MAX_CATCH_UP_TICKS,
+                 timer=perf_counter) -> None:
+        """Инициализирует экземпляр класса."""
+        self.interval = 1 / rate
+        self.max_steps = max_steps
+        self.timer = timer
+        self.reset()
 
-    def move(self, new_head: tuple[int, int]) -> None:
-        """Сдвигает змейку на одну клетку игрового поля."""
-        self.positions.insert(0, new_head)
-        self.last = self.positions.pop()
+    def reset(self) -> None:
+        """Сбрасывает накопленное время, например на время паузы."""
+        self.accumulator = 0.0
+        self.last: Optional[float] = None
+
+    def ticks(self) -> int:
+        """Возвращает количество шагов, которые нужно выполнить сейчас."""
+        now = self.timer()
+        if self.last is not None:
+            self.accumulator += now - self.last
+        self.last = now
+
+        count = int(self.accumulator // self.interval)
+        if count > self.max_steps:
+            count = self.max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= count * self.interval
 
-    def can_bite_itself(self, new_head: tuple[int, int]) -> bool:
-        """Проверяет может ли следующим ходом змейка укусить сама себя."""
-        return new_head in self.positions
+        return count
 
-    def try_bite(self, new_head: tuple[int, int], object: GameObject) -> bool:
-        """Принимает на вход объект и проверяет можно ли его укусить."""
-        return object.position == new_head
+    def alpha(self) -> float:
+        """Возвращает долю интервала, прошедшую с последнего шага."""
+        return min(self.accumulator / self.interval, 1.0)
 
 
 class GameManager():
@@ -233,9 +638,6 @@ class GameManager():
         self.reset: bool = False
         self.new_game: bool = True
         self.__game_is_run: bool = False
-        self.__slow_count: int = 0
-        self.__snake_length: int = 1
-        self.__eaten_apples: int = 0
         self.__status_menu: bool = True
         self.__menu_value: int = 0
         self.__menu_sections: list = [
@@ -294,37 +696,11 @@ class GameManager():
         """Возвращает списо из пунктов меню."""
         return self.__menu_sections
 
-    def slow_mode(self, how_slow: int = SLOW_SPEED) -> bool:
-        """Возвращает {False} пока действует замедление для выбранного
-        блока кода, и {True} в момент когда код должен быть выполнен.
-        Работает по принципу пропуска кадров, количество пропущенных
-        кадров по умолчанию = {SLOW_SPEED}. Чем больше значение
-        тем сильнее замедление.
-        """
-        self.__slow_count += 1
-        if self.__slow_count > how_slow:
-            self.__slow_count = 0
-
-        return self.__slow_count == how_slow
-
-    def update_eaten_apples(self) -> None:
-        """Обновляет количество съеденных яблок."""
-        self.__eaten_apples += 1
-
-    def update_snake_length(self, length: int) -> None:
-        """Обновляет значение длины зъмейки."""
-        self.__snake_length = length
-
-    def reset_info(self) -> None:
-        """Сбрасывает информаци о текущей игре."""
-        self.__snake_length = 1
-        self.__eaten_apples = 0
-
-    def info(self) -> str:
+    def info(self, state: engine.GameState) -> str:
         """Выводит информацию об игре."""
         info = (
-            f'Длина змейки: {self.__snake_length} || '
-            f'Яблок съедено: {self.__eaten_apples} || '
+            f'Длина змейки: {state.snake.length} || '
+            f'Яблок съедено: {state.eaten_apples} || '
         )
         return info
 
@@ -335,49 +711,39 @@ class GameManager():
 
 """Инициализируем {GameManager} для возможнисти управлять всей логикой."""
 game = GameManager()
+profiler = FrameProfiler(enabled=bool(os.environ.get('SNAKE_PROFILE')))
+turns = TurnQueue()
 
 
 def handle_keys(snake: Snake) -> None:
-    """Отслеживает нажатые клавиши для управления змейкой."""
-    keys = pg.key.get_pressed()
-    direction: Optional[tuple[int, int]] = None
-
-    if keys[pg.K_UP] and snake.direction != DOWN:
-        direction = UP
-    elif keys[pg.K_DOWN] and snake.direction != UP:
-        direction = DOWN
-    elif keys[pg.K_LEFT] and snake.direction != RIGHT:
-        direction = LEFT
-    elif keys[pg.K_RIGHT] and snake.direction != LEFT:
-        direction = RIGHT
-
-    if direction:
+    """Применяет к змейке один поворот из очереди {turns}. Вызывается
+    перед каждым тиком.
+    """
+    direction = turns.pop()
+    if direction is not None and direction != OPPOSITE[snake.direction]:
         snake.update_direction(direction)
 
 
-def handle_keys_menu() -> None:
-    """Отслеживает нажатые клавиши для управления в меню."""
-    keys = pg.key.get_pressed()
-
-    if keys[KEY_ENTER] and game.menu_title() == 'Новая игра':
+def handle_keys_menu(key: int) -> None:
+    """Обрабатывает нажатие клавиши {key} в меню."""
+    if key == pg.K_UP:
+        game.menu_up()
+    elif key == pg.K_DOWN:
+        game.menu_down()
+    elif key != KEY_ENTER:
+        return
+    elif game.menu_title() == 'Новая игра':
         if game.new_game:
             game.new_game = False
         else:
             game.reset = True
         game.close_menu()
-    elif (keys[KEY_ENTER] and game.menu_title() == 'Продолжить'
-          and not game.new_game):
+    elif game.menu_title() == 'Продолжить' and not game.new_game:
         game.close_menu()
-    elif keys[KEY_ENTER] and game.menu_title() == 'Выход':
+    elif game.menu_title() == 'Выход':
         game.switch_off()
         game.close_menu()
 
-    if game.slow_mode(1):
-        if keys[pg.K_UP]:
-            game.menu_up()
-        elif keys[pg.K_DOWN]:
-            game.menu_down()
-
 
 def quit_game() -> None:
     """Завершает игру."""
@@ -385,119 +751,55 @@ def quit_game() -> None:
     raise SystemExit
 
 
-def quit_pressed() -> bool:
-    """Реализует логику нажатия на клавишу ESCAPE."""
-    keys = pg.key.get_pressed()
-    for event in pg.event.get():
-        if event.type == pg.QUIT or keys[pg.K_ESCAPE]:
-            if game.new_game:
-                game.switch_off()
-            else:
-                return True
-
-    return False
-
-
-def get_apples(count: int = DEFAULT_COUNT_APPLES,
-               used_cells: list = []) -> tuple[list, list]:
-    """Создает список хороших яблок. И возвращает его."""
-    apples = []
-    for _ in range(count):
-        apple = Apple(used_cells=used_cells)
-        apples.append(apple)
-        used_cells.append(apple.position)
-
-    return apples, used_cells
-
-
-def get_stones(count: int = DEFAULT_COUNT_STONES,
-               used_cells: list = []) -> tuple[list, list]:
-    """Создает список камней. И возвращает его."""
-    stones = []
-    for _ in range(count):
-        stone = Stone(used_cells=used_cells)
-        stones.append(stone)
-        used_cells.append(stone.position)
-
-    return stones, used_cells
-
-
-def get_all_position(snake: Snake, obstacles: list[GameObject]) -> list:
-    """Возвращает список состоящий из координат всех
-    созданных объектов, змейка в список не входит.
+def handle_key(key: int, snake: Snake) -> None:
+    """Обрабатывает нажатие клавиши {key}: в меню - передаёт его
+    {handle_keys_menu}, в игре - ставит поворот змейки {snake} в
+    очередь {turns}. {PROFILE_KEY} включает и выключает профилирование
+    кадра.
     """
-    return [obstacle.position for obstacle in obstacles] + snake.positions
-
-
-def init_game_obgects() -> tuple[Snake, list[GameObject]]:
-    """Инициализирует все игровые объекты."""
-    snake = Snake()
-    used_cells = list.copy(snake.positions)
-    good_apples, used_cells = get_apples(used_cells=used_cells)
-    stones, used_cells = get_stones(used_cells=used_cells)
-
-    return snake, [*good_apples, *stones]
-
-
-def reset_game(new_game: bool = False) -> tuple[Snake, list[GameObject]]:
-    """Сбрасывает змейку к исходному состоянию и задаёт ей случайное
-    направление. Всем препятствиям задаются новые координаты. Если
-    {new_game} = {True} информация об игре будет сброшена. Если
-    {new_game} = {False} информация об игре будет обновлена.
+    if key == PROFILE_KEY:
+        profiler.toggle()
+    elif game.menu_is_open():
+        handle_keys_menu(key)
+    elif key in TURN_KEYS:
+        turns.push(TURN_KEYS[key], snake.direction)
+
+
+def quit_pressed(snake: Snake) -> bool:
+    """Разбирает очередь событий: нажатия клавиш передаёт
+    {handle_key}, а закрытие окна и ESCAPE обрабатывает сама.
+    Возвращает {True}, если нажат ESCAPE в начатой партии.
     """
-    if new_game:
-        game.reset_info()
-    else:
-        game.update_snake_length(1)
+    pressed = False
+    for event in pg.event.get():
+        if event.type == pg.QUIT and game.new_game:
+            game.switch_off()
+        elif event.type == pg.QUIT:
+            pressed = True
+        elif event.type != pg.KEYDOWN:
+            continue
+        elif event.key != pg.K_ESCAPE:
+            handle_key(event.key, snake)
+        elif game.new_game:
+            game.switch_off()
+        else:
+            pressed = True
 
-    return init_game_obgects()
+    return pressed
 
 
-def snake_can_move(new_head: tuple[int, int], snake: Snake,
-                   obstacles) -> bool:
-    """Проверяет есть ли на пути препятствия. Если нет то возвращает {True}
-    и змейка двигается дальше. Если есть препятствие, возвращется {False}.
-    В зависимости от препятсвия змейка вырастет, уменьшится или сбросится
-    в начальное состояние.
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(font: pg.font.Font, text: str, color: str) -> pg.Surface:
+    """Отрисовывает надпись шрифтом {font}. Готовые поверхности хранятся
+    в кэше, поэтому одна и та же надпись отрисовывается один раз.
     """
-    if snake.can_bite_itself(new_head):
-        game.reset = True
-        return False
-
-    for obstacle in obstacles:
-
-        if snake.try_bite(new_head, obstacle) and type(obstacle) is Apple:
-            if obstacle.name == 'apple':
-                snake.grow_up(obstacle.position)
-
-            game.update_eaten_apples()
-
-            if snake.length + len(obstacles) <= FIELD_SIZE:
-                all_positons = get_all_position(snake, obstacles)
-                obstacle.randomize_position(all_positons)
-            else:
-                game.reset = True
-
-            return False
-
-        elif snake.try_bite(new_head, obstacle) and type(obstacle) is Stone:
-            if snake.length <= obstacle.weight:
-                game.reset = True
-            else:
-                for _ in range(obstacle.weight):
-                    snake.cut_tail()
-                all_positons = get_all_position(snake, obstacles)
-                obstacle.randomize_position(all_positons)
-
-            return False
-
-    return True
+    return font.render(text, True, color)
 
 
 def draw_menu():
     """Отрисовывает главное меню."""
     title_menu.fill('Black')
-    text = title_font.render('Змейка', True, 'White')
+    text = render_text(title_font, 'Змейка', 'White')
     txt_x, txt_y = TITLE_MENU_WIDTH // 2, TITLE_MENU_HEIGHT // 2
     text_rect = text.get_rect(center=(txt_x, txt_y))
     title_menu.blit(text, text_rect)
@@ -511,9 +813,9 @@ def draw_menu():
 
     for item in game.get_menu_list():
         if item == 'Продолжить' and game.new_game:
-            text = menu_font.render(item, True, 'DarkGray')
+            text = render_text(menu_font, item, 'DarkGray')
         else:
-            text = menu_font.render(item, True, 'Black')
+            text = render_text(menu_font, item, 'Black')
 
         text_rect = text.get_rect(center=(MENU_WIDTH // 2, y_tmp))
         main_menu.blit(text, text_rect)
@@ -528,50 +830,417 @@ def draw_menu():
     screen.blit(title_menu, title_menu_rect)
 
 
-def main():
-    """Реализует базовую логику игры и инициализацию всех объектов."""
-    snake, obstacles = init_game_obgects()
-    game.switch_on()
+class Hud():
+    """Слой текста поверх игры: меню и заголовок окна. Меню
+    пересобирается только при смене выбранного пункта или состояния
+    {game.new_game}, а заголовок - только при смене счётчиков партии.
+    """
 
-    while game.is_run():
+    def __init__(self) -> None:
+        """Инициализирует экземпляр класса."""
+        self.menu_key: Optional[tuple[str, bool]] = None
+        self.caption_key: Optional[tuple] = None
+
+    def invalidate(self) -> None:
+        """Требует заново отрисовать меню при следующем показе."""
+        self.menu_key = None
+
+    def draw_menu(self) -> bool:
+        """Отрисовывает меню, если оно изменилось, и возвращает {True},
+        когда экран нужно обновить.
+        """
+        key = (game.menu_title(), game.new_game)
+        if key == self.menu_key:
+            return False
+
+        self.menu_key = key
         screen.blit(background_surface, (0, 0))
+        draw_menu()
+        return True
 
-        if game.menu_is_open():
+    def update_caption(self, state: Optional[engine.GameState]) -> None:
+        """Обновляет заголовок окна: название меню, если {state} не
+        передан, и счётчики партии в остальных случаях.
+        """
+        if state is None:
+            key: tuple = ('menu',)
+        else:
+            key = (state.snake.length, state.eaten_apples)
+        if key == self.caption_key:
+            return
+
+        self.caption_key = key
+        if state is None:
             game_caption('Змейка || Основное меню')
-            if quit_pressed():
+        else:
+            game_caption(game.info(state))
+
+
+class ProfileOverlay():
+    """Таблица перцентилей {profiler} поверх игры. Пока замеры
+    включены, таблица рисуется каждый кадр, а её содержимое обновляется
+    раз в {PROFILE_REFRESH} кадров. После выключения поле и меню
+    перерисовываются целиком, чтобы стереть таблицу.
+    """
+
+    def __init__(self, profiler: FrameProfiler, renderer: FieldRenderer,
+                 hud: 'Hud') -> None:
+        """Инициализирует экземпляр класса."""
+        self.profiler = profiler
+        self.renderer = renderer
+        self.hud = hud
+        self.surface: Optional[pg.Surface] = None
+        self.frames = 0
+
+    def render_table(self) -> pg.Surface:
+        """Отрисовывает таблицу перцентилей в миллисекундах. Значения
+        выравниваются по правому краю колонок {PROFILE_COLUMN_WIDTH}.
+        """
+        stats = self.profiler.stats()
+        stats[TURN_LATENCY] = turns.stats()
+        rows = [('мс', *(f'p{percent}' for percent in PERCENTILES))]
+        rows.extend(
+            (phase, *(f'{value:.2f}' for value in stats[phase].values()))
+            for phase in (*PHASES, FRAME, TURN_LATENCY)
+        )
+
+        line_height = profile_font.get_linesize()
+        surface = pg.Surface((
+            PROFILE_COLUMN_WIDTH * len(rows[0]), line_height * len(rows)
+        ))
+        surface.fill(PROFILE_BACKGROUND)
+        for row_index, row in enumerate(rows):
+            pos_y = row_index * line_height
+            surface.blit(render_text(profile_font, row[0], PROFILE_COLOR),
+                         (PROFILE_PADDING, pos_y))
+            for column, text in enumerate(row[1:], 2):
+                line = profile_font.render(text, True, PROFILE_COLOR)
+                surface.blit(line, (
+                    PROFILE_COLUMN_WIDTH * column - line.get_width()
+                    - PROFILE_PADDING, pos_y
+                ))
+
+        return surface
+
+    def draw(self,
+             rects: Optional[list[pg.Rect]]) -> Optional[list[pg.Rect]]:
+        """Рисует таблицу поверх кадра и добавляет её область к
+        областям кадра {rects}.
+        """
+        if not self.profiler.enabled:
+            if self.surface is not None:
+                self.surface = None
+                self.renderer.invalidate()
+                self.hud.invalidate()
+            return rects
+
+        if (self.surface is None
+                or self.profiler.frames - self.frames >= PROFILE_REFRESH):
+            self.surface = self.render_table()
+            self.frames = self.profiler.frames
+
+        rect = screen.blit(self.surface, PROFILE_POSITION)
+        if rects is not None:
+            rects.append(rect)
+        return rects
+
+
+def store_replay(recorder: 'ReplayRecorder') -> None:
+    """Сохраняет запись партии в {REPLAYS_DIR}, если в ней есть ходы."""
+    if not REPLAYS_DIR or not recorder.ticks:
+        return
+
+    from snake_replay import save_replay
+    replay = recorder.replay()
+    os.makedirs(REPLAYS_DIR, exist_ok=True)
+    save_replay(replay, os.path.join(REPLAYS_DIR, f'{replay.seed:016x}.snkr'))
+
+
+def check_board_size(width: int, height: int) -> None:
+    """Бросает {ValueError}, если поле {width}x{height} больше
+    {MAX_BOARD_SIZE} клеток в сторону или пустое.
+    """
+    if not (0 < width <= MAX_BOARD_SIZE and 0 < height <= MAX_BOARD_SIZE):
+        raise ValueError(
+            f'Размер поля должен быть от 1 до {MAX_BOARD_SIZE} клеток'
+        )
+
+
+def load_game(width: int, height: int, snakes: int = 1,
+              density: Optional[str] = None,
+              map_path: Optional[str] = None) -> tuple[GameField, bool]:
+    """Загружает партию из {SAVE_FILE}, если сохранение есть и сделано
+    на поле размером {width}x{height}, иначе создаёт новую партию.
+    Возвращает партию и признак того, что она загружена. При {snakes}
+    больше одного создаётся арена {arena_field}, если задана плотность
+    {density} - уровень {level_field}, а если задан файл {map_path} -
+    партия на карте {map_field} с размером поля из карты: ни те, ни
+    другие не сохраняются. Размер поля карты проверяется
+    {check_board_size}.
+    """
+    if map_path is not None:
+        from snake_maps import open_map
+        game_map = open_map(map_path)
+        try:
+            check_board_size(game_map.width, game_map.height)
+        except ValueError:
+            game_map.close()
+            raise
+        return map_field()(game_map), False
+    if snakes > 1:
+        return arena_field()(width, height, count_snakes=snakes), False
+    if density is not None:
+        return level_field()(width, height, density), False
+
+    if SAVE_FILE:
+        from snake_save import load_snapshot
+        try:
+            state = load_snapshot(SAVE_FILE, GameField)
+        except (OSError, ValueError):
+            pass
+        else:
+            if (state.width, state.height) == (width, height):
+                return state, True
+
+    return GameField(width, height), False
+
+
+def play_ticks(state: GameField, recorder: 'ReplayRecorder', count: int,
+               pilot: Optional['Autopilot'] = None,
+               bots: Optional['Autopilot'] = None) -> None:
+    """Продвигает партию на {count} тиков с записью. Если задан
+    автопилот {pilot}, направление на каждом тике выбирает он, иначе
+    перед каждым тиком применяется один поворот игрока из {turns}. На
+    арене остальными змейками управляет автопилот {bots}, а запись не
+    ведётся.
+    """
+    if bots is not None:
+        from snake_arena import arena_step, pilot_actions
+    for _ in range(count):
+        if pilot is None:
+            handle_keys(state.snake)
+        if bots is not None:
+            skip = 1 if pilot is None else 0
+            arena_step(state, pilot_actions(state, bots, skip))
+            continue
+        if pilot is not None:
+            state.snake.update_direction(pilot.decide(state))
+        recorder.step(state)
+
+
+def finish_game(state: GameField, recorder: 'ReplayRecorder',
+                autosaver: 'Autosaver') -> None:
+    """Сохраняет при выходе запись партии, саму партию, если она
+    начата, и перцентили профилировщика, если он включался. Выход ждёт,
+    пока снимки партии запишутся в файл, и закрывает партию.
+    """
+    store_replay(recorder)
+    if not game.new_game:
+        autosaver.save(state)
+    autosaver.close()
+    state.close()
+    if profiler.used:
+        profiler.dump(PROFILE_FILE, {TURN_LATENCY: turns.stats()})
+
+
+def main(width: int = GRID_WIDTH, height: int = GRID_HEIGHT,
+         camera: Optional[tuple[int, int]] = None,
+         autopilot: bool = AUTOPILOT, snakes: int = 1,
+         density: Optional[str] = None,
+         map_path: Optional[str] = None) -> None:
+    """Связывает игровую логику из {snake_engine} с экраном и клавиатурой:
+    считывает ввод, продвигает партию и отрисовывает её. Поле размером
+    {width}x{height} клеток, {camera} - размер видимой части поля. При
+    {autopilot} змейкой управляет {Autopilot}. При {snakes} больше
+    одного игра идёт на арене, где остальными змейками управляет
+    автопилот. {density} - пресет плотности уровня из
+    {snake_levels.DENSITIES}, {map_path} - файл карты из {snake_maps}.
+    Записи и сохранения ведутся только для обычных партий: арены,
+    уровни и карты из них не восстановить. Модули этих режимов
+    импортируются только здесь.
+    """
+    from snake_autopilot import Autopilot
+    from snake_replay import ReplayRecorder
+    from snake_save import Autosaver
+
+    check_board_size(width, height)
+    init_display()
+    state, loaded = load_game(width, height, snakes, density, map_path)
+    standard = type(state) is GameField
+    game.new_game = not loaded
+    renderer = make_renderer(state, camera)
+    hud = Hud()
+    logic_timer = FixedTimestep(LOGIC_SPEED)
+    recorder = ReplayRecorder(state, enabled=standard and not loaded)
+    autosaver = Autosaver(SAVE_FILE if standard else None, AUTOSAVE_TICKS)
+    overlay = ProfileOverlay(profiler, renderer, hud)
+    pilot = Autopilot() if autopilot else None
+    bots = Autopilot() if hasattr(state, 'snakes') else None
+    game.switch_on()
+
+    while game.is_run():
+        profiler.start()
+        rects: Optional[list[pg.Rect]] = []
+        if game.menu_is_open():
+            hud.update_caption(None)
+            if quit_pressed(state.snake):
                 game.close_menu()
+            profiler.mark('input')
+
+            if hud.draw_menu():
+                rects = None
+            profiler.mark('draw')
 
-            draw_menu()
-            handle_keys_menu()
             if game.reset:
-                snake, obstacles = reset_game(True)
+                store_replay(recorder)
+                reset_game(state, True)
+                recorder.start(state, standard)
                 game.reset = False
+
+            renderer.invalidate()
+            logic_timer.reset()
+            turns.clear()
+            profiler.mark('logic')
         else:
-            if quit_pressed():
+            if quit_pressed(state.snake):
                 game.open_menu()
+                hud.invalidate()
+            profiler.mark('input')
+
+            ticks = logic_timer.ticks()
+            play_ticks(state, recorder, ticks, pilot, bots)
+            autosaver.update(state, ticks)
+            profiler.mark('logic')
+
+            rects = renderer.render(
+                logic_timer.alpha() if SMOOTH_MOVEMENT else None
+            )
+            hud.update_caption(state)
+
+        rects = overlay.draw(rects)
+        profiler.mark('draw')
+        update_display(rects)
+        profiler.mark('display')
+        profiler.end_frame()
+        clock.tick(GAME_SPEED)
 
-            snake.draw()
-            for obstacle in obstacles:
-                obstacle.draw()
+    finish_game(state, recorder, autosaver)
+    quit_game()
 
-            handle_keys(snake)
 
-            if game.slow_mode():
-                new_head = snake.new_head()
+class ReplayViewer():
+    """Проигрывание записи {player} на экране. Стрелки вверх и вниз
+    меняют скорость из {REPLAY_SPEEDS}, влево и вправо перематывают на
+    {REPLAY_SEEK_TICKS} тиков, пробел ставит на паузу.
+    """
+
+    def __init__(self, player: 'ReplayPlayer') -> None:
+        """Инициализирует экземпляр класса."""
+        self.player = player
+        self.renderer = make_renderer(player.state)
+        self.paused = False
+        self.caption_key: Optional[tuple] = None
+        self.set_speed(REPLAY_SPEEDS.index(1))
+
+    def set_speed(self, index: int) -> None:
+        """Выбирает скорость {REPLAY_SPEEDS}[{index}]. При высокой
+        скорости за кадр проигрывается несколько тиков.
+        """
+        self.speed = min(max(index, 0), len(REPLAY_SPEEDS) - 1)
+        speed = REPLAY_SPEEDS[self.speed]
+        self.timer = FixedTimestep(
+            LOGIC_SPEED * speed,
+            max_steps=MAX_CATCH_UP_TICKS * math.ceil(speed)
+        )
+
+    def handle_key(self, key: int) -> None:
+        """Обрабатывает нажатие клавиши {key}."""
+        if key == pg.K_UP:
+            self.set_speed(self.speed + 1)
+        elif key == pg.K_DOWN:
+            self.set_speed(self.speed - 1)
+        elif key == pg.K_RIGHT:
+            self.player.seek(self.player.tick + REPLAY_SEEK_TICKS)
+        elif key == pg.K_LEFT:
+            self.player.seek(self.player.tick - REPLAY_SEEK_TICKS)
+        elif key == pg.K_SPACE:
+            self.paused = not self.paused
+
+    def update(self) -> None:
+        """Проигрывает тики, накопившиеся с прошлого кадра, и рисует
+        изменения.
+        """
+        ticks = self.timer.ticks()
+        if not self.paused:
+            self.player.advance(ticks)
+        update_display(self.renderer.render())
+
+        key = (self.player.tick // LOGIC_SPEED, self.speed, self.paused)
+        if key == self.caption_key:
+            return
+
+        self.caption_key = key
+        game_caption(
+            f'Запись || {key[0]} с || x{REPLAY_SPEEDS[self.speed]}'
+            f'{" || пауза" if self.paused else ""}'
+        )
 
-                if snake_can_move(new_head, snake, obstacles):
-                    snake.move(new_head)
-                elif game.reset:
-                    snake, obstacles = reset_game()
-                    game.reset = False
 
-            game_caption(game.info())
+def watch_replay(path: str) -> None:
+    """Показывает запись партии из файла {path}."""
+    from snake_replay import ReplayPlayer, load_replay
 
+    init_display()
+    viewer = ReplayViewer(ReplayPlayer(load_replay(path), GameField))
+    while True:
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                quit_game()
+            elif event.type == pg.KEYDOWN:
+                viewer.handle_key(event.key)
+
+        viewer.update()
         clock.tick(GAME_SPEED)
-        pg.display.update()
 
-    quit_game()
+
+def board_size(text: str) -> tuple[int, int]:
+    """Разбирает размер поля вида 200x150."""
+    try:
+        width, height = map(int, text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f'Ожидается размер вида 200x150, получено {text!r}'
+        )
+    return width, height
+
+
+def parse_args() -> argparse.Namespace:
+    """Разбирает аргументы командной строки."""
+    from snake_levels import DENSITIES
+
+    parser = argparse.ArgumentParser(description='Змейка.')
+    parser.add_argument('replay', nargs='?',
+                        help='файл записи партии для просмотра')
+    parser.add_argument('--board', type=board_size,
+                        default=(GRID_WIDTH, GRID_HEIGHT),
+                        help='размер поля в клетках, например 1000x1000')
+    parser.add_argument('--camera', type=board_size, default=None,
+                        help='размер видимой вокруг головы части поля')
+    parser.add_argument('--autopilot', action='store_true',
+                        default=AUTOPILOT, help='змейкой управляет автопилот')
+    parser.add_argument('--snakes', type=int, default=1,
+                        help='число змеек на арене')
+    parser.add_argument('--density', choices=DENSITIES, default=None,
+                        help='плотность уровня с достижимыми яблоками')
+    parser.add_argument('--map', default=None, dest='map_path',
+                        help='файл карты, см. snake_maps')
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    if args.replay:
+        watch_replay(args.replay)
+    else:
+        main(*args.board, args.camera, args.autopilot, args.snakes,
+             args.density, args.map_path)